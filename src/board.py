@@ -1,201 +1,251 @@
 import logging as log
-from collections.abc import Callable
+from collections.abc import Callable, Iterator, Sequence
 from pathlib import Path
 from typing import Literal
 
 from config import Config
-from emojis import Emoji
-from tools import get_cache_file, get_state_file
+from emojis import Emoji, get_locale_cache_file, reset_caches
+from history import UsageHistory, open_history
+from journal import Changes, Journal
+from layout import Layout, compile_layout
+from recent import FAVORITE, RecentEmoji, RecentList, codepoints, from_codepoints
+from search import SearchCache, SearchEngine, SearchResult, match
+from store import EmojiStore, EmojiView
+from tools import get_state_file
+
+# journal records after which the recent list is saved as a whole
+COMPACT_OPS = 1000
 
 
 class RecentGroup(Emoji):
-    def __init__(self, recent_file: str):
+    """The recent list, shared by all running instances.
+
+    Saved as a snapshot of its entries plus a journal of the changes since,
+    see Journal. Each change first applies the changes of other instances
+    and is then journaled as one of the records
+      +;<no_sort 0|1>;<codepoints>    add
+      *;<char>                        toggle favorite
+      -;<char>                        delete
+      <;<char> and >;<char>           move left or right
+
+    The snapshot has a line <order>;<codepoints> per entry. Entries are
+    resolved to emojis by find, so they follow the current locale and
+    emoji data, unknown ones show just their char.
+
+    Orders by hand, favorites toggled and uses without sorting are shared
+    as they are, the instance that made them sorts the list on close.
+
+    Uses, favorites and deletions are recorded in the optional history
+    too, its top ranked emojis make the list when there is no saved one."""
+
+    def __init__(
+        self,
+        recent_file: str,
+        size: int = 100,
+        find: Callable[[str], Emoji | None] | None = None,
+        history: UsageHistory | None = None,
+    ):
         super().__init__(group="Recent List", char="⟲")
+        self.recent = RecentList(size)
+        self.emojis: list[RecentEmoji] = self.recent.entries
         self.recent_file = recent_file
+        self.find = find
+        self.history = history
+        self.journal = Journal(recent_file)
+        # whether the snapshot has lines of an earlier format
+        self.outdated = False
+        # whether this instance changed the order of the list by hand
+        self.reordered = False
         self.load()
         self.offset = 0
 
+    def resolve(self, char: str, fallback: Emoji | None = None) -> Emoji:
+        e = self.find(char) if self.find else None
+        return e or fallback or Emoji(char, codepoints(char))
+
     def add(self, emoji: Emoji, no_sort: bool):
-        if emoji.char not in [e.char for e in self.emojis]:
-            emoji = emoji.clone()
-            self.emojis.append(emoji)
-        emoji = next(e for e in self.emojis if e.char == emoji.char)
-        if emoji.order < 100:
-            emoji.order += 10
-            if emoji.order >= 100:
-                emoji.order = 100
-                emoji.mark = "⭐️"
-            elif emoji.order > 0:
-                emoji.mark = str(emoji.order)
-            else:
-                emoji.order = 0
-                emoji.mark = ""
-        for e in self.emojis:
-            if e != emoji and e.order < 100:
-                if e.order > 0:
-                    e.order -= 1
-                if e.order > 0:
-                    e.mark = str(e.order)
-                else:
-                    e.mark = ""
-                    e.order = 0
-        # sort and keep only top 100
-        if not no_sort:
-            self.emojis.sort(key=lambda e: e.order, reverse=True)
-        # limit to 100 entries
-        if len(self.emojis) > 100:
-            del self.emojis[100:]
-        self.save()
+        self.change(f"+;{int(no_sort)};{codepoints(emoji.char)}", emoji)
+        if self.history:
+            self.history.record(emoji.char)
 
     def toggle_favorite(self, emoji: Emoji):
-        if emoji:
-            if emoji.order >= 100:
-                emoji.order = 0
-                emoji.mark = ""
-            else:
-                emoji.order = 100
-                emoji.mark = "⭐️"
-            self.save()
+        if emoji and self.change(f"*;{emoji.char}") and self.history:
+            entry = self.recent.get(emoji.char)
+            self.history.set_favorite(emoji.char, entry is not None and entry.order >= FAVORITE)
 
     def delete(self, emoji: Emoji):
-        self.emojis.remove(emoji)
-        self.save()
+        if self.change(f"-;{emoji.char}") and self.history:
+            self.history.hide(emoji.char)
+
+    def move(self, emoji: Emoji, direction: Literal[-1, 1]) -> bool:
+        return self.change(f"{'<' if direction < 0 else '>'};{emoji.char}")
+
+    def change(self, record: str, emoji: Emoji | None = None) -> bool:
+        """Apply record after the changes of other instances and journal it,
+        return whether it changed anything. emoji is the one added, if known."""
+        changed = None
+        try:
+            with self.journal.locked() as changes:
+                self.merge(changes)
+                changed = self.replay(record, emoji)
+                if changed:
+                    self.journal.append(record)
+                    if self.journal.ops >= COMPACT_OPS:
+                        self.journal.compact(self.snapshot())
+        except OSError as ex:
+            log.error(f"Saving recent emojis: {ex}")
+        if changed is None:
+            changed = self.replay(record, emoji)
+        if changed and (record[0] in "*<>" or record.startswith("+;1;")):
+            self.reordered = True
+        return changed
+
+    def replay(self, record: str, emoji: Emoji | None = None) -> bool:
+        (op, _, arg) = record.partition(";")
+        if op == "+":
+            (no_sort, _, key) = arg.partition(";")
+            if ";" in key:
+                # the emoji fields of earlier versions
+                (char, unicode, name, group, subgroup, tags) = key.split(";", 5)
+                emoji = self.resolve(char, Emoji(char, unicode, group, subgroup, name, tags))
+            elif emoji is None:
+                emoji = self.resolve(from_codepoints(key))
+            self.recent.add(emoji, no_sort == "1")
+            return True
+        if op not in ("*", "-", "<", ">"):
+            raise ValueError(f"unknown operation '{op}'")
+        entry = self.recent.get(arg)
+        if entry is None:
+            return False
+        if op == "*":
+            self.recent.toggle_favorite(entry)
+        elif op == "-":
+            self.recent.remove(entry)
+        else:
+            return self.recent.move(entry, -1 if op == "<" else 1)
+        return True
+
+    def restore(self, snapshot: list[str]):
+        recent_list = []
+        self.outdated = False
+        for line in snapshot:
+            (order, _, key) = line.strip().partition(";")
+            if ";" in key:
+                # the emoji fields of earlier versions, saved anew by load
+                (char, unicode, name, group, subgroup, tags) = key.split(";", 5)
+                e = self.resolve(char, Emoji(char, unicode, group, subgroup, name, tags))
+                self.outdated = True
+            else:
+                e = self.resolve(from_codepoints(key))
+            recent_list.append((e, int(order)))
+        # Remove duplicates while preserving order
+        by_char = {e.char: (e, order) for (e, order) in reversed(recent_list)}
+        self.recent.reset(reversed(by_char.values()))
+
+    def merge(self, changes: Changes):
+        (snapshot, records) = changes
+        if snapshot is not None:
+            try:
+                self.restore(snapshot)
+            except Exception as ex:
+                log.error(f"Restoring recent emojis: {ex}")
+        for record in records:
+            try:
+                self.replay(record)
+            except Exception as ex:
+                log.warning(f"Skipping recent list record '{record}': {ex}")
 
     def load(self):
         try:
-            with open(self.recent_file, encoding="utf-8") as f:
-                recent_list = []
-                for line in f.readlines():
-                    (order, char, unicode, name, group, subgroup, tags) = line.strip().split(";", 6)
-                    order = int(order)
-                    e = Emoji(*(char, unicode, group, subgroup, name, tags))
-                    if order >= 100:
-                        e.mark = "⭐️"
-                    elif order > 0:
-                        e.mark = str(order)
-                    else:
-                        e.mark = ""
-                        order = 0
-                    e.order = order
-                    recent_list.append(e)
-                # Remove duplicates while preserving order
-                recent_list = {e.char: e for e in reversed(recent_list)}
-                recent_list = list(reversed(recent_list.values()))
-                # Ensure order
-                recent_list.sort(key=lambda e: e.order, reverse=True)
-                self.emojis = recent_list
-        except Exception as ex:
+            with self.journal.locked() as changes:
+                self.merge(changes)
+                if changes == ([], []) and self.history and not Path(self.recent_file).exists():
+                    self.rebuild()
+        except OSError as ex:
+            log.error(f"Restoring recent emojis: {ex}")
+        if self.outdated:
+            # lists of earlier versions were sorted when loaded
+            self.save(sort=True)
+
+    def rebuild(self):
+        """Make the list from the top of the history and save it, in a
+        locked() block."""
+        assert self.history
+        top = self.history.top(self.recent.capacity)
+        if top:
+            self.recent.reset((self.resolve(char), order) for (char, order) in top)
+            self.recent.sort()
+            self.journal.compact(self.snapshot())
+            log.info(f"Recent list rebuilt from {len(top)} emojis of the usage history.")
+
+    def refresh(self) -> bool:
+        """Apply the changes of other instances, return whether there were any."""
+        if not self.journal.changed():
+            return False
+        try:
+            with self.journal.locked() as changes:
+                self.merge(changes)
+        except OSError as ex:
             log.error(f"Restoring recent emojis: {ex}")
+            return False
+        return changes != (None, [])
 
-    def save(self):
+    def snapshot(self) -> list[str]:
+        return [f"{e.order};{codepoints(e.char)}" for e in self.emojis]
+
+    def save(self, sort: bool = False):
+        """Save the whole list as a new snapshot, sorted with sort."""
         try:
-            with open(self.recent_file, "w", encoding="utf-8") as f:
-                for e in self.emojis:
-                    f.write(
-                        f"{e.order};{e.char};{e.unicode};{e.name};{e.group};{e.subgroup};{e.tags}\n"
-                    )
-        except Exception as ex:
+            with self.journal.locked() as changes:
+                self.merge(changes)
+                if sort:
+                    self.recent.sort()
+                self.journal.compact(self.snapshot())
+                self.outdated = False
+        except OSError as ex:
             log.error(f"Saving recent emojis: {ex}")
 
+    def close(self):
+        """Save the whole list, on a clean exit."""
+        self.save(sort=self.reordered)
+        self.reordered = False
+        self.journal.close()
+        if self.history:
+            self.history.close()
+
 
 class SearchGroup(Emoji):
-    def __init__(self):
+    def __init__(
+        self,
+        store: EmojiStore | None = None,
+        fuzzy: bool = False,
+        cache: SearchCache | None = None,
+    ):
         super().__init__(group="Search Results", char="🔎")
+        self.store = store or EmojiStore([])
+        self.engine = SearchEngine(self.store, fuzzy, cache)
+        # last search result, refined by the next search
+        self.result: SearchResult | None = None
+        self.emojis: EmojiView = self.store.view(())
         self.offset = 0
 
     def match(self, text: str, needle: str) -> int:
-        pos = text.find(needle)
-        if pos == -1:
-            return 0
-        score = 0
-        while pos != -1:
-            score += 1
-            # score match at word start higher
-            if pos == 0:
-                score += 11
-            elif not text[pos - 1].isalnum():
-                score += 7
-            # score match at word end higher
-            end_pos = pos + len(needle)
-            if end_pos == len(text):
-                score += 2
-            elif not text[end_pos].isalnum():
-                score += 1
-            # continue searching
-            pos = text.find(needle, end_pos + 1)
-        return score
-
-    def filter_emojis(
-        self,
-        emojis: list[Emoji],
-        needle: str,
-        key: Callable[[Emoji], str],  # ear
-        score_bonus: int = 1,
-    ) -> list[Emoji]:
-        matches: list[Emoji] = []
-        for e in emojis:
-            match_score = self.match(key(e), needle)
-            if match_score:
-                e.order += match_score * score_bonus
-                matches.append(e)
-        return matches
-
-    def search(self, emojis: list[Emoji], needle: str) -> int:
-        self.emojis.clear()
+        return match(text, needle)
+
+    def show(self, result: SearchResult):
         self.offset = 0
-        if not needle:
-            self.emojis.extend(emojis)
-            return 0
-        needle = needle.lower()
-        # list of matches with (score: int, emoji: Emoji)
-        matches: list[Emoji] = emojis
-        for e in matches:
-            e.order = 0
-        for n in needle.split(" "):
-            if not n:
-                continue
-            if "," in n:
-                (group, subgroup) = n.split(",", 1)
-                if group:
-                    matches = self.filter_emojis(matches, group, lambda e: e.group.lower())
-                if subgroup:
-                    matches = self.filter_emojis(matches, subgroup, lambda e: e.subgroup.lower())
-            elif n.startswith("+"):
-                n = n[1:].upper()
-                if n:
-                    matches = self.filter_emojis(matches, n, lambda e: e.unicode)
-            elif n.startswith("#"):
-                n = n[1:]
-                if n:
-                    matches = self.filter_emojis(matches, n, lambda e: e.tags.lower())
-            else:
-                name_matches = self.filter_emojis(matches, n, lambda e: e.name.lower(), 1)
-                tag_matches = self.filter_emojis(matches, n, lambda e: e.tags.lower(), 1)
-                matches = list(set(name_matches + tag_matches))
-        if matches:
-            # for e in matches:  # show match score for debugging
-            #     e.mark = str(e.order)
-            matches.sort(key=lambda e: e.order, reverse=True)
-            # Remove duplicates while preserving order
-            matches_dict = {e.char: e for e in reversed(matches)}
-            matches = list(reversed(matches_dict.values()))
-            self.emojis.extend(matches)
-        else:
-            if needle.startswith("+"):
-                code = needle[1:].upper()
-                try:
-                    char = chr(int(code, 16))
-                    e = Emoji(char=char, unicode=code, name="Generated Character")
-                    self.emojis.append(e)
-                except ValueError:
-                    pass
+        self.result = result
+        self.emojis.set(result.ids, result.extra, result.scores)
 
-        return len(self.emojis)
+    def search(self, needle: str) -> int:
+        self.show(self.engine.search(needle, self.result))
+        return len(self.emojis) if needle else 0
 
 
 class SettingsGroup(Emoji):
     def __init__(self, config: Config, board: "Board"):
         super().__init__(group="Settings", char="⚙️")
+        self.emojis: list[Emoji] = []
         self.config = config
         self.board = board
         self.offset = 0
@@ -222,7 +272,6 @@ class SettingsGroup(Emoji):
             log.info(f"Changing layout to {emoji.name}")
             key_pos = self.board.get_key_pos()
             self.board.set_layout(self.config.get_layout(emoji.name))
-            self.board._make_mapping()
             self.board.move_cursor(-100, -100)
             self.board.move_cursor(key_pos, 0)
             for e in self.emojis:
@@ -233,39 +282,98 @@ class SettingsGroup(Emoji):
                         e.mark = ""
         elif emoji.group == "reset cache":
             log.info("Resetting cache and exiting.")
-            cache_dir = Path(get_cache_file("dir")).parent
-            for cache_file in cache_dir.rglob("*"):
-                if cache_file.is_file():
-                    cache_file.unlink()
-                    log.info(f"Deleted cache file: {cache_file}")
+            reset_caches(self.config)
             exit(0)
 
 
 type BoardEmoji = Emoji | RecentGroup | SearchGroup | SettingsGroup
-type OffsetBoardEmoji = tuple[int, str, list[BoardEmoji]]
+type OffsetBoardEmoji = tuple[int, str, Sequence[BoardEmoji]]
+
+
+class PageView:
+    """The emojis on the keys of the page a board shows.
+
+    A view on the emojis of the board from offset on in the key order of
+    its layout, nothing is copied or rebuilt when the board changes. The
+    emoji on a key is emojis[offset + index of the key], looked up on
+    demand."""
+
+    def __init__(self, board: "Board"):
+        self._board = board
+
+    @property
+    def layout(self) -> Layout:
+        return self._board._layout
+
+    @property
+    def emojis(self) -> Sequence[BoardEmoji]:
+        return self._board._emojis
+
+    @property
+    def start(self) -> int:
+        return self._board._offset
+
+    @property
+    def stop(self) -> int:
+        """End of the slice of emojis on the page."""
+        return min(self.start + self.layout.key_count, len(self.emojis))
+
+    def _emoji(self, index: int | None) -> Emoji | None:
+        if index is None:
+            return None
+        i = self.start + index
+        emojis = self.emojis
+        return emojis[i] if i < len(emojis) else None
+
+    def get(self, key: str) -> Emoji | None:
+        """The emoji on key, None if none or not on the layout."""
+        return self._emoji(self.layout.index.get(key))
+
+    def at(self, x: int, y: int) -> Emoji | None:
+        return self._emoji(self.layout.cells.get((x, y)))
+
+    def row(self, y: int) -> list[tuple[str, Emoji | None]]:
+        """(key, emoji) of each column of row y, a gap is (" ", None)."""
+        emojis = self.emojis
+        start = self.start
+        count = len(emojis) - start
+        return [
+            (key, emojis[start + i] if i is not None and i < count else None)
+            for (key, i) in self.layout.row_cells[y]
+        ]
+
+    def rows(self) -> Iterator[list[tuple[str, Emoji | None]]]:
+        for y in range(self.layout.height):
+            yield self.row(y)
 
 
 class Board:
-    def __init__(self, config: Config, all_emojis: list[Emoji], emoji_groups: list[Emoji]):
+    def __init__(self, config: Config, all_emojis: Sequence[Emoji], emoji_groups: list[Emoji]):
         self._cursor_x: int = 0
         self._cursor_y: int = 0
         self._current_key: str = ""
         self.set_layout(config.get_layout())
         self.move_cursor(-100, -100)
 
-        self._all_emojis: list[Emoji] = all_emojis
+        self._store = EmojiStore(all_emojis, get_locale_cache_file(config, "search.idx"))
         self._main_emojis: list[BoardEmoji] = emoji_groups
-        self._recent = RecentGroup(get_state_file("recent.txt"))
+        history = open_history(get_state_file("history.db")) if config.recent.history else None
+        self._recent = RecentGroup(
+            get_state_file("recent.txt"), config.recent.size, self._store.find, history
+        )
         self._main_emojis.insert(0, self._recent)
-        self._search_group = SearchGroup()
+        self._search_group = SearchGroup(
+            self._store,
+            config.search.fuzzy,
+            SearchCache(config.search.cache_entries, config.search.cache_size * 1024),
+        )
         self._main_emojis.insert(1, self._search_group)
         self._settings_group = SettingsGroup(config, self)
         self._main_emojis.insert(2, self._settings_group)
 
-        self._emojis: list[BoardEmoji] = self._main_emojis
+        self._emojis: Sequence[BoardEmoji] = self._main_emojis
         self._offset: int = 0
-        self._mapping: dict[str, Emoji] = {}
-        self._make_mapping()
+        self._page = PageView(self)
         self._board_path: list[OffsetBoardEmoji] = []
 
         if config.board.default:
@@ -275,18 +383,20 @@ class Board:
                     break
 
     def set_layout(self, layout: str):
-        self._layout = layout
-        self._rows = self._layout.splitlines()
-        self._key_count = sum(1 for char in self._layout if not char.isspace())
-        self._height = len(self._rows)
-        self._width = max(len(row) for row in self._rows)
+        self._layout = compile_layout(layout)
+        self._rows = self._layout.rows
+        self._key_count = self._layout.key_count
+        self._height = self._layout.height
+        self._width = self._layout.width
 
     def get_key_pos(self, key: str | None = None) -> int:
         if key is None:
             key = self.current_key
         key = self.has_key(key)
-        pos = self._layout.replace(" ", "").replace("\n", "").find(key)
-        if pos >= 0:
+        if not key:
+            return 0
+        pos = self._layout.index.get(key)
+        if pos is not None:
             return pos
         raise ValueError(f"Key '{key}' not found on board.")
 
@@ -319,7 +429,12 @@ class Board:
         return self._offset
 
     @property
-    def emojis(self) -> list[BoardEmoji]:
+    def page(self) -> PageView:
+        """The emojis on the keys of the page shown."""
+        return self._page
+
+    @property
+    def emojis(self) -> Sequence[BoardEmoji]:
         return self._emojis
 
     @property
@@ -351,46 +466,33 @@ class Board:
         return (page, pages)
 
     def push_key(self, key: str):
-        key = self.has_key(key)
-        emoji = self._mapping[key]
-        if self.is_settings and emoji:
+        emoji = self._page.get(self.has_key(key))
+        if emoji is None:
+            return None
+        if self.is_settings:
             self._settings_group.act(emoji)
             return None
         self.push_board(emoji.emojis)
 
-    def push_board(self, emojis: list[Emoji]):
+    def push_board(self, emojis: Sequence[Emoji]):
         self._board_path.append((self._offset, self._current_key, self._emojis))
         self._emojis = emojis
         self._offset = 0
-        self._mapping = self._make_mapping()
 
     def pop_board(self):
         if len(self._board_path) > 0:
             self._offset, self._current_key, self._emojis = self._board_path.pop()
             self.set_cursor_to_key(self._current_key)
-            self._mapping = self._make_mapping()
-
-    def _make_mapping(self):
-        self._mapping.clear()
-        i = self._offset
-        for k in self._layout:
-            if k not in (" ", "\n"):
-                if i < len(self._emojis):
-                    self._mapping[k] = self._emojis[i]
-                    i += 1
-        return self._mapping
 
     def recent_add(self):
         e = self.get_emoji()
         if e:
             self._recent.add(e, self.is_recent)
-            self._mapping = self._make_mapping()
 
     def recent_delete(self):
         e = self.get_emoji()
         if e:
             self._recent.delete(e)
-            self._mapping = self._make_mapping()
             return True
         return False
 
@@ -398,15 +500,21 @@ class Board:
         e = self.get_emoji()
         if e:
             self._recent.toggle_favorite(e)
-            self._mapping = self._make_mapping()
+
+    @property
+    def search_engine(self) -> SearchEngine:
+        return self._search_group.engine
 
     def search(self, needle: str) -> int:
+        return self.show_search(self.search_engine.search(needle, self._search_group.result))
+
+    def show_search(self, result: SearchResult) -> int:
+        """Show a search result on the search board, e.g. one searched elsewhere."""
         if self._emojis != self._search_group.emojis:
             self.push_board(self._search_group.emojis)
         self.move_cursor(-100, -100)
         self._offset = 0
-        self._search_group.search(self._all_emojis, needle)
-        self._mapping = self._make_mapping()
+        self._search_group.show(result)
         return len(self._search_group.emojis)
 
     def has_key(self, key: str) -> str:
@@ -415,33 +523,36 @@ class Board:
         Return empty string if not found."""
         if key == " " or key == "":
             return ""
-        if key in self._layout:
+        if key in self._layout.index:
             return key
-        if key.upper() in self._layout:
+        if key.upper() in self._layout.index:
             return key.upper()
         log.warning(f"Key '{key}' not found on board.")
         return ""
 
+    def get_score(self) -> int:
+        """Return the search score of the emoji at the cursor, 0 if not searching."""
+        if not self.is_search or not self._current_key:
+            return 0
+        return self._search_group.emojis.score(self._offset + self.get_key_pos())
+
     def get_emoji(self) -> Emoji | None:
         """Return the emoji at the current cursor position or None."""
-        return self._mapping.get(self._current_key, None)
+        return self._page.get(self._current_key)
 
     def get_emoji_for_key(self, key: str) -> Emoji | None:
         """Return the emoji for the given key or None."""
-        key = self.has_key(key)
-        return self._mapping.get(key, None)
+        return self._page.get(self.has_key(key))
 
     def set_cursor_to_key(self, key: str) -> tuple[int, int]:
         """Return the (x, y) position of the given key on the board.
         If key not found, move cursor to first key."""
         key = self.has_key(key)
         if key:
-            for y, row in enumerate(self._rows):
-                x = row.find(key)
-                if x >= 0:
-                    self._current_key = key
-                    (self._cursor_x, self._cursor_y) = (x, y)
-                    return (x, y)
+            (x, y) = self._layout.positions[key]
+            self._current_key = key
+            (self._cursor_x, self._cursor_y) = (x, y)
+            return (x, y)
         log.error(f"Key '{key}' not found on board.")
         return (-1, -1)
 
@@ -465,58 +576,30 @@ class Board:
             cx = self._cursor_x
         if cy is None:
             cy = self._cursor_y
-        x = cx + dx
-        y = cy + dy
-
-        if dy <= -100:
-            y = 0
-        elif dy >= 100:
-            y = self._height - 1
-        elif y < 0:
-            y = 0
-        elif y > self._height - 1:
-            y = self._height - 1
-
-        if dx <= -100:
-            x = 0
-            dx = 1
-        elif dx >= 100:
-            x = len(self._rows[y]) - 1
-            dx = -1
-        elif x < 0:
-            if y > 0:
-                y -= 1
-                x = len(self._rows[y]) - 1
-                dx = -1
-            else:
-                x = 0
-                dx = 1
-        elif x > len(self._rows[y]) - 1:
-            if y < self._height - 1:
-                y += 1
-                x = 0
-                dx = 1
-            else:
-                x = len(self._rows[y]) - 1
-                dx = -1
-
-        key = self._rows[y][x]
-
-        # find next valid key in row
-        if key == " ":
-            if dy and 0 < y < self._height - 1:
-                return self.move_cursor(dx, dy, x, y)
-            if (dy or dx < 0) and x > 0:
-                return self.move_cursor(-1, 0, x, y)
-            if (dy or dx > 0) and x < len(self._rows[y]):
-                return self.move_cursor(1, 0, x, y)
+        pos = self._layout.move(cx, cy, dx, dy)
+        if pos is None:
             return (self._cursor_x, self._cursor_y)
-
+        (x, y) = pos
+        key = self._layout.grid[pos]
         self._cursor_x = x
         self._cursor_y = y
         self._current_key = key
         return (x, y)
 
+    @property
+    def recent_files(self) -> list[str]:
+        """The files other instances change the recent list in."""
+        return [self._recent.journal.path, self._recent.journal.journal_path]
+
+    def refresh_recent(self) -> bool:
+        """Apply the changes of the recent list by other instances, return
+        whether there were any."""
+        return self._recent.refresh()
+
+    def close(self):
+        """Save the state kept across runs, on a clean exit."""
+        self._recent.close()
+
     def scroll(self, offset: int):
         new_offset = self._offset + self._key_count * offset
         if new_offset < 0:
@@ -524,22 +607,18 @@ class Board:
         if new_offset >= len(self._emojis):
             new_offset = self._offset
         self._offset = new_offset
-        self._mapping = self._make_mapping()
 
     def move_recent_emoji(self, direction: Literal[-1, 1]):
         e = self.get_emoji()
         if not e:
             return
-        i = self._recent.emojis.index(e)
-        if (direction == -1 and i == 0) or (direction == 1 and i + 1 == len(self._recent.emojis)):
+        if not self._recent.move(e, direction):
             return
-        r = self._recent.emojis
-        r[i], r[i + direction] = r[i + direction], r[i]
-        self._recent.save()
         self.move_cursor(direction, 0)
-        self._mapping = self._make_mapping()
 
 
-def make_board(config: Config, all_emojis: list[Emoji], emoji_groups: list[Emoji]) -> Board:
+def make_board(
+    config: Config, all_emojis: Sequence[Emoji], emoji_groups: list[Emoji]
+) -> Board:
     board = Board(config, all_emojis, emoji_groups)
     return board
@@ -14,6 +14,25 @@ class BoardConfig:
     locale: str = "en"
 
 
+@dataclass
+class SearchConfig:
+    # search words within a few typos when nothing matches exactly
+    fuzzy: bool = True
+    # names and tags of these locales are searched too
+    locales: list[str] = field(default_factory=lambda: ["en"])
+    # results of recent searches kept
+    cache_entries: int = 64
+    cache_size: int = 4096  # KiB
+
+
+@dataclass
+class RecentConfig:
+    # emojis kept in the recent list
+    size: int = 100
+    # record every use with its time in history.db
+    history: bool = True
+
+
 @dataclass
 class TerminalConfig:
     width: int = 47
@@ -30,6 +49,8 @@ class GuiConfig:
     mark_font_size: float = 0.2
     emoji_font_size: float = 0.56
     emoji_font_size2: float = 0.8
+    search_async: bool = True
+    search_delay: int = 15  # ms
 
 
 @dataclass
@@ -48,6 +69,45 @@ class SourcesConfig:
     unicode_annotations: str = "https://raw.githubusercontent.com/unicode-org/cldr/refs/heads/main/common/annotations/"  # fmt: skip
 
 
+default_unicode_exclude_ranges = [
+    [0x000000, 0x00009F],  # Normal characters
+    [0x000400, 0x001FFE],  # CJK and Hangul
+    [0x0020D0, 0x0020F0],  # Combining Diacritical Marks for Symbols
+    [0x002C00, 0x00FFDB],  # CJK and Hangul
+    [0x010100, 0x01EEFE],  # Various scripts
+    [0x01F1E6, 0x01F1FF],  # REGIONAL INDICATOR SYMBOL LETTERS
+    [0x01F3FB, 0x01F3FF],  # Skintone modifiers
+    [0x01F9B0, 0x01F9B3],  # Hair style modifiers
+    [0x01FBFA, 0x033479],  # Tags
+    [0x0E0001, 0xFFFFFF],  # Tags and private use
+]
+
+default_unicode_exclude_points = [0x00AD, 0x2028, 0x2029]
+
+# A list of patterns to group UnicodeData.txt, first match wins.
+# group, subgroup ("" for the unicode category), name_regex, category_regex
+default_unicode_grouping = [
+    ["box drawing", "", "box drawings ", ""],
+    ["arrows", "", "arrow", ""],
+    ["greek", "", "greek", ""],
+    ["math", "", "", "^Sm$"],
+    ["objects", "money", "", "^Sc$"],
+    ["space & punctuation", "", "", "^(Zs|P)"],
+    ["all the rest", "", ".", ""],
+]
+
+
+@dataclass
+class UnicodeConfig:
+    exclude_ranges: list[list[int]] = field(
+        default_factory=lambda: [r.copy() for r in default_unicode_exclude_ranges]
+    )
+    exclude_points: list[int] = field(default_factory=lambda: default_unicode_exclude_points.copy())
+    grouping: list[list[str]] = field(
+        default_factory=lambda: [g.copy() for g in default_unicode_grouping]
+    )
+
+
 @dataclass
 class LoggingConfig:
     log_mode: Literal["w", "a"] = "w"
@@ -90,10 +150,13 @@ CTIEO BNRSG
 @dataclass
 class Config:
     board: BoardConfig = field(default_factory=BoardConfig)
+    search: SearchConfig = field(default_factory=SearchConfig)
+    recent: RecentConfig = field(default_factory=RecentConfig)
     terminal: TerminalConfig = field(default_factory=TerminalConfig)
     gui: GuiConfig = field(default_factory=GuiConfig)
     layout: list[LayoutConfig] = field(default_factory=lambda: default_layouts.copy())
     sources: SourcesConfig = field(default_factory=SourcesConfig)
+    unicode: UnicodeConfig = field(default_factory=UnicodeConfig)
     logging: LoggingConfig = field(default_factory=LoggingConfig)
 
     def get_layout(self, name: str | None = None) -> str:
@@ -153,7 +216,9 @@ def __load_config(config_path: str = default_path) -> Config:
                                 f"Expected one of {allowed_values}, got {actual_value}."
                             )
                     else:
-                        if not isinstance(actual_value, expected_type):
+                        # For generic types like list[int] only check the container type
+                        checked_type = origin if isinstance(origin, type) else expected_type
+                        if not isinstance(actual_value, checked_type):
                             raise ValueError(
                                 f"Invalid type for key '{sub_key}' in section '{key}'. "
                                 f"Expected {expected_type.__name__}, got {type(actual_value).__name__}."
@@ -0,0 +1,337 @@
+import logging as log
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Iterator, Sequence
+from functools import partial
+from pathlib import Path
+from typing import overload
+
+from emojis import Emoji, LazyEmojis
+
+# Binary emoji database, memory mapped and decoded lazily per record.
+#
+# Layout (all integers little endian):
+#   header   magic, version, counts and section offsets
+#   records  fixed width table, one entry per emoji and group
+#   variants same table for all variants, decoded only when opened
+#   groups   one entry per group: record id, first member, member count
+#   members  u32 record ids of the top level emojis in each group
+#   pool     deduplicated UTF-8 strings referenced by (offset, length)
+#   index    u32[index slots] open addressing hash table by char, see find
+#
+# Top level emojis are records [0, top_count) and the group records follow.
+# Variants are stored in blocks referenced by their parent, which may be a
+# record or a variant itself.
+
+MAGIC = b"EKDB"
+VERSION = 3
+
+HEADER = struct.Struct("<4sHHIIIIIIIIIIII")
+# char, unicode, name, group, subgroup, tags, mark as (offset, length) pairs
+# followed by first variant in the variants table and variant count
+RECORD = struct.Struct("<7I7HIH")
+# the largest string length and variant count of a record
+MAX_SHORT = 0xFFFF
+GROUP = struct.Struct("<III")
+MEMBER = struct.Struct("<I")
+SLOT = struct.Struct("<I")
+
+# index entries are 0 for an empty slot, else a record or variant id + 1
+# with VARIANT_REF set for variants
+VARIANT_REF = 1 << 31
+
+
+def char_hash(char: str) -> int:
+    return zlib.crc32(char.encode("utf-8"))
+
+
+def build_index(refs: list[tuple[str, int]]) -> list[int]:
+    """Hash table of the (char, ref) pairs with linear probing, the first
+    ref of a char wins."""
+    slots = 8
+    while slots < len(refs) * 2:
+        slots *= 2
+    index = [0] * slots
+    seen: set[str] = set()
+    for char, ref in refs:
+        if not char or char in seen:
+            continue
+        seen.add(char)
+        i = char_hash(char) & (slots - 1)
+        while index[i]:
+            i = (i + 1) & (slots - 1)
+        index[i] = ref
+    return index
+
+
+def write_emoji_db(path: str, emojis: list[Emoji], groups: list[Emoji]):
+    """Write emojis and groups to path, replacing any existing file atomically.
+
+    Raises ValueError before writing anything if a record does not fit."""
+    pool = bytearray()
+    pool_map: dict[str, tuple[int, int]] = {}
+
+    def intern(s: str) -> tuple[int, int]:
+        ref = pool_map.get(s)
+        if ref is None:
+            data = s.encode("utf-8")
+            ref = (len(pool), len(data))
+            pool.extend(data)
+            pool_map[s] = ref
+        return ref
+
+    # assign variant ids block by block, nested variants after their parents
+    variants: list[Emoji] = []
+    blocks: dict[int, tuple[int, int]] = {}  # id(parent) -> (first, count)
+    parents: list[Emoji] = list(emojis)
+    while parents:
+        nested: list[Emoji] = []
+        for e in parents:
+            if e.emojis:
+                blocks[id(e)] = (len(variants), len(e.emojis))
+                variants.extend(e.emojis)
+                nested.extend(e.emojis)
+        parents = nested
+    top_ids = {id(e): i for i, e in enumerate(emojis)}
+    group_start = len(emojis)
+
+    def pack(records: list[Emoji]) -> bytearray:
+        data = bytearray()
+        for e in records:
+            strings = (e.char, e.unicode, e.name, e.group, e.subgroup, e.tags, e.mark)
+            refs = [intern(s) for s in strings]
+            (first, count) = blocks.get(id(e), (0, 0))
+            if count > MAX_SHORT or any(r[1] > MAX_SHORT for r in refs):
+                raise ValueError(
+                    f"Emoji '{e.char}' has more than {MAX_SHORT} variants or bytes in a"
+                    " field, too many for the emoji database."
+                )
+            data.extend(RECORD.pack(*(r[0] for r in refs), *(r[1] for r in refs), first, count))
+        return data
+
+    records = [*emojis, *groups]
+    record_data = pack(records)
+    variant_data = pack(variants)
+    # emojis before their variants before groups, for chars used twice
+    refs = [(e.char, i + 1) for (i, e) in enumerate(emojis)]
+    refs += [(e.char, VARIANT_REF | (i + 1)) for (i, e) in enumerate(variants)]
+    refs += [(g.char, group_start + i + 1) for (i, g) in enumerate(groups)]
+    index = build_index(refs)
+    index_data = struct.pack(f"<{len(index)}I", *index)
+
+    group_data = bytearray()
+    member_data = bytearray()
+    member_count = 0
+    for i, g in enumerate(groups):
+        group_data.extend(GROUP.pack(group_start + i, member_count, len(g.emojis)))
+        for e in g.emojis:
+            member_data.extend(MEMBER.pack(top_ids[id(e)]))
+        member_count += len(g.emojis)
+
+    records_offset = HEADER.size
+    variants_offset = records_offset + len(record_data)
+    groups_offset = variants_offset + len(variant_data)
+    members_offset = groups_offset + len(group_data)
+    pool_offset = members_offset + len(member_data)
+    index_offset = pool_offset + len(pool)
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        0,
+        len(records),
+        len(emojis),
+        len(variants),
+        len(groups),
+        member_count,
+        records_offset,
+        variants_offset,
+        groups_offset,
+        members_offset,
+        pool_offset,
+        index_offset,
+        len(index),
+    )
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(record_data)
+        f.write(variant_data)
+        f.write(group_data)
+        f.write(member_data)
+        f.write(pool)
+        f.write(index_data)
+    os.replace(tmp_path, path)
+    log.info(
+        f"Emoji database with {len(records)} records and {len(variants)} variants"
+        f" written to '{path}'."
+    )
+
+
+class EmojiDB:
+    """Read only view on an emoji database file.
+
+    Records are decoded on first access and cached, so repeated access
+    returns the same Emoji object. Variants are decoded when their parent's
+    emojis are first accessed and only the recently opened ones are kept."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"Emoji database '{path}' is truncated.")
+        (
+            magic,
+            version,
+            _flags,
+            self.record_count,
+            self.top_count,
+            self.variant_count,
+            self.group_count,
+            self.member_count,
+            self._records_offset,
+            self._variants_offset,
+            self._groups_offset,
+            self._members_offset,
+            self._pool_offset,
+            self._index_offset,
+            self._index_slots,
+        ) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not an emoji database.")
+        if version != VERSION:
+            raise ValueError(f"Emoji database '{path}' has version {version}, need {VERSION}.")
+        self._cache: list[Emoji | None] = [None] * self.record_count
+
+    def close(self):
+        self._mm.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._pool_offset + offset
+        return self._mm[start : start + length].decode("utf-8")
+
+    def _decode(self, offset: int) -> Emoji:
+        fields = RECORD.unpack_from(self._mm, offset)
+        (char, unicode, name, group, subgroup, tags, mark) = (
+            self._string(fields[i], fields[i + 7]) for i in range(7)
+        )
+        e = Emoji(char, unicode, group, subgroup, name, tags)
+        e.mark = mark
+        (first, count) = fields[14:16]
+        if count:
+            e.emojis = LazyEmojis(count, partial(self.variants, first, count))
+        return e
+
+    def emoji(self, record_id: int) -> Emoji:
+        e = self._cache[record_id]
+        if e is None:
+            e = self._decode(self._records_offset + record_id * RECORD.size)
+            self._cache[record_id] = e
+        return e
+
+    def variants(self, first: int, count: int) -> list[Emoji]:
+        """Decode a block of variants, not cached here but by the LazyEmojis LRU."""
+        offset = self._variants_offset + first * RECORD.size
+        return [self._decode(offset + i * RECORD.size) for i in range(count)]
+
+    def find(self, char: str) -> Emoji | None:
+        """The emoji, variant or group with char, looked up in the index.
+
+        Records come from the cache, variants are decoded anew."""
+        data = char.encode("utf-8")
+        mask = self._index_slots - 1
+        i = char_hash(char) & mask
+        while ref := SLOT.unpack_from(self._mm, self._index_offset + i * SLOT.size)[0]:
+            if ref & VARIANT_REF:
+                offset = self._variants_offset + ((ref & ~VARIANT_REF) - 1) * RECORD.size
+            else:
+                offset = self._records_offset + (ref - 1) * RECORD.size
+            fields = RECORD.unpack_from(self._mm, offset)
+            start = self._pool_offset + fields[0]
+            if self._mm[start : start + fields[7]] == data:
+                return self._decode(offset) if ref & VARIANT_REF else self.emoji(ref - 1)
+            i = (i + 1) & mask
+        return None
+
+    def emojis(self) -> "EmojiSequence":
+        """All top level emojis and symbols."""
+        return EmojiSequence(self, 0, self.top_count)
+
+    def groups(self) -> list[Emoji]:
+        groups: list[Emoji] = []
+        for i in range(self.group_count):
+            (record_id, first, count) = GROUP.unpack_from(
+                self._mm, self._groups_offset + i * GROUP.size
+            )
+            g = self.emoji(record_id)
+            g.emojis = EmojiSequence(self, first, count, members=True)
+            groups.append(g)
+        return groups
+
+
+class EmojiSequence(Sequence[Emoji]):
+    """Lazy sequence of emojis in an EmojiDB.
+
+    Either a range of record ids or, with members, a range in the group
+    member table."""
+
+    def __init__(self, db: EmojiDB, first: int, count: int, members: bool = False):
+        self._db = db
+        self._first = first
+        self._count = count
+        self._members = members
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record_id(self, i: int) -> int:
+        if self._members:
+            offset = self._db._members_offset + (self._first + i) * MEMBER.size
+            record_id: int = MEMBER.unpack_from(self._db._mm, offset)[0]
+            return record_id
+        return self._first + i
+
+    @overload
+    def __getitem__(self, i: int) -> Emoji: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[Emoji]: ...
+
+    def __getitem__(self, i: int | slice) -> Emoji | list[Emoji]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("emoji index out of range")
+        return self._db.emoji(self._record_id(i))
+
+    def __iter__(self) -> Iterator[Emoji]:
+        for i in range(self._count):
+            yield self._db.emoji(self._record_id(i))
+
+    def copy(self) -> list[Emoji]:
+        return list(self)
+
+    def find(self, char: str) -> Emoji | None:
+        """The emoji, variant or group with char in the whole database."""
+        return self._db.find(char)
+
+
+def load_emoji_db(path: str) -> tuple[Sequence[Emoji], list[Emoji]] | None:
+    """Return (emojis, groups) from the database at path or None if unusable."""
+    if not Path(path).exists():
+        return None
+    try:
+        db = EmojiDB(path)
+    except (OSError, ValueError) as ex:
+        log.warning(f"Ignoring emoji database: {ex}")
+        return None
+    log.info(
+        f"Emoji database '{path}' mapped with {db.record_count} records"
+        f" and {db.variant_count} variants."
+    )
+    return (db.emojis(), db.groups())
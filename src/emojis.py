@@ -1,12 +1,20 @@
+import bisect
 import csv
 import logging as log
+import multiprocessing
 import os
 import re
+import sys
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 
 from config import Config, load_config
-from tools import download_if_missing, get_cache_file
+from manifest import CacheManifest, hash_text
+from tools import get_cache_file, timed_call
 
 # Map of special unicode codes to short names for display on keys
 special_name_map = {
@@ -27,7 +35,25 @@ special_name_map = {
 }
 
 
+# Shared emojis value of all records without sub emojis
+NO_EMOJIS: tuple["Emoji", ...] = ()
+
+
 class Emoji:
+    # Slots and interned group, subgroup and tag strings keep the thousands of
+    # records small, e.g. for the daemon staying resident all day.
+    __slots__ = (
+        "char",
+        "unicode",
+        "group",
+        "subgroup",
+        "name",
+        "tag_list",
+        "emojis",
+        "mark",
+        "order",
+    )
+
     def __init__(
         self,
         char: str,
@@ -40,20 +66,30 @@ class Emoji:
     ):
         self.char = char  # the emoji character
         self.unicode = unicode.upper()  # the unicode codepoint(s) as string
-        self.group = group  # the emoji group
-        self.subgroup = subgroup  # the emoji subgroup
+        self.group = sys.intern(group)  # the emoji group
+        self.subgroup = sys.intern(subgroup)  # the emoji subgroup
         self.name = name  # the emoji name/annotation
         self.tags = tags  # the emoji tags
-        self.emojis: list[Emoji] = []  # list of sub emojis, e.g. group, skintone variants
+        # list of sub emojis, e.g. group, skintone variants
+        self.emojis: Sequence[Emoji] = NO_EMOJIS
         self.mark: str = ""  # mark for skintone variants, favorites, etc.
         self.order = order  # optional order for sorting and recently used
 
+    @property
+    def tags(self) -> str:
+        """The emoji tags as comma separated string."""
+        return ", ".join(self.tag_list)
+
+    @tags.setter
+    def tags(self, tags: str):
+        self.tag_list = tuple(sys.intern(t) for t in tags.split(", ")) if tags else ()
+
     def __repr__(self):
         return f"Emoji({self.char}, {self.unicode}, {self.name}, {self.group} > {self.subgroup}, tags={self.tags}, emojis={len(self.emojis) if self.emojis else 0}, order={self.order})"
 
     def append(self, emoji: "Emoji"):
-        if not self.emojis:
-            self.emojis = []
+        if not isinstance(self.emojis, list):
+            self.emojis = list(self.emojis)
         if not self.char:
             self.char = emoji.char
         if not self.group:
@@ -61,7 +97,7 @@ class Emoji:
         if emoji.subgroup not in self.subgroup:
             if self.subgroup:
                 self.subgroup += ", "
-            self.subgroup += emoji.subgroup
+            self.subgroup = sys.intern(self.subgroup + emoji.subgroup)
         self.emojis.append(emoji)
 
     def clone(self) -> "Emoji":
@@ -71,14 +107,64 @@ class Emoji:
             group=self.group,
             subgroup=self.subgroup,
             name=self.name,
-            tags=self.tags,
             order=self.order,
         )
-        e.emojis = self.emojis.copy()
+        e.tag_list = self.tag_list
+        if self.emojis:
+            e.emojis = list(self.emojis)
         e.mark = self.mark
         return e
 
 
+# Number of variant boards kept decoded, older ones are decoded again on access
+VARIANT_BOARDS = 32
+
+
+class VariantBoards:
+    """LRU of the materialized sub emojis of recently opened LazyEmojis."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._boards: OrderedDict[LazyEmojis, list[Emoji]] = OrderedDict()
+
+    def get(self, lazy: "LazyEmojis") -> list[Emoji]:
+        emojis = self._boards.get(lazy)
+        if emojis is None:
+            emojis = lazy.load()
+            self._boards[lazy] = emojis
+            if len(self._boards) > self.capacity:
+                self._boards.popitem(last=False)
+        else:
+            self._boards.move_to_end(lazy)
+        return emojis
+
+    def clear(self):
+        self._boards.clear()
+
+
+variant_boards = VariantBoards(VARIANT_BOARDS)
+
+
+class LazyEmojis(Sequence[Emoji]):
+    """Sub emojis of an emoji, e.g. skintone variants, that are only decoded
+    when first accessed, i.e. when their board is opened."""
+
+    __slots__ = ("_count", "load")
+
+    def __init__(self, count: int, load: Callable[[], list[Emoji]]):
+        self._count = count
+        self.load = load
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i):  # type: ignore[override]
+        return variant_boards.get(self)[i]
+
+    def __iter__(self) -> Iterator[Emoji]:
+        return iter(variant_boards.get(self))
+
+
 def make_emoji_from_row(row: list[str]) -> Emoji:
     return Emoji(
         char=row[0],
@@ -90,31 +176,82 @@ def make_emoji_from_row(row: list[str]) -> Emoji:
     )
 
 
-# FIXME move to config
-unicode_exclude_ranges = (
-    (0x000000, 0x00009F),  # Normal characters
-    (0x000400, 0x001FFE),  # CJK and Hangul
-    (0x0020D0, 0x0020F0),  # Combining Diacritical Marks for Symbols
-    (0x002C00, 0x00FFDB),  # CJK and Hangul
-    (0x010100, 0x01EEFE),  # Various scripts
-    (0x01F1E6, 0x01F1FF),  # REGIONAL INDICATOR SYMBOL LETTERS
-    (0x01F3FB, 0x01F3FF),  # Skintone modifiers
-    (0x01F9B0, 0x01F9B3),  # Hair style modifiers
-    (0x01FBFA, 0x033479),  # Tags
-    (0x0E0001, 0xFFFFFF),  # Tags and private use
-)
-
-# FIXME move to config
-unicode_exclude_points = (0x00AD, 0x2028, 0x2029)
+class CodepointClassifier:
+    """Precompiled [unicode] config tables.
 
+    Exclusion is a bisect over sorted, merged code point intervals.
+    Grouping of UnicodeData rows checks only the name patterns ranked
+    before the first matching category pattern, which is memoized per
+    category."""
 
-def exclude_unicode(unicode: int) -> bool:
-    exclude_range = any([start <= unicode <= stop for (start, stop) in unicode_exclude_ranges])
-    exclude_char = unicode in unicode_exclude_points
-    return exclude_range or exclude_char
+    def __init__(
+        self,
+        exclude_ranges: Sequence[Sequence[int]],
+        exclude_points: Sequence[int],
+        grouping: Sequence[Sequence[str]],
+    ):
+        intervals = sorted([(start, stop) for (start, stop) in exclude_ranges])
+        intervals += [(cp, cp) for cp in exclude_points]
+        intervals.sort()
+        self._starts: list[int] = []
+        self._stops: list[int] = []
+        for start, stop in intervals:
+            if self._stops and start <= self._stops[-1] + 1:
+                self._stops[-1] = max(self._stops[-1], stop)
+            else:
+                self._starts.append(start)
+                self._stops.append(stop)
+
+        self._groups: list[tuple[str, str]] = []
+        # (rule index, plain text, regex) - plain text needs no regex search
+        self._name_rules: list[tuple[int, str, re.Pattern | None]] = []
+        self._category_rules: list[tuple[int, re.Pattern]] = []
+        for i, rule in enumerate(grouping):
+            if len(rule) != 4:
+                raise ValueError(
+                    f"Unicode grouping {rule} needs group, subgroup, name_regex, category_regex."
+                )
+            (group, subgroup, name_re, category_re) = rule
+            self._groups.append((group, subgroup))
+            if name_re:
+                if not any(c in ".^$*+?{}[]\\|()" for c in name_re):
+                    self._name_rules.append((i, name_re, None))
+                else:
+                    self._name_rules.append((i, "", re.compile(name_re)))
+            if category_re:
+                self._category_rules.append((i, re.compile(category_re)))
+        self._category_cache: dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config: Config) -> "CodepointClassifier":
+        u = config.unicode
+        return cls(u.exclude_ranges, u.exclude_points, u.grouping)
+
+    def is_excluded(self, codepoint: int) -> bool:
+        i = bisect.bisect_right(self._starts, codepoint) - 1
+        return i >= 0 and codepoint <= self._stops[i]
+
+    def group(self, name: str, category: str) -> tuple[str, str] | None:
+        """Return (group, subgroup) for a UnicodeData row or None if no rule matches."""
+        first = self._category_cache.get(category)
+        if first is None:
+            first = next(
+                (i for i, c in self._category_rules if c.search(category)), len(self._groups)
+            )
+            self._category_cache[category] = first
+        for i, text, name_re in self._name_rules:
+            if i >= first:
+                break
+            if name_re.search(name) if name_re else text in name:
+                return self._groups[i]
+        if first < len(self._groups):
+            return self._groups[first]
+        return None
 
 
-def read_emojibase_data(file_path, locale) -> tuple[list[Emoji], dict[str, str | dict[str, str]]]:
+def read_emojibase_data(
+    file_path, locale, classifier: CodepointClassifier
+) -> tuple[list[Emoji], dict[str, str | dict[str, str]]]:
     import json
 
     # collect group and subgroup localizations
@@ -141,7 +278,7 @@ def read_emojibase_data(file_path, locale) -> tuple[list[Emoji], dict[str, str |
     for item in data:
         if item["hexcode"].find("-") == -1:
             unicode = int(item["hexcode"], 16)
-            if exclude_unicode(unicode):
+            if classifier.is_excluded(unicode):
                 continue
         emoji = Emoji(
             char=item["emoji"],
@@ -180,25 +317,10 @@ def read_emojibase_data(file_path, locale) -> tuple[list[Emoji], dict[str, str |
     return (emojis, lc_map)
 
 
-# A list of patterns to group UnicodeData.txt.
-# group_name, subgroup|None, name_regex|None, category_regex|None
-# FIXME move to config
-unicode_grouping = (
-    ("box drawing", "", re.compile("box drawings "), None),
-    ("arrows", "", re.compile("arrow"), None),
-    ("greek", "", re.compile("greek"), None),
-    ("math", "", None, re.compile("^Sm$")),
-    ("objects", "money", None, re.compile("^Sc$")),
-    ("space & punctuation", "", None, re.compile("^(Zs|P)")),
-    ("all the rest", "", re.compile("."), None),
-)
-
-
 # UnicodeData.txt format:
 # hexcode;name;category;...
-def read_unicode_data(file_path: str, emojibase_set: set[str]) -> list[Emoji]:
+def read_unicode_data(file_path: str, classifier: CodepointClassifier) -> list[Emoji]:
     emojis: list[Emoji] = []
-    duplicates = 0
     excluded = 0
     symbol_count = 0
     with open(file_path, encoding="utf-8") as csvfile:
@@ -208,30 +330,21 @@ def read_unicode_data(file_path: str, emojibase_set: set[str]) -> list[Emoji]:
                 continue
             symbol_count += 1
             unicode = int(row[0], 16)
-            if exclude_unicode(unicode):
+            if classifier.is_excluded(unicode):
                 excluded += 1
                 continue
-            if row[0] in emojibase_set:
-                duplicates += 1
-                continue
 
             char = chr(unicode)
             unicode = row[0]
             name = row[1].lower()
             category = row[2]
 
-            for group, subgroup, name_re, category_re in unicode_grouping:
-                if (
-                    isinstance(name_re, re.Pattern)
-                    and name_re.search(name)
-                    or isinstance(category_re, re.Pattern)
-                    and category_re.search(category)
-                ):
-                    e = Emoji(char, unicode, group, subgroup or category, name)
-                    emojis.append(e)
-                    break
-
-    log.info(f"{symbol_count} symbols found, {excluded} excluded, {duplicates} duplicates.")
+            group_subgroup = classifier.group(name, category)
+            if group_subgroup:
+                (group, subgroup) = group_subgroup
+                emojis.append(Emoji(char, unicode, group, subgroup or category, name))
+
+    log.info(f"{symbol_count} symbols found, {excluded} excluded.")
     return emojis
 
 
@@ -302,88 +415,148 @@ for p in group_patterns:
     group_patterns_compiled.append(GroupPattern(*p))  # type: ignore
 
 
+class GroupClassifier:
+    """Decision table for the board group of an emoji.
+
+    The first pattern matching the (group, subgroup) pair is memoized per
+    pair, so classifying is a dictionary lookup. Explicit chars overrides
+    are indexed by every substring, matching the `char in chars` test,
+    and win when listed on an earlier pattern."""
+
+    def __init__(self, patterns: Sequence[GroupPattern]):
+        self.patterns = list(patterns)
+        self._pairs: dict[tuple[str, str], int] = {}
+        self._chars: dict[str, int] = {}
+        for i, p in enumerate(self.patterns):
+            for start in range(len(p.chars)):
+                for end in range(start + 1, len(p.chars) + 1):
+                    self._chars.setdefault(p.chars[start:end], i)
+
+    def _match_pair(self, group: str, subgroup: str) -> int:
+        for i, p in enumerate(self.patterns):
+            if p.group and not p.group.search(group):
+                continue
+            if p.subgroup and not p.subgroup.search(subgroup):
+                continue
+            return i
+        return len(self.patterns)
+
+    def classify(self, emoji: Emoji) -> GroupPattern:
+        pair = (emoji.group, emoji.subgroup)
+        i = self._pairs.get(pair)
+        if i is None:
+            i = self._pairs[pair] = self._match_pair(*pair)
+        char_i = self._chars.get(emoji.char)
+        if char_i is not None and char_i < i:
+            i = char_i
+        if i < len(self.patterns):
+            return self.patterns[i]
+        log.warning(
+            f"No group for: '{emoji.char}': '{emoji.name}', '{emoji.group}' > '{emoji.subgroup}'"
+        )
+        return self.patterns[-1]  # catch all
+
+
+group_classifier = GroupClassifier(group_patterns_compiled)
+
+
 def normalize_group(emoji: Emoji) -> GroupPattern:
-    for p in group_patterns_compiled:
-        if p.chars and emoji.char in p.chars:
-            return p
-        if p.group and not p.group.search(emoji.group):
-            continue
-        if p.subgroup and not p.subgroup.search(emoji.subgroup):
-            continue
-        return p
-    log.warning(
-        f"No group for: '{emoji.char}': '{emoji.name}', '{emoji.group}' > '{emoji.subgroup}'"
+    return group_classifier.classify(emoji)
+
+
+class GenderNormalizer:
+    """Reduces people emoji names to a gender neutral key, e.g.
+    'man golfing' and 'woman golfing' to 'golfing'.
+
+    The former chain of substitutions is compiled once, mutually exclusive
+    whole name rules are combined into single patterns and results are
+    memoized per name."""
+
+    _collection_re = re.compile(r"^(family|kiss|couple with heart): .*$")
+    _collections = {"family": "family", "kiss": "kiss", "couple with heart": "with heart"}
+    _people_re = re.compile(r"^(people|women|men|woman and man) ?")
+    _gender_re = re.compile(r"(er)? ?(person|man|woman|couple):? ?")
+    _neutral_re = re.compile(
+        r"^(?:(person|prince|princess)|(Santa|Mrs.|Mx) Claus|(child|boy|girl))$"
     )
-    return group_patterns_compiled[-1]  # catch all
+    _neutrals = ("with crown", "Mx Claus", "child")
+
+    def __init__(self):
+        self._cache: dict[str, str] = {}
+
+    def _normalize(self, s: str) -> str:
+        s = self._collection_re.sub(lambda m: self._collections[m[1]], s)
+        s = self._people_re.sub("people ", s)
+        s = self._gender_re.sub("", s)
+        m = self._neutral_re.match(s)
+        if m:
+            s = self._neutrals[m.lastindex - 1]  # type: ignore
+        if not s:
+            s = "person"
+        return s.strip()
+
+    def normalize(self, name: str) -> str:
+        key = self._cache.get(name)
+        if key is None:
+            key = self._cache[name] = self._normalize(name)
+        return key
+
+
+gender_normalizer = GenderNormalizer()
 
 
 def strip_gender(s: str) -> str:
-    s = re.sub(r"^(family:) .*$", "family", s)
-    s = re.sub(r"^(kiss:) .*$", "kiss", s)
-    s = re.sub(r"^(couple with heart:) .*$", "with heart", s)
-    s = re.sub(r"^(people|women|men|woman and man) ?", "people ", s)
-    s = re.sub(r"(er)? ?(person|man|woman|couple):? ?", "", s)
-    s = re.sub(r"^(person|prince|princess)$", "with crown", s)
-    s = re.sub(r"^(Santa|Mrs.|Mx) Claus$", "Mx Claus", s)
-    s = re.sub(r"^(child|boy|girl)$", "child", s)
-    if not s:
-        s = "person"
-    return s.strip()
-
-
-def squash_gender_emojis(emojis: list[Emoji]) -> list[Emoji]:
-    # collect the groups
-    squash_emoji_groups = {}
-    squash_emoji_unicode = set()
-    for i, e in enumerate(emojis):
-        e = emojis[i]
-        name = strip_gender(e.name)
-        same = squash_emoji_groups.get(name, [])
-        same.append(e.unicode)
-        squash_emoji_groups[name] = same
-        squash_emoji_unicode.add(e.unicode)
-
-    # squash the emojis which are only gender variants
-    squashed_emojis = []
+    return gender_normalizer.normalize(s)
+
+
+def squash_gender_emojis(
+    emojis: list[Emoji], normalizer: GenderNormalizer = gender_normalizer
+) -> list[Emoji]:
+    """Combine emojis that only differ by gender into a group emoji at the
+    position of the first one, in a single pass over emojis."""
+    squashed_emojis: list[Emoji] = []
+    first_pos: dict[str, int] = {}  # neutral name: position in squashed_emojis
+    groups: dict[str, Emoji] = {}  # neutral name: group emoji
     for e in emojis:
-        if e.unicode in squash_emoji_unicode:
-            name = strip_gender(e.name)
-            if len(squash_emoji_groups[name]) > 1:
-                # first emoji creates group
-                if e.unicode == squash_emoji_groups[name][0]:
-                    emoji_group = Emoji(
-                        e.char,
-                        name="Group: " + name,
-                        unicode=e.unicode,
-                        group=e.group,
-                        subgroup=e.subgroup,
-                    )
-                    emoji_group.mark = "🟤"
-                    e.mark = ""
-                    emoji_group.append(e)
-                    emoji_group.emojis.extend(e.emojis)
-                    e.emojis.clear()
-                    # ugly hack to remember position of group pos
-                    squash_emoji_groups[name].append(len(squashed_emojis))
-                    squashed_emojis.append(emoji_group)
-                    continue
-                # other emojis are added as variants
-                first_pos = squash_emoji_groups[name][-1]  # group pos
-                e.mark = ""
-                squashed_emojis[first_pos].append(e)
-                squashed_emojis[first_pos].emojis.extend(e.emojis)
-                e.emojis.clear()
-                continue
-        squashed_emojis.append(e)
+        name = normalizer.normalize(e.name)
+        pos = first_pos.get(name)
+        if pos is None:
+            first_pos[name] = len(squashed_emojis)
+            squashed_emojis.append(e)
+            continue
+        emoji_group = groups.get(name)
+        if emoji_group is None:
+            # second emoji turns the first one into a group
+            first = squashed_emojis[pos]
+            emoji_group = Emoji(
+                first.char,
+                name="Group: " + name,
+                unicode=first.unicode,
+                group=first.group,
+                subgroup=first.subgroup,
+            )
+            emoji_group.mark = "🟤"
+            first.mark = ""
+            emoji_group.append(first)
+            emoji_group.emojis.extend(first.emojis)  # type: ignore
+            first.emojis = NO_EMOJIS
+            squashed_emojis[pos] = groups[name] = emoji_group
+        # other emojis are added as variants
+        e.mark = ""
+        emoji_group.append(e)
+        emoji_group.emojis.extend(e.emojis)  # type: ignore
+        e.emojis = NO_EMOJIS
 
     return squashed_emojis
 
 
-def get_grouped_emojis(emojis: list[Emoji]) -> list[Emoji]:
+def get_grouped_emojis(
+    emojis: list[Emoji], classifier: GroupClassifier = group_classifier
+) -> list[Emoji]:
     groups: list[Emoji] = []
     group_map: dict[str, Emoji] = {}
     for e in emojis:
-        g = normalize_group(e)
+        g = classifier.classify(e)
         if g.order == 0:
             continue
         if g.char not in group_map:
@@ -395,50 +568,112 @@ def get_grouped_emojis(emojis: list[Emoji]) -> list[Emoji]:
     return groups
 
 
-def fix_locale_names(lc_map, emojis: list[Emoji]):
+def fix_locale_names(lc_map, emojis: Sequence[Emoji]):
     for e in emojis:
         e.group = lc_map["groups"].get(e.group, e.group)
         subgroup = e.subgroup.split(", ")
-        e.subgroup = ", ".join([lc_map["subgroups"].get(sg, sg) for sg in subgroup])
+        e.subgroup = sys.intern(", ".join([lc_map["subgroups"].get(sg, sg) for sg in subgroup]))
         e.name = lc_map.get(e.unicode, e.name)
         if e.emojis:
             fix_locale_names(lc_map, e.emojis)
 
 
-def get_emojis_groups_build_cache(config: Config) -> tuple[list[Emoji], list[Emoji]]:
-    locales = {"en"}
-    locales.add(config.board.locale)
-    for locale in locales:
+# Bump when the build output changes for the same inputs.
+BUILD_VERSION = 5
+
+
+def get_locale(config: Config) -> str:
+    return config.board.locale or "en"
+
+
+def get_search_locales(config: Config) -> list[str]:
+    """The other locales whose names and tags are searched as well."""
+    locale = get_locale(config)
+    return [lc for lc in dict.fromkeys(config.search.locales) if lc and lc != locale]
+
+
+def get_locale_cache_file(config: Config, filename: str) -> str:
+    """Return path of a built cache file, kept apart per locale."""
+    return get_cache_file(f"{get_locale(config)}/{filename}")
+
+
+# the files a build writes for each locale
+BUILD_OUTPUTS = ("emojis-cache.txt", "groups-cache.txt", "emojis.db", "search.idx")
+
+
+def remove_cache_file(cache_file: str):
+    try:
+        os.remove(cache_file)
+        log.info(f"Cache file '{cache_file}' removed.")
+    except FileNotFoundError:
+        pass
+
+
+def remove_unlocalized_caches():
+    """Remove the caches of the cache root from before the caches per locale."""
+    for filename in ("emojis-cache.txt", "groups-cache.txt"):
+        remove_cache_file(get_cache_file(filename))
+
+
+def reset_caches(config: Config):
+    """Remove the built caches of all locales and the manifest, so they are
+    built again on the next start. The downloaded sources are kept and only
+    hashed again."""
+    manifest_file = get_cache_file("manifest.json")
+    locales = {get_locale(config), *CacheManifest(manifest_file).outputs}
+    for locale in sorted(locales):
+        for filename in BUILD_OUTPUTS:
+            remove_cache_file(get_cache_file(f"{locale}/{filename}"))
+    remove_cache_file(manifest_file)
+    remove_unlocalized_caches()
+
+
+def get_sources(config: Config) -> dict[str, tuple[str, str]]:
+    """Return the downloads a build for the configured locale needs as
+    name: (url, local_file)."""
+    locale = get_locale(config)
+    sources: dict[str, tuple[str, str]] = {}
+    for lc in sorted({"en", locale}):
         for db in ("data.raw.json", "messages.raw.json"):
-            url = f"{config.sources.emojibase}/{locale}/{db}"
-            local_file = get_cache_file(f"emojibase/{locale}-{db}")
-            download_if_missing(url, local_file)
-    emojibase_data = get_cache_file("emojibase/")
-    (base_emojis, lc_map) = read_emojibase_data(emojibase_data, config.board.locale)
-    log.info(f"Loaded {len(base_emojis)} emojis from '{emojibase_data}'.")
-    variants = 0
-    for e in base_emojis:
-        if e.emojis:
-            variants += len(e.emojis)
-    log.info(f"{variants} variants found.")
-    log.info(f"A total of {len(base_emojis) + variants} emojis.")
-
-    # squash emojis - we require EN locale here
-    emojis = squash_gender_emojis(base_emojis)
-    log.info(f"Squashed into {len(emojis)} grouped emojis.")
-
-    unicode_data = get_cache_file("unicode-data.txt")
-    download_if_missing(config.sources.unicode_data, unicode_data)
-    emojibase_set = set(e.unicode for e in base_emojis)
-    unicode_emojis = read_unicode_data(unicode_data, emojibase_set)
-    log.info(f"Loaded {len(unicode_emojis)} symbols from '{unicode_data}'.")
-
-    unicode_annotations_file = get_cache_file(f"{config.board.locale}-annotations.xml")
-    url = config.sources.unicode_annotations + f"{config.board.locale}.xml"
-    download_if_missing(url, unicode_annotations_file)
-    xml = ET.parse(unicode_annotations_file)
+            url = f"{config.sources.emojibase}/{lc}/{db}"
+            sources[f"emojibase/{lc}-{db}"] = (url, get_cache_file(f"emojibase/{lc}-{db}"))
+    sources["unicode-data.txt"] = (config.sources.unicode_data, get_cache_file("unicode-data.txt"))
+    for lc in [locale, *get_search_locales(config)]:
+        db = f"{lc}-data.raw.json"
+        url = f"{config.sources.emojibase}/{lc}/data.raw.json"
+        sources.setdefault(f"emojibase/{db}", (url, get_cache_file(f"emojibase/{db}")))
+        sources[f"{lc}-annotations.xml"] = (
+            config.sources.unicode_annotations + f"{lc}.xml",
+            get_cache_file(f"{lc}-annotations.xml"),
+        )
+    return sources
+
+
+def get_tables_hash(config: Config) -> str:
+    """Hash of the tables that shape the build output."""
+    tables = (
+        BUILD_VERSION,
+        config.unicode.exclude_ranges,
+        config.unicode.exclude_points,
+        config.unicode.grouping,
+        group_patterns,
+    )
+    return hash_text(repr(tables))
+
+
+def get_cache_inputs(config: Config, manifest: CacheManifest) -> dict[str, str | None]:
+    """Return the input hashes of the cache for the configured locale
+    without downloading anything - unknown sources are None."""
+    inputs: dict[str, str | None] = {"tables": get_tables_hash(config)}
+    for name, (url, local_file) in get_sources(config).items():
+        inputs[name] = manifest.source_hash(url, local_file)
+    return inputs
+
+
+def read_unicode_annotations(file_path: str) -> dict[str, dict[str, str]]:
+    xml = ET.parse(file_path)
     xml = xml.getroot().find("annotations")
-    unicode_annotations = {}
+    unicode_annotations: dict[str, dict[str, str]] = {}
     if xml is not None:
         for a in xml.findall("annotation"):
             cp = a.attrib.get("cp", "")
@@ -446,7 +681,176 @@ def get_emojis_groups_build_cache(config: Config) -> tuple[list[Emoji], list[Emo
                 unicode_annotations[cp]["name"] = a.text or ""
             else:
                 unicode_annotations[cp] = {"tags": (a.text or "").replace(" | ", ", ")}
-    log.info(f"Loaded {len(unicode_annotations)} annotations from '{unicode_annotations_file}'.")
+    return unicode_annotations
+
+
+def read_locale_texts(
+    emojibase_file: str, annotations_file: str
+) -> tuple[dict[str, tuple[str, str]], dict[str, dict[str, str]]]:
+    """Return the (name, tags) of the emojibase emojis by hexcode and the
+    annotations by char of another locale."""
+    import json
+
+    with open(emojibase_file, encoding="utf-8") as f:
+        data = json.load(f)
+    labels = {item["hexcode"]: (item["label"], ", ".join(item.get("tags", []))) for item in data}
+    return (labels, read_unicode_annotations(annotations_file))
+
+
+def get_alternatives(
+    emojis: list[Emoji],
+    locale_texts: list[tuple[dict[str, tuple[str, str]], dict[str, dict[str, str]]]],
+    symbol_names: dict[str, str],
+) -> list[list[tuple[str, str]]]:
+    """Return the lowercase (name, tags) of each emoji in the other locales,
+    leaving out the ones equal to the emoji's own. Symbols without an
+    annotation keep their UnicodeData name."""
+    alternatives: list[list[tuple[str, str]]] = []
+    for e in emojis:
+        seen = {(e.name.lower(), e.tags.lower())}
+        emoji_alternatives: list[tuple[str, str]] = []
+        for labels, annotations in locale_texts:
+            text = labels.get(e.unicode)
+            if text is None:
+                annotation = annotations.get(e.char, {})
+                text = (
+                    annotation.get("name") or symbol_names.get(e.unicode, ""),
+                    annotation.get("tags", ""),
+                )
+            alternative = (text[0].lower(), text[1].lower())
+            if any(alternative) and alternative not in seen:
+                seen.add(alternative)
+                emoji_alternatives.append(alternative)
+        alternatives.append(emoji_alternatives)
+    return alternatives
+
+
+def run_stage[T](name: str, func: Callable[..., T], *args) -> T:
+    """Run a build stage in this process and log its duration."""
+    (result, duration) = timed_call(func, *args)
+    log.info(f"Build stage '{name}' took {duration * 1000:.0f} ms.")
+    return result
+
+
+def build_stage(name: str, sources: list[Future], pool: Executor, func: Callable, *args):
+    """Wait for the sources of a stage, run it in pool and log its duration."""
+    for source in sources:
+        source.result()
+    (result, duration) = pool.submit(timed_call, func, *args).result()
+    log.info(f"Build stage '{name}' took {duration * 1000:.0f} ms.")
+    return result
+
+
+def get_emojis_groups_build_cache(
+    config: Config, manifest: CacheManifest | None = None, parallel: bool = True
+) -> tuple[list[Emoji], list[Emoji]]:
+    """Build and write the caches for the configured locale.
+
+    Downloads run on a thread pool and parsing on a process pool, each
+    stage as soon as its sources are there. Results are merged in a fixed
+    order, so the output does not depend on which stage finishes first.
+    With a single CPU the parsing runs on a thread, as starting processes
+    that import the frontend again costs more than parsing in parallel
+    saves."""
+    if manifest is None:
+        manifest = CacheManifest(get_cache_file("manifest.json"))
+    locale = get_locale(config)
+    sources = get_sources(config)
+    emojibase_data = get_cache_file("emojibase/")
+    unicode_data = sources["unicode-data.txt"][1]
+    unicode_annotations_file = sources[f"{locale}-annotations.xml"][1]
+    classifier = CodepointClassifier.from_config(config)
+
+    cpu_count = os.cpu_count() or 1
+    io_pool: Executor = ThreadPoolExecutor(max_workers=len(sources) + 3 if parallel else 1)
+    cpu_pool: Executor
+    if parallel and cpu_count > 1:
+        cpu_pool = ProcessPoolExecutor(
+            max_workers=min(cpu_count, 3), mp_context=multiprocessing.get_context("spawn")
+        )
+    else:
+        cpu_pool = ThreadPoolExecutor(max_workers=1)
+    with io_pool, cpu_pool:
+        fetched = {
+            name: io_pool.submit(manifest.fetch, url, local_file)
+            for name, (url, local_file) in sources.items()
+        }
+        emojibase_sources = [f for name, f in fetched.items() if name.startswith("emojibase/")]
+        emojibase_stage = io_pool.submit(
+            build_stage,
+            "emojibase",
+            emojibase_sources,
+            cpu_pool,
+            read_emojibase_data,
+            emojibase_data,
+            locale,
+            classifier,
+        )
+        unicode_stage = io_pool.submit(
+            build_stage,
+            "unicode data",
+            [fetched["unicode-data.txt"]],
+            cpu_pool,
+            read_unicode_data,
+            unicode_data,
+            classifier,
+        )
+        annotations_stage = io_pool.submit(
+            build_stage,
+            "annotations",
+            [fetched[f"{locale}-annotations.xml"]],
+            cpu_pool,
+            read_unicode_annotations,
+            unicode_annotations_file,
+        )
+        locale_stages = [
+            io_pool.submit(
+                build_stage,
+                f"{lc} texts",
+                [fetched[f"emojibase/{lc}-data.raw.json"], fetched[f"{lc}-annotations.xml"]],
+                cpu_pool,
+                read_locale_texts,
+                sources[f"emojibase/{lc}-data.raw.json"][1],
+                sources[f"{lc}-annotations.xml"][1],
+            )
+            for lc in get_search_locales(config)
+        ]
+        inputs: dict[str, str] = {"tables": get_tables_hash(config)}
+        for name, future in fetched.items():
+            inputs[name] = future.result()
+
+        (base_emojis, lc_map) = emojibase_stage.result()
+        log.info(f"Loaded {len(base_emojis)} emojis from '{emojibase_data}'.")
+        variants = 0
+        for e in base_emojis:
+            if e.emojis:
+                variants += len(e.emojis)
+        log.info(f"{variants} variants found.")
+        log.info(f"A total of {len(base_emojis) + variants} emojis.")
+
+        # squash emojis - we require EN locale here
+        emojis = run_stage("squash", squash_gender_emojis, base_emojis)
+        log.info(f"Squashed into {len(emojis)} grouped emojis.")
+
+        emojibase_set = set(e.unicode for e in base_emojis)
+        unicode_emojis = unicode_stage.result()
+        symbol_count = len(unicode_emojis)
+        unicode_emojis = [e for e in unicode_emojis if e.unicode not in emojibase_set]
+        duplicates = symbol_count - len(unicode_emojis)
+        log.info(
+            f"Loaded {len(unicode_emojis)} symbols from '{unicode_data}',"
+            f" {duplicates} duplicates of emojibase dropped."
+        )
+
+        unicode_annotations = annotations_stage.result()
+        log.info(
+            f"Loaded {len(unicode_annotations)} annotations from '{unicode_annotations_file}'."
+        )
+        locale_texts = [stage.result() for stage in locale_stages]
+
+    # UnicodeData names, i.e. English ones, before annotations replace them
+    symbol_names = {e.unicode: e.name for e in unicode_emojis}
+
     for e in unicode_emojis:
         if e.char in unicode_annotations:
             ann = unicode_annotations[e.char]
@@ -458,7 +862,7 @@ def get_emojis_groups_build_cache(config: Config) -> tuple[list[Emoji], list[Emo
     emojis.extend(unicode_emojis)
     log.info(f"{len(emojis)} emojis and symbols collected.")
 
-    groups = get_grouped_emojis(emojis)
+    groups = run_stage("grouping", get_grouped_emojis, emojis)
     log.info(f"Grouped into {len(groups)} groups.")
 
     # now fix locale names - they are still EN
@@ -466,7 +870,7 @@ def get_emojis_groups_build_cache(config: Config) -> tuple[list[Emoji], list[Emo
     fix_locale_names(lc_map, groups)
 
     # write cache files
-    emoji_cache_file = get_cache_file("emojis-cache.txt")
+    emoji_cache_file = get_locale_cache_file(config, "emojis-cache.txt")
     with open(emoji_cache_file, "w", encoding="utf-8") as f:
         for e in emojis:
             f.write(f"{e.char};{e.unicode};{e.name};{e.group};{e.subgroup};{e.tags}\n")
@@ -476,7 +880,7 @@ def get_emojis_groups_build_cache(config: Config) -> tuple[list[Emoji], list[Emo
                     f.write(f"\t\t{e.char};{e.unicode};{e.name};{e.group};{e.subgroup};{e.tags}\n")
                     assert len(e.emojis) == 0
 
-    group_cache_file = get_cache_file("groups-cache.txt")
+    group_cache_file = get_locale_cache_file(config, "groups-cache.txt")
     with open(group_cache_file, "w", encoding="utf-8") as f:
         for g in groups:
             emojis_in_group = ",".join(e.unicode for e in g.emojis)
@@ -484,12 +888,44 @@ def get_emojis_groups_build_cache(config: Config) -> tuple[list[Emoji], list[Emo
 
     log.info(f"Caches written to '{emoji_cache_file}' and '{group_cache_file}'.")
 
+    from emojidb import write_emoji_db
+    from searchindex import write_search_index
+
+    write_emoji_db(get_locale_cache_file(config, "emojis.db"), emojis, groups)
+    alternatives = run_stage("alternatives", get_alternatives, emojis, locale_texts, symbol_names)
+    write_search_index(get_locale_cache_file(config, "search.idx"), emojis, alternatives)
+
+    manifest.record(get_locale(config), inputs)
+    manifest.save()
+    remove_unlocalized_caches()
+
     return (emojis, groups)
 
 
+def parse_variant_lines(lines: str) -> list[Emoji]:
+    """Parse the tab indented variant lines of one emoji in the emoji cache file."""
+    variants: list[Emoji] = []
+    for line in lines.splitlines():
+        (char, unicode, name, group, subgroup, tags) = line.strip().split(";")
+        e = Emoji(char, unicode, group, subgroup, name, tags)
+        if line.startswith("\t\t"):
+            if not variants[-1].mark:
+                variants[-1].mark = "🟤"
+            variants[-1].append(e)
+        else:
+            variants.append(e)
+    return variants
+
+
+def read_variant_lines(cache_file: str, start: int, end: int) -> list[Emoji]:
+    with open(cache_file, "rb") as f:
+        f.seek(start)
+        return parse_variant_lines(f.read(end - start).decode())
+
+
 def get_cached_emojis_groups(config: Config) -> tuple[list[Emoji], list[Emoji]] | None:
-    group_cache_file = get_cache_file("groups-cache.txt")
-    emoji_cache_file = get_cache_file("emojis-cache.txt")
+    group_cache_file = get_locale_cache_file(config, "groups-cache.txt")
+    emoji_cache_file = get_locale_cache_file(config, "emojis-cache.txt")
     if not (os.path.exists(emoji_cache_file) and os.path.exists(group_cache_file)):
         return None
 
@@ -505,35 +941,58 @@ def get_cached_emojis_groups(config: Config) -> tuple[list[Emoji], list[Emoji]]
     log.info(f"Emoji group cache file '{group_cache_file}' loaded.")
 
     emojis: list[Emoji] = []
-    with open(emoji_cache_file, encoding="utf-8") as f:
-        for line in f:
-            is_variant = line.startswith("\t")
-            is_variant2 = line.startswith("\t\t")
-            (char, unicode, name, group, subgroup, tags) = line.strip().split(";")
-            e = Emoji(char, unicode, group, subgroup, name, tags)
-            if is_variant2:
-                if not emojis[-1].emojis[-1].mark:
-                    emojis[-1].emojis[-1].mark = "🟤"
-                emojis[-1].emojis[-1].append(e)
-            elif is_variant:
-                if not emojis[-1].mark:
-                    emojis[-1].mark = "🟤"
-                emojis[-1].append(e)
-            else:
-                emojis.append(e)
-                group_map[e.unicode].append(e)
+    with open(emoji_cache_file, "rb") as f:
+        lines = f.read().split(b"\n")
+    # variant lines are only read again and parsed when their board is opened
+    pos = 0
+    variants_start = 0
+    count = 0
+    for raw_line in lines:
+        if raw_line.startswith(b"\t"):
+            if not raw_line.startswith(b"\t\t"):
+                count += 1
+        else:
+            if count:
+                emojis[-1].emojis = LazyEmojis(
+                    count, partial(read_variant_lines, emoji_cache_file, variants_start, pos)
+                )
+                emojis[-1].mark = "🟤"
+                count = 0
+            if raw_line:
+                fields = raw_line.rstrip(b"\r").decode().split(";")
+                (char, unicode, name, group, subgroup, tags) = fields
+                emoji = Emoji(char, unicode, group, subgroup, name, tags)
+                emojis.append(emoji)
+                group_map[emoji.unicode].append(emoji)
+            variants_start = pos + len(raw_line) + 1
+        pos += len(raw_line) + 1
     log.info(f"Emoji cache file '{emoji_cache_file}' loaded.")
 
     return (emojis, groups)
 
 
-def get_emojis_groups(config: Config) -> tuple[list[Emoji], list[Emoji]]:
-    if os.getenv("EMOJI_KBD_DEV", "").split(",").count("no_cache") == 0:
-        result = get_cached_emojis_groups(config)
-        if result is not None:
-            return result
+def get_db_emojis_groups(config: Config) -> tuple[Sequence[Emoji], list[Emoji]] | None:
+    from emojidb import load_emoji_db
+
+    return load_emoji_db(get_locale_cache_file(config, "emojis.db"))
+
+
+def get_emojis_groups(config: Config) -> tuple[Sequence[Emoji], list[Emoji]]:
+    manifest = CacheManifest(get_cache_file("manifest.json"))
+    dev_flags = os.getenv("EMOJI_KBD_DEV", "").split(",")
+    if "no_cache" not in dev_flags:
+        is_current = manifest.is_current(get_locale(config), get_cache_inputs(config, manifest))
+        if manifest.changed:
+            # keep the stats of sources hashed again, so they are not hashed on every start
+            manifest.save()
+        if is_current:
+            result = get_db_emojis_groups(config) or get_cached_emojis_groups(config)
+            if result is not None:
+                return result
+        else:
+            log.info(f"Emoji cache for locale '{get_locale(config)}' is outdated.")
     log.info("Rebuild of emoji cache.")
-    return get_emojis_groups_build_cache(config)
+    return get_emojis_groups_build_cache(config, manifest, "no_parallel" not in dev_flags)
 
 
 def main():
@@ -0,0 +1,83 @@
+import re
+from collections.abc import Iterable
+
+# Typo tolerant lookup of the words in emoji names and tags.
+#
+# The vocabulary is stored in a trie that is walked like a Levenshtein
+# automaton: each trie node carries the edit distance row of its prefix
+# against the looked up word, and a branch is cut as soon as every entry of
+# the row exceeds the allowed distance. Shared prefixes are computed once
+# and most of the trie is never visited for distances of 1 or 2.
+#
+# Swapping two adjacent characters counts as one edit (optimal string
+# alignment distance), as that is the most common typo, e.g. "smiel".
+
+WORD = re.compile(r"[^\W_]+")
+
+# Words shorter than this are never looked up or returned fuzzily
+MIN_LENGTH = 3
+
+# key of the word stored at a trie node, never a character
+_END = ""
+
+
+def words(texts: Iterable[str]) -> set[str]:
+    """All words of at least MIN_LENGTH characters in texts."""
+    result: set[str] = set()
+    for text in texts:
+        result.update(w for w in WORD.findall(text) if len(w) >= MIN_LENGTH)
+    return result
+
+
+def max_distance(word: str) -> int:
+    """Edit distance tolerated for word, more for longer words."""
+    if len(word) < MIN_LENGTH:
+        return 0
+    return 1 if len(word) < 5 else 2
+
+
+class FuzzyIndex:
+    """Trie of a word vocabulary for lookups within an edit distance."""
+
+    def __init__(self, vocabulary: Iterable[str]):
+        self._trie: dict = {}
+        self.size = 0
+        for word in vocabulary:
+            node = self._trie
+            for c in word:
+                node = node.setdefault(c, {})
+            if _END not in node:
+                node[_END] = word
+                self.size += 1
+
+    def lookup(self, word: str, distance: int) -> list[tuple[str, int]]:
+        """Return the (word, edit distance) pairs of the vocabulary within
+        distance of word, closest first."""
+        results: list[tuple[str, int]] = []
+        columns = range(1, len(word) + 1)
+        # trie node, its row, the row and character of its parent
+        stack: list[tuple[dict, list[int], list[int], str]] = [
+            (self._trie, list(range(len(word) + 1)), [], _END)
+        ]
+        while stack:
+            (node, previous, before, previous_c) = stack.pop()
+            for c, child in node.items():
+                if c == _END:
+                    continue
+                row = [previous[0] + 1]
+                for j in columns:
+                    cost = min(
+                        row[j - 1] + 1,
+                        previous[j] + 1,
+                        previous[j - 1] + (word[j - 1] != c),
+                    )
+                    if j > 1 and word[j - 1] == previous_c and word[j - 2] == c:
+                        cost = min(cost, before[j - 2] + 1)
+                    row.append(cost)
+                if row[-1] <= distance and _END in child:
+                    results.append((child[_END], row[-1]))
+                # a swap never gets below the row minimum, so this cut is safe
+                if min(row) <= distance:
+                    stack.append((child, row, previous, c))
+        results.sort(key=lambda r: (r[1], r[0]))
+        return results
@@ -188,6 +188,7 @@ def start_daemon(config):
     server.start_server()
 
     log.info("Starting Qt event loop")
+    app.aboutToQuit.connect(window.board.close)
 
     sys.exit(app.exec())
 
@@ -3,9 +3,10 @@ import os
 import re
 import sys
 import time
+from pathlib import Path
 
 import qdarkstyle
-from PyQt6.QtCore import QEvent, QObject, QRectF, Qt
+from PyQt6.QtCore import QEvent, QFileSystemWatcher, QObject, QRectF, Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import (
     QColor,
     QFont,
@@ -30,6 +31,7 @@ from PyQt6.QtWidgets import (
 from board import make_board
 from config import Config, load_config
 from emojis import Emoji, get_emojis_groups, special_name_map
+from search import SearchResult, SearchWorker
 from tools import download_if_missing, get_cache_file, get_state_file
 
 focus_color = QColor("#3399FF")  # default focus color
@@ -37,11 +39,30 @@ focus_color = QColor("#3399FF")  # default focus color
 emoji_font_family = "Segoe UI Emoji"  # Default fallback
 
 
+# keys in the search field acting on the board
+board_keys = {
+    Qt.Key.Key_Return,
+    Qt.Key.Key_Enter,
+    Qt.Key.Key_Tab,
+    Qt.Key.Key_Left,
+    Qt.Key.Key_Right,
+    Qt.Key.Key_Up,
+    Qt.Key.Key_Down,
+    Qt.Key.Key_Home,
+    Qt.Key.Key_End,
+    Qt.Key.Key_PageUp,
+    Qt.Key.Key_PageDown,
+}
+
+
 def winlin(win, lin):
     return win if sys.platform == "win32" else lin
 
 
 class KeyboardWidget(QWidget):
+    # emitted by the search worker thread, delivered on the UI thread
+    search_done = pyqtSignal(int, object)
+
     def __init__(self, config) -> None:
         super().__init__()
         log.info("Creating main window...")
@@ -60,6 +81,31 @@ class KeyboardWidget(QWidget):
         self.last_scroll_time = 0
         self.keep_focus = False
 
+        # Searches run on a worker while typing, results of outdated
+        # generations are dropped when they arrive.
+        self.search_worker: SearchWorker | None = None
+        if config.gui.search_async:
+            self.search_worker = SearchWorker(self.board.search_engine, self.search_done.emit)
+        self.search_done.connect(self.show_search_result)
+        self.search_shown = 0  # generation on the board
+        self.search_submitted: str | None = None
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(config.gui.search_delay)
+        self.search_timer.timeout.connect(self.submit_search)
+        # time of the last keystroke in the search field until its result is painted
+        self.search_typed: float | None = None
+        self.search_painted = False
+        self.search_latency = 0.0
+
+        # Other instances change the recent list, e.g. the terminal one.
+        # Replaced files are no longer watched, their directory tells when
+        # they are back.
+        self.recent_watcher = QFileSystemWatcher(self)
+        self.watch_recent()
+        self.recent_watcher.fileChanged.connect(self.refresh_recent)
+        self.recent_watcher.directoryChanged.connect(self.refresh_recent)
+
         self.initUI()
         log.info("Creating main window done.")
 
@@ -124,6 +170,14 @@ class KeyboardWidget(QWidget):
         self.resize(self.config.gui.width, self.config.gui.height)
 
     def paintEvent(self, _event):  # type: ignore
+        self.paint_board()
+        if self.search_painted and self.search_typed is not None:
+            self.search_latency = time.perf_counter() - self.search_typed
+            log.debug(f"Search painted {self.search_latency * 1000:.1f} ms after keystroke.")
+            self.search_typed = None
+        self.search_painted = False
+
+    def paint_board(self):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
 
@@ -153,8 +207,8 @@ class KeyboardWidget(QWidget):
         self.key_width = key_width
         self.key_height = key_height
 
-        for row in self.board.rows:
-            for key in row:
+        for row in self.board.page.rows():
+            for key, e in row:
                 if key != " ":
                     # Draw key outline
                     rect = QRectF(int(x) + 0.5, int(y) + 0.5, int(key_width), int(key_height))
@@ -174,7 +228,6 @@ class KeyboardWidget(QWidget):
                     # Draw key content
                     painter.setPen(self.palette().text().color())
 
-                    e = self.board.get_emoji_for_key(key)
                     if e:
                         # Draw emoji
                         char = e.char
@@ -226,10 +279,58 @@ class KeyboardWidget(QWidget):
             y += key_height + padding
 
     def search_emojis(self, needle: str):
-        self.board.search(needle)
+        self.search_typed = time.perf_counter()
+        self.search_painted = False
+        if self.search_worker:
+            # search the first keystroke right away and the last one of
+            # quickly typed ones after a pause
+            if not self.search_timer.isActive():
+                self.submit_search()
+            self.search_timer.start()
+        else:
+            self.board.search(needle)
+            self.show_search_status()
+
+    def submit_search(self):
+        needle = self.search_field.text()
+        if self.search_worker and needle != self.search_submitted:
+            self.search_submitted = needle
+            self.search_worker.submit(needle)
+
+    def show_search_result(self, generation: int, result: SearchResult):
+        if not self.search_worker or generation != self.search_worker.generation:
+            return  # outdated or cancelled meanwhile
+        self.search_shown = generation
+        self.board.show_search(result)
+        self.show_search_status()
+
+    def show_search_status(self):
+        self.search_painted = True
         self.show_status(self.board.get_emoji())
         self.update()
 
+    def cancel_search(self):
+        """Drop the pending and running searches."""
+        self.search_timer.stop()
+        self.search_submitted = None
+        if self.search_worker:
+            self.search_shown = self.search_worker.cancel()
+
+    def flush_search(self):
+        """Search the current text right away if its result has not been shown yet."""
+        if self.search_worker and (
+            self.search_field.text() != self.search_submitted
+            or self.search_shown != self.search_worker.generation
+        ):
+            self.search_now()
+            self.show_search_status()
+
+    def search_now(self):
+        """Search the current text on the UI thread instead of the worker."""
+        self.cancel_search()
+        self.search_submitted = self.search_field.text()
+        self.board.search(self.search_submitted)
+
     def copy_to_clipboard(self):
         clipboard = QApplication.clipboard()
         if clipboard:
@@ -244,7 +345,7 @@ class KeyboardWidget(QWidget):
             msgs.append(obj)
         elif isinstance(obj, Emoji):
             if self.board.is_search:
-                msgs.append(f"Score {obj.order}")
+                msgs.append(f"Score {self.board.get_score()}")
             if obj.emojis:
                 msgs.append(f"{len(obj.emojis)} emojis")
             msgs.append(f"{obj.char}")
@@ -262,6 +363,8 @@ class KeyboardWidget(QWidget):
         self.status_label.setText("; ".join(msgs))
 
     def handle_focus_change(self, old, new):  # type: ignore
+        if old == self.search_field:
+            self.cancel_search()
         if new == self.emoji_input_field:
             if self.board.is_search:
                 self.board.pop_board()
@@ -271,7 +374,7 @@ class KeyboardWidget(QWidget):
             )
         elif new == self.search_field:
             self.search_field.selectAll()
-            self.board.search(self.search_field.text())
+            self.search_now()
             self.show_status(
                 "Search emojis by name and tag, with '#' prefix by tag and '+' prefix by code. "
                 "Use ',' to search group and/or subgroup, e.g. 'animal,', ',mammal' or 'ani,mam'."
@@ -326,7 +429,24 @@ class KeyboardWidget(QWidget):
         self.show_status(self.board.get_emoji())
         self.update()
 
+    def watch_recent(self):
+        files = self.board.recent_files
+        watched = self.recent_watcher.files() + self.recent_watcher.directories()
+        paths = [str(Path(files[0]).parent), *files]
+        missing = [p for p in paths if p not in watched and Path(p).exists()]
+        if missing:
+            self.recent_watcher.addPaths(missing)
+
+    def refresh_recent(self, path: str):
+        self.watch_recent()
+        if self.board.refresh_recent():
+            log.info(f"Recent list changed by another instance in '{path}'.")
+            if self.board.is_recent:
+                self.show_status(self.board.get_emoji())
+            self.update()
+
     def handle_close(self):
+        log.info(self.board.search_engine.cache.stats())
         self.copy_to_clipboard()
         try:
             print(self.emoji_input_field.text())
@@ -336,6 +456,9 @@ class KeyboardWidget(QWidget):
 
     def quit(self):
         log.info("Quitting Emoji Kbd...")
+        if self.search_worker:
+            self.search_worker.close()
+        self.board.close()
         self.close()
         QApplication.quit()
 
@@ -345,6 +468,10 @@ class KeyboardWidget(QWidget):
         is_shift = event.modifiers() == Qt.KeyboardModifier.ShiftModifier
         is_control = event.modifiers() == Qt.KeyboardModifier.ControlModifier
 
+        if source is self.search_field and key in board_keys:
+            # act on the result of what was typed, not on an outdated one
+            self.flush_search()
+
         if (
             source in (self, self.emoji_input_field)
             and event.modifiers() == Qt.KeyboardModifier.NoModifier
@@ -0,0 +1,247 @@
+import logging as log
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from recent import BOOST, FAVORITE, codepoints, from_codepoints
+from tools import get_state_file
+
+# Every use of an emoji with its time and frontend, in an SQLite database
+# in WAL mode shared by all running instances.
+#
+# Besides the uses, each use updates two small tables in place, so a use
+# costs the same however long the history is and nothing needs to read
+# the whole history:
+#   ranks  per emoji a score decaying with later uses like in RecentList,
+#          the top of it is what the recent list would show without
+#          moves by hand, and the count of uses. Favorites toggled and
+#          emojis deleted in the recent list are set here too, deleted
+#          ones are hidden until used again.
+#   hours  uses per hour of the day and frontend
+# The epoch of a use is its row id, so a score is that set at the last
+# use less the uses since, at least 0, unless it reached FAVORITE. As in
+# RecentList favorites come first in the order they became one, then the
+# others by score, earlier set first on ties.
+#
+# Writes wait at most WRITE_TIMEOUT for another instance holding the
+# write lock, then the use or change is logged and dropped, so a
+# frontend never freezes on it.
+
+SCHEMA_VERSION = 2
+WRITE_TIMEOUT = 0.2  # s
+OPEN_TIMEOUT = 10  # s
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS uses (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    frontend TEXT NOT NULL,
+    emoji TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ranks (
+    emoji TEXT PRIMARY KEY,
+    score INTEGER NOT NULL,
+    epoch INTEGER NOT NULL,
+    uses INTEGER NOT NULL,
+    last REAL NOT NULL,
+    hidden INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ranks_order ON ranks (
+    score >= {FAVORITE} DESC,
+    CASE WHEN score >= {FAVORITE} THEN -epoch ELSE score + epoch END DESC,
+    epoch
+);
+CREATE INDEX IF NOT EXISTS ranks_uses ON ranks (uses DESC);
+CREATE TABLE IF NOT EXISTS hours (
+    hour INTEGER NOT NULL,
+    frontend TEXT NOT NULL,
+    uses INTEGER NOT NULL,
+    PRIMARY KEY (hour, frontend)
+) WITHOUT ROWID;
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+
+def _decayed(epoch: str) -> str:
+    """SQL for the score of a rank at epoch."""
+    return f"CASE WHEN score >= {FAVORITE} THEN score ELSE max(score - ({epoch} - epoch), 0) END"
+
+
+RECORD_RANK = f"""
+INSERT INTO ranks (emoji, score, epoch, uses, last) VALUES (:emoji, {BOOST}, :epoch, 1, :time)
+ON CONFLICT (emoji) DO UPDATE SET
+    score = min(CASE WHEN hidden THEN 0 ELSE {_decayed(":epoch - 1")} END + {BOOST}, {FAVORITE}),
+    epoch = CASE WHEN score >= {FAVORITE} AND NOT hidden THEN epoch ELSE :epoch END,
+    uses = uses + 1,
+    last = :time,
+    hidden = 0
+"""
+
+SET_FAVORITE = """
+INSERT INTO ranks (emoji, score, epoch, uses, last)
+VALUES (:emoji, :score, (SELECT coalesce(max(id), 0) FROM uses), 0, :time)
+ON CONFLICT (emoji) DO UPDATE SET score = :score, epoch = excluded.epoch, hidden = 0
+"""
+
+RECORD_HOUR = """
+INSERT INTO hours (hour, frontend, uses) VALUES (:hour, :frontend, 1)
+ON CONFLICT (hour, frontend) DO UPDATE SET uses = uses + 1
+"""
+
+TOP = f"""
+SELECT emoji, {_decayed("(SELECT max(id) FROM uses)")} FROM ranks
+WHERE NOT hidden
+ORDER BY
+    score >= {FAVORITE} DESC,
+    CASE WHEN score >= {FAVORITE} THEN -epoch ELSE score + epoch END DESC,
+    epoch
+LIMIT :count
+"""
+
+
+class UsageHistory:
+    """The uses of emojis recorded by all frontends, see above.
+
+    Records of this process are attributed to frontend, by default the
+    name of the program."""
+
+    def __init__(self, path: str, frontend: str = ""):
+        self.path = path
+        self.frontend = frontend or Path(sys.argv[0]).stem
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=OPEN_TIMEOUT, isolation_level=None, check_same_thread=False
+        )
+        try:
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+            self._db.execute("BEGIN IMMEDIATE")
+            (version,) = self._db.execute("PRAGMA user_version").fetchone()
+            if version == 1:
+                self._db.execute("ALTER TABLE ranks ADD COLUMN hidden INTEGER NOT NULL DEFAULT 0")
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            elif version not in (0, SCHEMA_VERSION):
+                raise sqlite3.DatabaseError(f"unknown schema version {version}")
+            self._db.execute("COMMIT")
+            self._db.executescript(SCHEMA)
+            self._db.execute(f"PRAGMA busy_timeout = {int(WRITE_TIMEOUT * 1000)}")
+        except sqlite3.Error:
+            self._db.close()
+            raise
+
+    def _write(self, action: str, statements: Callable[[], object]):
+        """Run statements in a write transaction, log and drop it on errors."""
+        with self._lock:
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+                statements()
+                self._db.execute("COMMIT")
+            except sqlite3.Error as ex:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                log.error(f"{action} in '{self.path}' dropped: {ex}")
+
+    def record(self, char: str, when: float | None = None):
+        """Record a use of the emoji with char, now or at the time when."""
+        when = time.time() if when is None else when
+        emoji = codepoints(char)
+
+        def statements():
+            cursor = self._db.execute(
+                "INSERT INTO uses (time, frontend, emoji) VALUES (?, ?, ?)",
+                (when, self.frontend, emoji),
+            )
+            params = {"emoji": emoji, "epoch": cursor.lastrowid, "time": when}
+            self._db.execute(RECORD_RANK, params)
+            hour = time.localtime(when).tm_hour
+            self._db.execute(RECORD_HOUR, {"hour": hour, "frontend": self.frontend})
+
+        self._write("Recording emoji use", statements)
+
+    def set_favorite(self, char: str, favorite: bool):
+        """Make the emoji with char a favorite or remove its score, like
+        toggling it in the recent list."""
+        params = {
+            "emoji": codepoints(char),
+            "score": FAVORITE if favorite else 0,
+            "time": time.time(),
+        }
+        self._write("Setting favorite", lambda: self._db.execute(SET_FAVORITE, params))
+
+    def hide(self, char: str):
+        """Leave the emoji with char out of the top until it is used again,
+        like deleting it from the recent list."""
+        sql = "UPDATE ranks SET hidden = 1 WHERE emoji = ?"
+        self._write("Hiding emoji", lambda: self._db.execute(sql, (codepoints(char),)))
+
+    def _query(self, sql: str, params: dict | tuple = ()) -> list[tuple]:
+        with self._lock:
+            try:
+                return self._db.execute(sql, params).fetchall()
+            except sqlite3.Error as ex:
+                log.error(f"Reading '{self.path}': {ex}")
+                return []
+
+    def epoch(self) -> int:
+        """The number of uses recorded."""
+        rows = self._query("SELECT max(id) FROM uses")
+        return (rows[0][0] or 0) if rows else 0
+
+    def top(self, count: int) -> list[tuple[str, int]]:
+        """(char, order) of the count highest ranked emojis, as a recent
+        list of that size would show them after sorting."""
+        rows = self._query(TOP, {"count": count})
+        return [(from_codepoints(emoji), order) for (emoji, order) in rows]
+
+    def most_used(self, count: int) -> list[tuple[str, int]]:
+        """(char, uses) of the count most used emojis."""
+        rows = self._query("SELECT emoji, uses FROM ranks ORDER BY uses DESC LIMIT ?", (count,))
+        return [(from_codepoints(emoji), uses) for (emoji, uses) in rows]
+
+    def uses_by_hour(self) -> list[int]:
+        """The uses in each hour of the day, local time."""
+        hours = [0] * 24
+        for hour, uses in self._query("SELECT hour, sum(uses) FROM hours GROUP BY hour"):
+            hours[hour] = uses
+        return hours
+
+    def uses_by_frontend(self) -> dict[str, int]:
+        rows = self._query(
+            "SELECT frontend, sum(uses) AS n FROM hours GROUP BY frontend ORDER BY n DESC"
+        )
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_history(path: str, frontend: str = "") -> UsageHistory | None:
+    """The usage history at path or None if it cannot be used."""
+    try:
+        return UsageHistory(path, frontend)
+    except sqlite3.Error as ex:
+        log.error(f"Opening usage history '{path}': {ex}")
+        return None
+
+
+def main():
+    """Print statistics of the usage history."""
+    history = open_history(get_state_file("history.db"))
+    if history is None:
+        sys.exit(1)
+    print(f"{history.epoch()} uses")
+    print("Most used:", " ".join(f"{char} {uses}" for (char, uses) in history.most_used(20)))
+    hours = history.uses_by_hour()
+    for hour, uses in enumerate(hours):
+        print(f"{hour:02}h {uses:6} {'█' * (uses * 50 // max(max(hours), 1))}")
+    for frontend, uses in history.uses_by_frontend().items():
+        print(f"{frontend}: {uses}")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import atexit
+import logging as log
+import os
+import sys
+import threading
+import time
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock_file(f: BinaryIO):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f: BinaryIO):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(f: BinaryIO):
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+    def _unlock_file(f: BinaryIO):
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# A text file of records kept as a snapshot plus an append-only journal,
+# shared by all processes using it.
+#
+# Each change appends one record line to the journal, fsync'd in batches
+# at most every SYNC_DELAY seconds by a daemon threading.Timer the first
+# record after a sync starts, and at exit. From time to time the records
+# of the current state are written as a new snapshot, replacing the file
+# atomically, and the journal starts over.
+#
+# Every access holds an exclusive lock on a lock file next to the
+# snapshot and first reads the records other processes appended since
+# the last access, so all processes apply the same records in the same
+# order and see each other's changes without reading everything again.
+#
+# The snapshot starts with a "# snapshot <id>" line and the journal with
+# "# snapshot <id> after <previous id>", the id of the snapshot it
+# continues and of the one before. A process that read a journal to its
+# end continues with the next one if that comes after its snapshot, else
+# it reads the new snapshot. A journal of another snapshot was left over
+# by a crash after its snapshot had been replaced, its records are in the
+# snapshot already and it is ignored. A partial last line of a crash
+# mid-write is dropped.
+
+SYNC_DELAY = 1.0  # s
+HEADER = "# snapshot "
+
+# (snapshot records to restart from or None, records to apply)
+type Changes = tuple[list[str] | None, list[str]]
+
+
+# journals not closed yet, synced at exit
+_open_journals: "weakref.WeakSet[Journal]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_journals():
+    for journal in list(_open_journals):
+        journal.flush()
+
+
+def _stat_key(path: str) -> tuple[int, ...]:
+    """Identity and version of the file at path, () if missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return ()
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _file_id(f: BinaryIO) -> tuple[int, ...]:
+    st = os.fstat(f.fileno())
+    return (st.st_dev, st.st_ino)
+
+
+def _complete_lines(data: bytes) -> tuple[list[str], int]:
+    """The complete lines in data and their size in bytes."""
+    size = data.rfind(b"\n") + 1
+    return (data[:size].decode("utf-8").splitlines(), size)
+
+
+def _write_file(path: str, header: str, records: list[str]):
+    """Replace path atomically by the header and records, on disk when done."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(header + "\n")
+        for record in records:
+            f.write(record + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Journal:
+    """Snapshot file at path with a journal of the records appended since.
+
+    All reads and writes happen in a locked() block, which yields the
+    changes made by other processes since the last one, the first time
+    the whole content. Apply them before the own changes, then append()
+    a record per change or compact() with the records of the whole state
+    now and then, see ops. changed() tells cheaply if there is anything
+    new.
+
+    Appended records are synced to disk by a timer sync_delay seconds
+    after the first one since the last flush(), by close() or at exit."""
+
+    def __init__(self, path: str, sync_delay: float = SYNC_DELAY):
+        self.path = path
+        self.journal_path = str(Path(path).with_suffix(".journal"))
+        self.lock_path = str(Path(path).with_suffix(".lock"))
+        self.sync_delay = sync_delay
+        # records in the journal
+        self.ops = 0
+        self._snapshot_id = ""
+        self._snapshot_key: tuple[int, ...] = ()
+        # the journal continuing the snapshot, read up to _position, else
+        # the identity and size of the journal ignored
+        self._file: BinaryIO | None = None
+        self._file_id: tuple[int, ...] = ()
+        self._position = 0
+        self._lock = threading.RLock()
+        self._lock_file: BinaryIO | None = None
+        self._sync_timer: threading.Timer | None = None
+        _open_journals.add(self)
+
+    @contextmanager
+    def locked(self) -> Iterator[Changes]:
+        """Lock the files against other processes and threads and yield the
+        changes since the last call."""
+        with self._lock:
+            if self._lock_file is None:
+                self._lock_file = open(self.lock_path, "a+b")
+            _lock_file(self._lock_file)
+            try:
+                yield self._changes()
+            finally:
+                _unlock_file(self._lock_file)
+
+    def changed(self) -> bool:
+        """Whether another process may have changed the files, without locking."""
+        seen = (*self._file_id, self._position) if self._file_id else ()
+        return (
+            _stat_key(self.path) != self._snapshot_key or _stat_key(self.journal_path)[:3] != seen
+        )
+
+    def _read_records(self) -> list[str]:
+        """The complete records appended to the journal since the last read."""
+        assert self._file
+        self._file.seek(self._position)
+        (records, size) = _complete_lines(self._file.read())
+        self._position += size
+        self.ops += len(records)
+        return records
+
+    def _changes(self) -> Changes:
+        snapshot_key = _stat_key(self.path)
+        journal_key = _stat_key(self.journal_path)
+        records: list[str] = []
+        if self._file is not None:
+            records = self._read_records()
+            if snapshot_key == self._snapshot_key and journal_key[:2] == self._file_id:
+                return (None, records)
+            # compacted by another process
+            self._file.close()
+            self._file = None
+            continued = self._snapshot_id
+        else:
+            continued = None
+
+        try:
+            with open(self.path, "rb") as f:
+                (snapshot, _) = _complete_lines(f.read())
+        except FileNotFoundError:
+            snapshot = []
+        if snapshot and snapshot[0].startswith(HEADER):
+            self._snapshot_id = snapshot.pop(0)[len(HEADER) :]
+        else:
+            # written before there was a journal
+            self._snapshot_id = ""
+        self._snapshot_key = snapshot_key
+        self.ops = 0
+        self._file_id = journal_key[:2]
+        self._position = journal_key[2] if journal_key else 0
+        if not journal_key:
+            return (snapshot, [])
+        self._file = open(self.journal_path, "a+b")
+        self._file_id = _file_id(self._file)
+        self._file.seek(0)
+        header = self._file.readline()
+        # (id, after id) of the journal
+        ids = header.decode("utf-8", "replace").removeprefix(HEADER).split(" after ")
+        if not header.endswith(b"\n") or ids[0].strip() != self._snapshot_id:
+            if header:
+                log.info(f"Ignoring journal '{self.journal_path}' of another snapshot.")
+            # start over with the next append
+            self._file.close()
+            self._file = None
+            return (snapshot, [])
+        self._position = len(header)
+        journal_records = self._read_records()
+        if continued is not None and len(ids) == 2 and ids[1].strip() == continued:
+            return (None, records + journal_records)
+        return (snapshot, journal_records)
+
+    def append(self, record: str):
+        """Append record to the journal, in a locked() block."""
+        if self._file is None:
+            self._restart()
+        assert self._file
+        # drop a partial record of a crashed writer
+        self._file.truncate(self._position)
+        data = (record + "\n").encode("utf-8")
+        self._file.write(data)
+        self._file.flush()
+        self._position += len(data)
+        self.ops += 1
+        if self._sync_timer is None:
+            self._sync_timer = threading.Timer(self.sync_delay, self.flush)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def compact(self, records: list[str]):
+        """Write records as the new snapshot and start an empty journal, in a
+        locked() block after applying its changes."""
+        previous_id = self._snapshot_id
+        self._snapshot_id = f"{time.time_ns():x}"
+        _write_file(self.path, HEADER + self._snapshot_id, records)
+        self._snapshot_key = _stat_key(self.path)
+        self._restart(previous_id)
+
+    def _restart(self, previous_id: str | None = None):
+        """Start an empty journal continuing the snapshot, after previous_id."""
+        if self._file:
+            self._file.close()
+        after = previous_id if previous_id is not None else self._snapshot_id
+        header = f"{HEADER}{self._snapshot_id} after {after}"
+        _write_file(self.journal_path, header, [])
+        self._file = open(self.journal_path, "a+b")
+        self._file_id = _file_id(self._file)
+        self._position = len(header.encode("utf-8")) + 1
+        self.ops = 0
+
+    def flush(self):
+        """Write the appended records to disk now."""
+        with self._lock:
+            if self._sync_timer:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._file:
+                try:
+                    os.fsync(self._file.fileno())
+                except OSError as ex:
+                    log.error(f"Writing '{self.journal_path}': {ex}")
+
+    def close(self):
+        """Sync and close the files, a pending sync timer is cancelled first."""
+        with self._lock:
+            # a timer firing meanwhile waits for the lock and finds no file
+            self.flush()
+            for f in (self._file, self._lock_file):
+                if f:
+                    f.close()
+            self._file = self._lock_file = None
+        _open_journals.discard(self)
@@ -0,0 +1,115 @@
+from functools import cache
+
+type Pos = tuple[int, int]
+
+# the moves of the arrow keys, Home/End and to the first or last row
+STEPS = [(dx, dy) for dx in (-100, -1, 0, 1, 100) for dy in (-100, -1, 0, 1, 100) if dx or dy]
+
+
+class Layout:
+    """A keyboard layout as in LayoutConfig.kbd, a row of keys per line and
+    spaces for gaps, compiled into tables for the board.
+
+    keys are the keys in reading order, the board shows emoji i at keys[i].
+    Every cursor move by one of STEPS from a key is looked up in a table
+    made by step() when compiling."""
+
+    def __init__(self, kbd: str):
+        self.kbd = kbd
+        self.rows = kbd.splitlines()
+        self.height = len(self.rows)
+        self.width = max(len(row) for row in self.rows)
+        self.keys: list[str] = []
+        # key -> index in keys and (x, y), of the first one for a key used twice
+        self.index: dict[str, int] = {}
+        self.positions: dict[str, Pos] = {}
+        # (x, y) -> key and its index in keys
+        self.grid: dict[Pos, str] = {}
+        self.cells: dict[Pos, int] = {}
+        # per row (key, index in keys or None for a gap) of each column
+        self.row_cells: list[list[tuple[str, int | None]]] = []
+        for y, row in enumerate(self.rows):
+            self.row_cells.append([])
+            for x, key in enumerate(row):
+                if key.isspace():
+                    self.row_cells[y].append((" ", None))
+                    continue
+                self.row_cells[y].append((key, len(self.keys)))
+                self.index.setdefault(key, len(self.keys))
+                self.positions.setdefault(key, (x, y))
+                self.grid[(x, y)] = key
+                self.cells[(x, y)] = len(self.keys)
+                self.keys.append(key)
+        # (x, y, dx, dy) -> where a move by one of STEPS from the key at
+        # (x, y) ends, None to stay
+        self.moves: dict[tuple[int, int, int, int], Pos | None] = {
+            (x, y, dx, dy): self.step(x, y, dx, dy) for (x, y) in self.grid for (dx, dy) in STEPS
+        }
+
+    @property
+    def key_count(self) -> int:
+        return len(self.keys)
+
+    def move(self, x: int, y: int, dx: int, dy: int) -> Pos | None:
+        """Where the cursor at (x, y) ends moving by (dx, dy), None to stay."""
+        move = (x, y, dx, dy)
+        if move in self.moves:
+            return self.moves[move]
+        return self.step(x, y, dx, dy)
+
+    def step(self, x: int, y: int, dx: int, dy: int) -> Pos | None:
+        """Move from (x, y) by (dx, dy) to a key, None if there is none.
+        100/-100 jumps to end/start of row/column.
+        Left/right moves at line start/end go to previous/next line.
+        Spaces are skipped in the direction of the move, else to the left
+        or right."""
+        last = self.height - 1
+        while True:
+            x += dx
+            y += dy
+            if dy <= -100:
+                y = 0
+            elif dy >= 100:
+                y = last
+            elif y < 0:
+                y = 0
+            elif y > last:
+                y = last
+
+            row = self.rows[y]
+            if dx <= -100:
+                (x, dx) = (0, 1)
+            elif dx >= 100:
+                (x, dx) = (len(row) - 1, -1)
+            elif x < 0:
+                if y > 0:
+                    y -= 1
+                    row = self.rows[y]
+                    (x, dx) = (len(row) - 1, -1)
+                else:
+                    (x, dx) = (0, 1)
+            elif x > len(row) - 1:
+                if y < last:
+                    y += 1
+                    row = self.rows[y]
+                    (x, dx) = (0, 1)
+                else:
+                    (x, dx) = (len(row) - 1, -1)
+
+            if row[x] != " ":
+                return (x, y)
+            # go on over the space
+            if dy and 0 < y < last:
+                continue
+            if (dy or dx < 0) and x > 0:
+                (dx, dy) = (-1, 0)
+            elif (dy or dx > 0) and x < len(row):
+                (dx, dy) = (1, 0)
+            else:
+                return None
+
+
+@cache
+def compile_layout(kbd: str) -> Layout:
+    """The compiled layout of kbd, compiled once."""
+    return Layout(kbd)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging as log
+import os
+from pathlib import Path
+
+from tools import download
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CacheManifest:
+    """Records where cached sources came from and what built outputs depend on.
+
+    sources maps a local file to its url, sha256 and the stat it was hashed
+    with, so unchanged files are not hashed again on every start.
+    outputs maps an output name, e.g. a locale, to the hashes of its inputs.
+    changed is set when something was recorded since the last save."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sources: dict[str, dict] = {}
+        self.outputs: dict[str, dict[str, str]] = {}
+        self.changed = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.sources = data.get("sources", {})
+            self.outputs = data.get("outputs", {})
+        except FileNotFoundError:
+            pass
+        except Exception as ex:
+            log.warning(f"Ignoring cache manifest '{path}': {ex}")
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources, "outputs": self.outputs}, f, indent=1)
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+    def _record_source(self, url: str, local_file: str) -> str:
+        st = os.stat(local_file)
+        sha256 = hash_file(local_file)
+        self.sources[local_file] = {
+            "url": url,
+            "sha256": sha256,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+        }
+        self.changed = True
+        return sha256
+
+    def source_hash(self, url: str, local_file: str) -> str | None:
+        """Return the hash of a cached source without downloading it.
+
+        None if it is unknown, was downloaded from another url or is missing.
+        A file with another stat is hashed again and recorded with it."""
+        entry = self.sources.get(local_file)
+        if entry is None or entry["url"] != url:
+            return None
+        try:
+            st = os.stat(local_file)
+        except FileNotFoundError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (entry["size"], entry["mtime"]):
+            return self._record_source(url, local_file)
+        sha256: str = entry["sha256"]
+        return sha256
+
+    def fetch(self, url: str, local_file: str) -> str:
+        """Download url unless local_file is already a copy of it and return its hash."""
+        sha256 = self.source_hash(url, local_file)
+        if sha256 is not None:
+            return sha256
+        entry = self.sources.get(local_file)
+        if not Path(local_file).exists() or (entry is not None and entry["url"] != url):
+            try:
+                download(url, local_file)
+            except Exception as e:
+                raise ValueError(f"Failed to download '{url}' to '{local_file}'.") from e
+        return self._record_source(url, local_file)
+
+    def is_current(self, output: str, inputs: dict[str, str | None]) -> bool:
+        if any(h is None for h in inputs.values()):
+            return False
+        return self.outputs.get(output) == inputs
+
+    def record(self, output: str, inputs: dict[str, str]):
+        self.outputs[output] = dict(inputs)
+        self.changed = True
@@ -0,0 +1,160 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+
+from emojis import Emoji
+
+# Recently used emojis ranked by a score.
+#
+# Using an emoji adds BOOST to its score and takes one off the score of
+# every other non favorite entry, favorites have a score of FAVORITE and
+# never decay. Instead of touching every entry on each use, the list
+# counts uses in an epoch and an entry keeps the score and epoch it was
+# last set at: its score is that score less the uses since, at least 0.
+# All entries decay alike, so a use only moves the used entry and the
+# order is kept sorted by a bisect insert.
+
+FAVORITE = 100
+BOOST = 10
+
+
+def codepoints(char: str) -> str:
+    """The codepoint sequence of char, e.g. 1F44D-1F3FB."""
+    return "-".join(f"{ord(c):04X}" for c in char)
+
+
+def from_codepoints(sequence: str) -> str:
+    return "".join(chr(int(c, 16)) for c in sequence.split("-"))
+
+
+def _descending(e: "RecentEmoji") -> int:
+    return -e.order
+
+
+class RecentEmoji(Emoji):
+    """An entry of a RecentList, its order decays with the epoch of the list
+    and its mark shows the order."""
+
+    def __init__(self, recent: "RecentList", emoji: Emoji, order: int = 0):
+        self._recent = recent
+        super().__init__(emoji.char, emoji.unicode, emoji.group, emoji.subgroup, emoji.name)
+        self.tag_list = emoji.tag_list
+        if emoji.emojis:
+            # shared, so the variants of a database emoji stay lazy
+            self.emojis = emoji.emojis
+        self.order = order
+
+    @property
+    def order(self) -> int:
+        if self._score >= FAVORITE:
+            return self._score
+        return max(self._score - (self._recent.epoch - self._epoch), 0)
+
+    @order.setter
+    def order(self, order: int):
+        self._score = order
+        self._epoch = self._recent.epoch
+
+    @property
+    def mark(self) -> str:
+        order = self.order
+        if order >= FAVORITE:
+            return "⭐️"
+        return str(order) if order > 0 else ""
+
+    @mark.setter
+    def mark(self, mark: str):
+        pass  # follows the order
+
+
+class RecentList:
+    """Recently used emojis with at most capacity entries, highest score
+    first unless reordered by hand.
+
+    entries is the visible order and stays the same list object, entries
+    are found by char through an index."""
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        # number of uses so far
+        self.epoch = 0
+        self.entries: list[RecentEmoji] = []
+        self._index: dict[str, RecentEmoji] = {}
+        # whether entries are in score order, else the next sorted use sorts
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[RecentEmoji]:
+        return iter(self.entries)
+
+    def __contains__(self, char: str) -> bool:
+        return char in self._index
+
+    def get(self, char: str) -> RecentEmoji | None:
+        return self._index.get(char)
+
+    def reset(self, emojis: Iterable[tuple[Emoji, int]]):
+        """Replace the entries by the (emoji, order) pairs, in the given order."""
+        self.epoch = 0
+        self.entries[:] = [RecentEmoji(self, e, max(order, 0)) for (e, order) in emojis]
+        self._index = {e.char: e for e in self.entries}
+        self._sorted = False
+
+    def sort(self):
+        """Sort the entries by score, stably."""
+        self.entries.sort(key=_descending)
+        self._sorted = True
+
+    def _position(self, entry: RecentEmoji) -> int:
+        """Index of entry in the sorted entries, searching only its score's run."""
+        order = -entry.order
+        lo = bisect_left(self.entries, order, key=_descending)
+        hi = bisect_right(self.entries, order, lo, key=_descending)
+        return self.entries.index(entry, lo, hi)
+
+    def add(self, emoji: Emoji, no_sort: bool = False) -> RecentEmoji:
+        """Count a use of emoji, adding it if new. With no_sort the entries
+        keep their places and a new one goes last."""
+        entry = self._index.get(emoji.char)
+        if entry is None:
+            entry = self._index[emoji.char] = RecentEmoji(self, emoji)
+            self.entries.append(entry)
+        order = entry.order
+        # favorites keep their score and place
+        moves = order < FAVORITE and not no_sort and self._sorted
+        position = self._position(entry) if moves else None
+        self.epoch += 1
+        if order < FAVORITE:
+            entry.order = min(order + BOOST, FAVORITE)
+        if no_sort:
+            self._sorted = False
+        elif not self._sorted:
+            self.sort()
+        elif position is not None:
+            # the others keep their order, as they all decayed alike
+            del self.entries[position]
+            self.entries.insert(bisect_right(self.entries, -entry.order, key=_descending), entry)
+        for dropped in self.entries[self.capacity :]:
+            del self._index[dropped.char]
+        del self.entries[self.capacity :]
+        return entry
+
+    def toggle_favorite(self, entry: RecentEmoji):
+        """Make entry a favorite or remove its score, without reordering."""
+        entry.order = 0 if entry.order >= FAVORITE else FAVORITE
+        self._sorted = False
+
+    def remove(self, entry: RecentEmoji):
+        self.entries.remove(entry)
+        del self._index[entry.char]
+
+    def move(self, entry: RecentEmoji, direction: int) -> bool:
+        """Swap entry with its neighbor in direction -1 or 1, False at the ends."""
+        i = self.entries.index(entry)
+        j = i + direction
+        if j < 0 or j >= len(self.entries):
+            return False
+        self.entries[i], self.entries[j] = self.entries[j], self.entries[i]
+        self._sorted = False
+        return True
@@ -0,0 +1,541 @@
+import heapq
+import logging as log
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Sequence
+from dataclasses import dataclass, field
+from typing import overload
+
+from emojis import Emoji
+from fuzzy import max_distance
+from searchindex import iter_bits, to_bits
+from store import EmojiStore
+
+
+def match(text: str, needle: str) -> int:
+    """Return the score of needle in text, 0 if text does not contain it."""
+    pos = text.find(needle)
+    if pos == -1:
+        return 0
+    score = 0
+    while pos != -1:
+        score += 1
+        # score match at word start higher
+        if pos == 0:
+            score += 11
+        elif not text[pos - 1].isalnum():
+            score += 7
+        # score match at word end higher
+        end_pos = pos + len(needle)
+        if end_pos == len(text):
+            score += 2
+        elif not text[end_pos].isalnum():
+            score += 1
+        # continue searching
+        pos = text.find(needle, end_pos + 1)
+    return score
+
+
+@dataclass
+class QueryTerm:
+    """One term of a search query.
+
+    kind is "text" for names and tags, "fuzzy" for ~text tolerating typos,
+    "tag" for #tag, "hex" for +HEX code points and "group" for
+    group,subgroup where either part may be empty."""
+
+    kind: str
+    needle: str
+    subgroup: str = ""
+
+    def refines(self, previous: "QueryTerm") -> bool:
+        """Return True if everything matching this term also matches previous."""
+        return (
+            self.kind == previous.kind
+            and self.kind != "fuzzy"
+            and previous.needle in self.needle
+            and previous.subgroup in self.subgroup
+        )
+
+
+def parse_query(needle: str) -> list[QueryTerm]:
+    """Parse a lowercase search needle into its terms, dropping empty ones."""
+    terms: list[QueryTerm] = []
+    for n in needle.split(" "):
+        if "," in n:
+            (group, subgroup) = n.split(",", 1)
+            if group or subgroup:
+                terms.append(QueryTerm("group", group, subgroup))
+        elif n.startswith("+"):
+            if n[1:]:
+                terms.append(QueryTerm("hex", n[1:].upper()))
+        elif n.startswith("#"):
+            if n[1:]:
+                terms.append(QueryTerm("tag", n[1:]))
+        elif n.startswith("~"):
+            if n[1:]:
+                terms.append(QueryTerm("fuzzy", n[1:]))
+        elif n:
+            terms.append(QueryTerm("text", n))
+    return terms
+
+
+class SearchCancelled(Exception):
+    """A search was cancelled before it was done."""
+
+
+# Number of ids ranked at least, about two board pages
+RANK_CHUNK = 128
+
+
+class RankedIds(Sequence[int]):
+    """Ids ranked by score, best first and equal scores in id order.
+
+    Only as many ids are ranked as have been accessed, by a heap selection
+    of the best ones, so showing the first page of thousands of matches
+    does not sort them all. The length is known without any ranking."""
+
+    def __init__(self, ids: Sequence[int], scores: dict[int, int]):
+        self._ids = ids  # ascending
+        self._scores = scores
+        self._ranked: Sequence[int] = ids if not scores else []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _key(self, i: int) -> tuple[int, int]:
+        return (-self._scores.get(i, 0), i)
+
+    def _rank(self, n: int):
+        if n <= len(self._ranked):
+            return
+        n = max(n, 2 * len(self._ranked), RANK_CHUNK)
+        if n * 4 >= len(self._ids):
+            self._ranked = sorted(self._ids, key=self._key)
+        else:
+            self._ranked = heapq.nsmallest(n, self._ids, key=self._key)
+
+    @overload
+    def __getitem__(self, i: int) -> int: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[int]: ...
+
+    def __getitem__(self, i: int | slice) -> int | list[int]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("ranked index out of range")
+        self._rank(i + 1)
+        return self._ranked[i]
+
+    def score(self, i: int) -> int:
+        return self._scores.get(self[i], 0)
+
+
+class RankedScores(Sequence[int]):
+    """Scores parallel to RankedIds."""
+
+    def __init__(self, ranked: RankedIds):
+        self._ranked = ranked
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._ranked.score(i)
+
+
+@dataclass
+class SearchResult:
+    """Ranked emoji ids with their scores, followed by extra emojis that are
+    not in the store, e.g. a generated character.
+
+    The terms and the bitset of all matches before deduplication let the
+    next search refine this one. Apart from ranking ids on demand a result
+    is never changed after it was returned, so it can be shared between
+    threads."""
+
+    needle: str = ""
+    ids: Sequence[int] = ()
+    scores: Sequence[int] = ()
+    extra: Sequence[Emoji] = ()
+    terms: list[QueryTerm] = field(default_factory=list)
+    bits: int = 0
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.extra)
+
+
+def normalize_query(needle: str) -> str:
+    """The needle as searched: lowercase terms separated by single spaces."""
+    return " ".join(n for n in needle.lower().split(" ") if n)
+
+
+# Estimated bytes per matching id of a cached result: the id, its score
+# entry and its place in the ranking, measured 70-100
+RESULT_ID_BYTES = 100
+
+
+class SearchCache:
+    """LRU of search results by key, e.g. the normalized query, bounded by
+    the number of entries and their estimated size in bytes.
+
+    Entries are only valid for the store signature they were searched in,
+    so a different emoji database or locale clears the cache. Results are
+    not changed after they were returned, so they can be handed out again
+    and the cache can be shared between threads."""
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 4 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._results: OrderedDict[Hashable, tuple[SearchResult, int]] = OrderedDict()
+        self._signature: Hashable = None
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def _check(self, signature: Hashable):
+        if signature != self._signature:
+            if self._results:
+                log.info("Search cache cleared for changed emojis.")
+            self._results.clear()
+            self.bytes = 0
+            self._signature = signature
+
+    def get(self, signature: Hashable, key: Hashable) -> SearchResult | None:
+        with self._lock:
+            self._check(signature)
+            entry = self._results.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, signature: Hashable, key: Hashable, result: SearchResult):
+        size = len(result) * RESULT_ID_BYTES + result.bits.bit_length() // 8
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check(signature)
+            old = self._results.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._results[key] = (result, size)
+            self.bytes += size
+            while len(self._results) > self.max_entries or self.bytes > self.max_bytes:
+                (_, (_, evicted)) = self._results.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.bytes = 0
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        return (
+            f"Search cache: {len(self)} entries, {self.bytes // 1024} KiB,"
+            f" {self.hits} hits ({self.hits / (lookups or 1):.0%}),"
+            f" {self.misses} misses, {self.evictions} evictions."
+        )
+
+
+class SearchEngine:
+    """Searches the emojis of a store without changing any emoji or state,
+    so searches may run concurrently.
+
+    A query is planned as the AND of one candidate bitset per term, taken
+    from the search index and combined from the most selective term on.
+    Only the remaining candidates are scored, which also drops the ones the
+    n-gram index could not rule out.
+
+    With fuzzy a search without any match is repeated with its text terms
+    tolerating typos. Results are kept in a cache of recent queries."""
+
+    def __init__(self, store: EmojiStore, fuzzy: bool = False, cache: SearchCache | None = None):
+        self.store = store
+        self.fuzzy = fuzzy
+        self.cache = SearchCache() if cache is None else cache
+
+    def table_scores(self, needle: str, field: str, table: list[str]) -> tuple[int, list[int]]:
+        """Bitset of the ids in the matching group or subgroup names and the
+        score of each name in table."""
+        scores = [match(text, needle) for text in table]
+        bits = 0
+        for text, score in zip(table, scores):
+            if score:
+                bits |= self.store.index.bits(field, text)
+        return (bits, scores)
+
+    def plan(self, term: QueryTerm) -> tuple[int, Callable[[int], int]]:
+        """Return the candidate bitset of term and a function scoring an id,
+        0 if it does not match after all."""
+        store = self.store
+        index = store.index
+        needle = term.needle
+        if term.kind == "group":
+            bits = -1
+            group_scores: list[int] = []
+            subgroup_scores: list[int] = []
+            if needle:
+                (group_bits, group_scores) = self.table_scores(needle, "groups", store.groups)
+                bits &= group_bits
+            if term.subgroup and bits:
+                (subgroup_bits, subgroup_scores) = self.table_scores(
+                    term.subgroup, "subgroups", store.subgroups
+                )
+                bits &= subgroup_bits
+            (group_ids, subgroup_ids) = (store.group_ids, store.subgroup_ids)
+
+            def score(i: int) -> int:
+                # candidates match exactly, both parts are needed when present
+                return (group_scores[group_ids[i]] if group_scores else 0) + (
+                    subgroup_scores[subgroup_ids[i]] if subgroup_scores else 0
+                )
+
+            return (bits, score)
+        if term.kind == "hex":
+            unicodes = store.unicodes
+            return (index.candidate_bits("unicodes", needle), lambda i: match(unicodes[i], needle))
+        if term.kind == "fuzzy":
+            return self.plan_fuzzy(needle)
+        if term.kind == "tag":
+            return (index.candidate_bits("tags", needle), self.text_scorer(needle, tags_only=True))
+        bits = index.candidate_bits("names", needle) | index.candidate_bits("tags", needle)
+        return (bits, self.text_scorer(needle))
+
+    def text_scorer(self, needle: str, tags_only: bool = False) -> Callable[[int], int]:
+        """Return a function scoring needle in the name and tags of an id, or
+        only in its tags, taking the best locale if there are alternatives."""
+        store = self.store
+        (names, tags, index) = (store.names, store.tags, store.index)
+        if tags_only:
+
+            def primary(i: int) -> int:
+                return match(tags[i], needle)
+
+        else:
+
+            def primary(i: int) -> int:
+                return match(names[i], needle) + match(tags[i], needle)
+
+        if not index.has_alternatives:
+            return primary
+
+        def best(i: int) -> int:
+            score = primary(i)
+            for name, alternative_tags in index.alternatives(i):
+                alternative = match(alternative_tags, needle)
+                if not tags_only:
+                    alternative += match(name, needle)
+                score = max(score, alternative)
+            return score
+
+        return best
+
+    def plan_fuzzy(self, needle: str) -> tuple[int, Callable[[int], int]]:
+        """Like a text term but also matching the words of the vocabulary
+        within a few edits of needle, their scores halved per edit."""
+        store = self.store
+        index = store.index
+        words = [(needle, 0)]
+        distance = max_distance(needle)
+        if distance:
+            words += [w for w in store.fuzzy().lookup(needle, distance) if w[0] != needle]
+        bits = 0
+        for word, _ in words:
+            bits |= index.candidate_bits("names", word) | index.candidate_bits("tags", word)
+        scorers = [(self.text_scorer(word), edits) for (word, edits) in words]
+
+        def score(i: int) -> int:
+            for word_scorer, edits in scorers:
+                word_score = word_scorer(i)
+                if word_score:
+                    return max(word_score >> edits, 1)
+            return 0
+
+        return (bits, score)
+
+    def search(
+        self,
+        needle: str,
+        previous: SearchResult | None = None,
+        cancelled: Callable[[], bool] | None = None,
+    ) -> SearchResult:
+        """Search the store for needle, refining the previous result if possible.
+
+        Raises SearchCancelled when cancelled returns True while scoring."""
+        store = self.store
+        if not needle:
+            return SearchResult(needle, range(store.count))
+        store.load()
+        needle = needle.lower()
+        key = (normalize_query(needle), self.fuzzy)
+        result = self.cache.get(store.signature, key)
+        if result is not None:
+            return result
+        terms = parse_query(needle)
+        result = self.evaluate(needle, terms, previous, cancelled)
+        if (
+            not result
+            and self.fuzzy
+            and any(t.kind == "text" and max_distance(t.needle) for t in terms)
+        ):
+            terms = [QueryTerm("fuzzy", t.needle) if t.kind == "text" else t for t in terms]
+            result = self.evaluate(needle, terms, previous, cancelled)
+        self.cache.put(store.signature, key, result)
+        return result
+
+    def evaluate(
+        self,
+        needle: str,
+        terms: list[QueryTerm],
+        previous: SearchResult | None = None,
+        cancelled: Callable[[], bool] | None = None,
+    ) -> SearchResult:
+        """Evaluate the parsed terms of needle."""
+        store = self.store
+        plans = [self.plan(t) for t in terms]
+        plans.sort(key=lambda plan: plan[0].bit_count())
+        bits = (1 << store.count) - 1
+        # Typing on usually just extends terms, e.g. "hea" -> "heart", then
+        # the previous matches are a superset of the new ones.
+        if (
+            previous
+            and previous.terms
+            and len(previous.terms) <= len(terms)
+            and all(t.refines(p) for (t, p) in zip(terms, previous.terms))
+        ):
+            bits = previous.bits
+        for term_bits, _ in plans:
+            bits &= term_bits
+            if not bits:
+                break
+
+        matches: Sequence[int]
+        scores: dict[int, int] = {}
+        if not terms:
+            matches = range(store.count)
+        else:
+            matches = []
+            scorers = [scorer for (_, scorer) in plans]
+            for n, i in enumerate(iter_bits(bits)):
+                if cancelled is not None and not n & 255 and cancelled():
+                    raise SearchCancelled(needle)
+                total = 0
+                for scorer in scorers:
+                    score = scorer(i)
+                    if not score:
+                        break
+                    total += score
+                else:
+                    matches.append(i)
+                    scores[i] = total
+            bits = to_bits(matches)
+
+        if not matches:
+            extra: list[Emoji] = []
+            # from the normalized needle, as results are cached by it
+            query = normalize_query(needle)
+            if query.startswith("+"):
+                code = query[1:].upper()
+                try:
+                    char = chr(int(code, 16))
+                    extra.append(Emoji(char=char, unicode=code, name="Generated Character"))
+                except ValueError:
+                    pass
+            return SearchResult(needle, (), (), extra, terms)
+
+        if not store.unique_chars:
+            # keep only the best match of each char, the first one on equal scores
+            best: dict[str, int] = {}
+            for i in matches:
+                j = best.setdefault(store.chars[i], i)
+                if scores.get(i, 0) > scores.get(j, 0):
+                    best[store.chars[i]] = i
+            if len(best) < len(matches):
+                matches = sorted(best.values())
+        ids = RankedIds(matches, scores)
+        return SearchResult(needle, ids, RankedScores(ids), (), terms, bits)
+
+
+class SearchWorker:
+    """Runs the searches of an engine on a background thread.
+
+    Each submitted needle gets the next generation number. Only the newest
+    one is searched: needles superseded before their search started are
+    dropped and a running search is cancelled as soon as a newer needle is
+    submitted. done(generation, result) is called on the worker thread for
+    each completed search, so the receiver still has to check that the
+    generation is the newest when it gets there."""
+
+    def __init__(self, engine: SearchEngine, done: Callable[[int, SearchResult], None]):
+        self.engine = engine
+        self._done = done
+        self.generation = 0
+        # the newest needle not yet searched
+        self._pending: tuple[int, str] | None = None
+        # last completed result, refined by the next search
+        self._result: SearchResult | None = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="search", daemon=True)
+        self._thread.start()
+
+    def submit(self, needle: str) -> int:
+        """Search needle and return its generation."""
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, needle)
+            self._condition.notify()
+            return self.generation
+
+    def cancel(self) -> int:
+        """Drop the pending and cancel the running search, return the new generation."""
+        with self._condition:
+            self.generation += 1
+            self._pending = None
+            return self.generation
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self.generation += 1
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                (generation, needle) = self._pending  # type: ignore[misc]
+                self._pending = None
+            try:
+                result = self.engine.search(
+                    needle, self._result, lambda: self.generation != generation
+                )
+            except SearchCancelled:
+                log.debug(f"Search for '{needle}' cancelled.")
+                continue
+            except Exception:
+                log.exception(f"Search for '{needle}' failed.")
+                continue
+            self._result = result
+            if generation == self.generation:
+                self._done(generation, result)
@@ -0,0 +1,332 @@
+import logging as log
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Collection, Iterator, Sequence
+from pathlib import Path
+
+from emojis import Emoji
+
+# Inverted search index, persisted next to the emoji database.
+#
+# Layout (all integers little endian):
+#   header  magic, version, emoji count, crc32 of all emoji chars and
+#           offset of the alternatives
+#   fields  one entry per field in FIELDS: key count and section offsets
+#   then per field
+#     keys      sorted keys, UTF-8, separated by NUL
+#     offsets   u32[key count + 1], start of each key's postings
+#     postings  u32 emoji ids, ascending per key
+#   alternatives
+#     offsets   u32[emoji count + 1], start of each emoji's text
+#     texts     UTF-8, see encode_alternatives
+#
+# names, tags and code points are indexed by all their 1, 2 and 3
+# character substrings, groups and subgroups by their whole lowercased
+# value. Ids are positions in the top level emoji list, the same as
+# EmojiStore ids.
+#
+# Alternatives are the lowercase names and tags of an emoji in other
+# locales than the one of the emojis, e.g. English ones for German
+# emojis. Their n-grams are indexed in the names and tags fields, so a
+# search looks up all locales at once.
+
+MAGIC = b"EKIX"
+VERSION = 3
+
+HEADER = struct.Struct("<4sHHIII")
+FIELD = struct.Struct("<IIIII")
+
+NGRAM = 3
+NGRAM_FIELDS = ("names", "tags", "unicodes")
+FIELDS = (*NGRAM_FIELDS, "groups", "subgroups")
+
+
+def ngrams(text: str) -> set[str]:
+    """All substrings of text with 1 to NGRAM characters."""
+    return {text[i : i + n] for n in range(1, NGRAM + 1) for i in range(len(text) - n + 1)}
+
+
+# A (name, tags) pair of an emoji in another locale
+Alternative = tuple[str, str]
+
+
+def field_keys(
+    emoji: Emoji, alternatives: Sequence[Alternative] = ()
+) -> dict[str, Collection[str]]:
+    """The index keys of each field of emoji, in any order as the index sorts them."""
+    names = ngrams(emoji.name.lower())
+    tags = ngrams(emoji.tags.lower())
+    for name, alternative_tags in alternatives:
+        names |= ngrams(name)
+        tags |= ngrams(alternative_tags)
+    return {
+        "names": names,
+        "tags": tags,
+        "unicodes": ngrams(emoji.unicode),
+        "groups": (emoji.group.lower(),),
+        "subgroups": (emoji.subgroup.lower(),),
+    }
+
+
+def encode_alternatives(alternatives: Sequence[Alternative]) -> str:
+    """Alternatives as text, name and tags separated by US and pairs by RS."""
+    return "\x1e".join(f"{name}\x1f{tags}" for (name, tags) in alternatives)
+
+
+def decode_alternatives(text: str) -> list[Alternative]:
+    if not text:
+        return []
+    return [tuple(pair.split("\x1f", 1)) for pair in text.split("\x1e")]  # type: ignore[misc]
+
+
+# positions of the set bits of each byte value
+_BIT_POSITIONS = [tuple(b for b in range(8) if value >> b & 1) for value in range(256)]
+
+
+def to_bits(ids: Sequence[int]) -> int:
+    """Bitset with the bits of ids set."""
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        data[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(data, "little")
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """The positions of the set bits, ascending."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index * 8
+            for bit in _BIT_POSITIONS[byte]:
+                yield base + bit
+
+
+def chars_crc(chars: Sequence[str]) -> int:
+    return zlib.crc32("\0".join(chars).encode("utf-8"))
+
+
+def build_postings(
+    emojis: Sequence[Emoji], alternatives: Sequence[Sequence[Alternative]] = ()
+) -> dict[str, dict[str, array]]:
+    postings: dict[str, dict[str, array]] = {field: {} for field in FIELDS}
+    for i, e in enumerate(emojis):
+        for field, keys in field_keys(e, alternatives[i] if alternatives else ()).items():
+            field_postings = postings[field]
+            for key in keys:
+                ids = field_postings.get(key)
+                if ids is None:
+                    ids = field_postings[key] = array("I")
+                ids.append(i)
+    return postings
+
+
+def write_search_index(
+    path: str, emojis: Sequence[Emoji], alternatives: Sequence[Sequence[Alternative]] = ()
+):
+    """Write the search index of emojis and their alternatives in other
+    locales, parallel to emojis, to path, replacing any existing file
+    atomically."""
+    postings = build_postings(emojis, alternatives)
+    offset = HEADER.size + FIELD.size * len(FIELDS)
+    field_data = bytearray()
+    sections: list[bytes] = []
+    for field in FIELDS:
+        keys = sorted(postings[field])
+        keys_data = "\0".join(keys).encode("utf-8")
+        offsets = array("I", [0])
+        ids = array("I")
+        for key in keys:
+            ids.extend(postings[field][key])
+            offsets.append(len(ids))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            ids.byteswap()
+        field_data.extend(
+            FIELD.pack(
+                len(keys),
+                offset,
+                len(keys_data),
+                offset + len(keys_data),
+                offset + len(keys_data) + len(offsets) * offsets.itemsize,
+            )
+        )
+        sections.extend((keys_data, offsets.tobytes(), ids.tobytes()))
+        offset += sum(len(s) for s in sections[-3:])
+    alternatives_offset = 0
+    if any(alternatives):
+        alternatives_offset = offset
+        texts = bytearray()
+        text_offsets = array("I", [0])
+        for i in range(len(emojis)):
+            texts.extend(encode_alternatives(alternatives[i]).encode("utf-8"))
+            text_offsets.append(len(texts))
+        if sys.byteorder != "little":
+            text_offsets.byteswap()
+        sections.extend((text_offsets.tobytes(), bytes(texts)))
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        0,
+        len(emojis),
+        chars_crc([e.char for e in emojis]),
+        alternatives_offset,
+    )
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(field_data)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, path)
+    log.info(f"Search index for {len(emojis)} emojis written to '{path}'.")
+
+
+def _u32(buffer, start: int, count: int) -> Sequence[int]:
+    data = memoryview(buffer)[start : start + count * 4]
+    if sys.byteorder == "little":
+        return data.cast("I")
+    ids = array("I", data)
+    ids.byteswap()
+    return ids
+
+
+# Number of posting bitsets kept per index
+BITS_CACHED = 4096
+
+
+class SearchIndex:
+    """Inverted index from field keys to ascending emoji id postings.
+
+    Either memory mapped from a search index file or built in memory from
+    the emojis. Postings are also available as int bitsets over emoji ids,
+    converted on first use and cached. Candidates are a superset of the ids
+    that match a needle, so scoring still has to check them, including the
+    alternatives of an emoji in other locales."""
+
+    def __init__(
+        self,
+        postings: dict[str, dict[str, Sequence[int]]],
+        alternatives: Sequence[Sequence[Alternative]] = (),
+    ):
+        self._postings = postings
+        self._alternatives = alternatives
+        self.has_alternatives = any(alternatives)
+        self._bits: dict[tuple[str, str], int] = {}
+
+    @classmethod
+    def build(
+        cls, emojis: Sequence[Emoji], alternatives: Sequence[Sequence[Alternative]] = ()
+    ) -> "SearchIndex":
+        return cls(build_postings(emojis, alternatives), alternatives)  # type: ignore[arg-type]
+
+    def alternatives(self, emoji_id: int) -> Sequence[Alternative]:
+        """(name, tags) of the emoji in other locales, lowercase."""
+        return self._alternatives[emoji_id] if self._alternatives else ()
+
+    def postings(self, field: str, key: str) -> Sequence[int]:
+        return self._postings[field].get(key, ())
+
+    def keys(self, field: str) -> Sequence[str]:
+        return list(self._postings[field])
+
+    def bits(self, field: str, key: str) -> int:
+        bits = self._bits.get((field, key))
+        if bits is None:
+            if len(self._bits) >= BITS_CACHED:
+                self._bits.clear()
+            bits = self._bits[(field, key)] = to_bits(self.postings(field, key))
+        return bits
+
+    def candidate_bits(self, field: str, needle: str) -> int:
+        """Bitset of the ids whose n-gram field may contain needle."""
+        if len(needle) <= NGRAM:
+            return self.bits(field, needle)
+        # all n-grams of needle must occur
+        bits = -1
+        for i in range(len(needle) - NGRAM + 1):
+            bits &= self.bits(field, needle[i : i + NGRAM])
+            if not bits:
+                break
+        return bits
+
+
+class MappedSearchIndex(SearchIndex):
+    """SearchIndex on a memory mapped index file, fields decoded on first use."""
+
+    def __init__(self, path: str):
+        super().__init__({})
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size + FIELD.size * len(FIELDS):
+            raise ValueError(f"Search index '{path}' is truncated.")
+        (magic, version, _flags, self.emoji_count, self.crc, alternatives_offset) = (
+            HEADER.unpack_from(self._mm, 0)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a search index.")
+        if version != VERSION:
+            raise ValueError(f"Search index '{path}' has version {version}, need {VERSION}.")
+        self._fields: dict[str, tuple[dict[str, int], Sequence[int], int]] = {}
+        self.has_alternatives = alternatives_offset != 0
+        if self.has_alternatives:
+            self._text_offsets = _u32(self._mm, alternatives_offset, self.emoji_count + 1)
+            self._texts_offset = alternatives_offset + (self.emoji_count + 1) * 4
+
+    def close(self):
+        self._mm.close()
+
+    def _field(self, field: str) -> tuple[dict[str, int], Sequence[int], int]:
+        entry = self._fields.get(field)
+        if entry is None:
+            offset = HEADER.size + FIELD.size * FIELDS.index(field)
+            (count, keys_offset, keys_size, offsets_offset, postings_offset) = FIELD.unpack_from(
+                self._mm, offset
+            )
+            keys = self._mm[keys_offset : keys_offset + keys_size].decode("utf-8").split("\0")
+            key_map = {key: i for i, key in enumerate(keys)} if count else {}
+            offsets = _u32(self._mm, offsets_offset, count + 1)
+            entry = self._fields[field] = (key_map, offsets, postings_offset)
+        return entry
+
+    def postings(self, field: str, key: str) -> Sequence[int]:
+        (key_map, offsets, postings_offset) = self._field(field)
+        i = key_map.get(key)
+        if i is None:
+            return ()
+        start = offsets[i]
+        return _u32(self._mm, postings_offset + start * 4, offsets[i + 1] - start)
+
+    def keys(self, field: str) -> Sequence[str]:
+        return list(self._field(field)[0])
+
+    def alternatives(self, emoji_id: int) -> Sequence[Alternative]:
+        if not self.has_alternatives:
+            return ()
+        start = self._texts_offset + self._text_offsets[emoji_id]
+        end = self._texts_offset + self._text_offsets[emoji_id + 1]
+        return decode_alternatives(self._mm[start:end].decode("utf-8"))
+
+
+def load_search_index(path: str, chars: Sequence[str]) -> SearchIndex | None:
+    """Return the search index at path if it was built for exactly these emoji chars."""
+    if not Path(path).exists():
+        return None
+    try:
+        index = MappedSearchIndex(path)
+    except (OSError, ValueError) as ex:
+        log.warning(f"Ignoring search index: {ex}")
+        return None
+    if index.emoji_count != len(chars) or index.crc != chars_crc(chars):
+        log.warning(f"Ignoring search index '{path}' built for other emojis.")
+        index.close()
+        return None
+    log.info(f"Search index '{path}' mapped.")
+    return index
@@ -0,0 +1,175 @@
+import logging as log
+import threading
+from array import array
+from collections.abc import Iterator, Sequence
+from typing import overload
+
+from emojidb import EmojiSequence
+from emojis import Emoji
+from fuzzy import FuzzyIndex, words
+from searchindex import SearchIndex, chars_crc, load_search_index
+
+
+class EmojiStore:
+    """Column store of all top level emojis and symbols indexed by integer id.
+
+    The id of an emoji is its position in the sequence the store is made
+    from, which may be a lazy database sequence. Columns are parallel
+    arrays built on first use, so creating a store costs nothing until the
+    first search. Group and subgroup are ids into small string tables and
+    the variants of id i are the variant ids
+    [variant_first[i], variant_first[i] + variant_count[i]).
+
+    The search index is mapped from index_file if that was built for these
+    emojis, else built in memory."""
+
+    def __init__(self, emojis: Sequence[Emoji], index_file: str | None = None):
+        self._emojis = emojis
+        self.count = len(emojis)
+        self.index_file = index_file
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._fuzzy: FuzzyIndex | None = None
+        self._by_char: dict[str, Emoji] | None = None
+
+    def _load(self):
+        self.chars: list[str] = []
+        self.unicodes: list[str] = []
+        # lowercase search keys
+        self.names: list[str] = []
+        self.tags: list[str] = []
+        self.groups: list[str] = []
+        self.subgroups: list[str] = []
+        self.group_ids = array("I")
+        self.subgroup_ids = array("I")
+        self.variant_first = array("I")
+        self.variant_count = array("I")
+        group_table: dict[str, int] = {}
+        subgroup_table: dict[str, int] = {}
+        variant_id = self.count
+        for e in self._emojis:
+            self.chars.append(e.char)
+            self.unicodes.append(e.unicode)
+            self.names.append(e.name.lower())
+            self.tags.append(e.tags.lower())
+            group_id = group_table.get(e.group)
+            if group_id is None:
+                group_id = group_table[e.group] = len(self.groups)
+                self.groups.append(e.group.lower())
+            self.group_ids.append(group_id)
+            subgroup_id = subgroup_table.get(e.subgroup)
+            if subgroup_id is None:
+                subgroup_id = subgroup_table[e.subgroup] = len(self.subgroups)
+                self.subgroups.append(e.subgroup.lower())
+            self.subgroup_ids.append(subgroup_id)
+            self.variant_first.append(variant_id)
+            self.variant_count.append(len(e.emojis))
+            variant_id += len(e.emojis)
+        self.unique_chars = len(set(self.chars)) == self.count
+        # identifies the emojis, e.g. to invalidate cached search results
+        self.signature = (self.index_file, self.count, chars_crc(self.chars))
+        index = load_search_index(self.index_file, self.chars) if self.index_file else None
+        self.index: SearchIndex = index or SearchIndex.build(self._emojis)
+        self._loaded = True
+        log.info(
+            f"Emoji store with {self.count} emojis, {len(self.groups)} groups"
+            f" and {len(self.subgroups)} subgroups loaded."
+        )
+
+    def load(self) -> "EmojiStore":
+        """Build the columns unless already done and return self."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+        return self
+
+    def fuzzy(self) -> FuzzyIndex:
+        """The fuzzy index of the words in names and tags of all locales,
+        built on first use."""
+        if self._fuzzy is None:
+            self.load()
+            with self._lock:
+                if self._fuzzy is None:
+                    texts = [*self.names, *self.tags]
+                    if self.index.has_alternatives:
+                        for i in range(self.count):
+                            for alternative in self.index.alternatives(i):
+                                texts.extend(alternative)
+                    self._fuzzy = FuzzyIndex(words(texts))
+                    log.info(f"Fuzzy index with {self._fuzzy.size} words built.")
+        return self._fuzzy
+
+    def emoji(self, emoji_id: int) -> Emoji:
+        return self._emojis[emoji_id]
+
+    def variants(self, emoji_id: int) -> Sequence[Emoji]:
+        return self._emojis[emoji_id].emojis
+
+    def find(self, char: str) -> Emoji | None:
+        """The emoji or variant with char, by the index of the database if
+        the emojis come from one, else by a dict built on first use."""
+        if isinstance(self._emojis, EmojiSequence):
+            return self._emojis.find(char)
+        if self._by_char is None:
+            by_char: dict[str, Emoji] = {}
+            parents: Sequence[Emoji] = self._emojis
+            while parents:
+                for e in parents:
+                    by_char.setdefault(e.char, e)
+                parents = [v for e in parents for v in e.emojis]
+            self._by_char = by_char
+        return self._by_char.get(char)
+
+    def view(self, ids: Sequence[int] | None = None) -> "EmojiView":
+        return EmojiView(self, range(self.count) if ids is None else ids)
+
+
+class EmojiView(Sequence[Emoji]):
+    """Sequence of the emojis with the given ids in a store, followed by
+    optional extra emojis that are not part of the store. Optional scores
+    are parallel to ids, e.g. of search results.
+
+    A view stays the same object when its ids change, so a board showing
+    it follows along."""
+
+    def __init__(
+        self,
+        store: EmojiStore,
+        ids: Sequence[int],
+        extra: Sequence[Emoji] = (),
+        scores: Sequence[int] = (),
+    ):
+        self.store = store
+        self.set(ids, extra, scores)
+
+    def set(self, ids: Sequence[int], extra: Sequence[Emoji] = (), scores: Sequence[int] = ()):
+        self.ids = ids
+        self.extra = extra
+        self.scores = scores
+
+    def score(self, i: int) -> int:
+        return self.scores[i] if 0 <= i < len(self.scores) else 0
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.extra)
+
+    @overload
+    def __getitem__(self, i: int) -> Emoji: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[Emoji]: ...
+
+    def __getitem__(self, i: int | slice) -> Emoji | list[Emoji]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < len(self.ids):
+            return self.store.emoji(self.ids[i])
+        return self.extra[i - len(self.ids)]
+
+    def __iter__(self) -> Iterator[Emoji]:
+        for i in self.ids:
+            yield self.store.emoji(i)
+        yield from self.extra
@@ -58,29 +58,7 @@ class TerminalKeyboard:
         (self.all_emojis, self.emoji_groups) = get_emojis_groups(self.config)
         self.board: Board = make_board(self.config, self.all_emojis, self.emoji_groups)
 
-        self.term_board: list[list[tuple[str, Emoji | None]]] = []
         self.term = Terminal()
-        self.make_term_board(self.board._emojis)
-
-    def make_term_board(self, emojis: list[Emoji]):
-        log.info("Making terminal board...")
-        term_board: list[list[tuple[str, Emoji | None]]] = []
-        i = self.board._offset
-        for row in self.board._rows:
-            term_row = []
-            for key in row:
-                if key == " ":
-                    term_row.append((" ", None))
-                elif key == "\n":
-                    pass
-                elif i < len(emojis):
-                    term_row.append((key, emojis[i]))
-                    i += 1
-                else:
-                    term_row.append((key, None))
-            term_board.append(term_row)
-        log.info("Terminal board made.")
-        self.term_board = term_board
 
     def pad_emoji(self, emoji: Emoji | None) -> str:
         if not emoji:
@@ -97,7 +75,7 @@ class TerminalKeyboard:
     def show_board(self):
         log.info("Displaying board...")
         current_key = self.board._current_key
-        for i, line in enumerate(self.term_board):
+        for i, line in enumerate(self.board.page.rows()):
             with self.term.location(0, 2 + i):
                 term_line = ""
                 for k, e in line:
@@ -134,15 +112,17 @@ class TerminalKeyboard:
                     # output final text
                     result = "".join(self.emoji_input)
                     log.info(f"Final emoji text: {result} ({result!r})")
+                    log.info(self.board.search_engine.cache.stats())
                     if not self.daemon:
                         break
                     self.hide_and_insert(result)
+        self.board.close()
         print(result)
 
     def get_cursor_x(self) -> int:
         key = self.board._current_key
         line_str = ""
-        for i, (k, e) in enumerate(self.term_board[self.board.cursor_y]):
+        for k, e in self.board.page.row(self.board.cursor_y):
             if k == key:
                 return wcswidth(line_str)
             line_str += k + self.pad_emoji(e)
@@ -197,8 +177,6 @@ class TerminalKeyboard:
         log.info(f"Terminal cursor at x={cursor_x}, y={cursor_y}")
         log.info(f"Board cursor at col={col}, row={row}")
 
-        self.make_term_board(self.board._emojis)
-
         # draw everything
         with term.hidden_cursor():
             with term.location(0, 0):
@@ -222,6 +200,9 @@ class TerminalKeyboard:
         key: Keystroke | str | None = None
         while not key:
             key = term.inkey(timeout=0.1, esc_delay=0.05)
+            # repaint with the changes of other instances to the recent list
+            if not key and board.refresh_recent() and board.is_recent:
+                return
         log.info(f"Key pressed: '{key.name}' '{key.code}' {key!r}")
 
         is_printable = key.isprintable()
@@ -386,7 +367,6 @@ class TerminalKeyboard:
             self.search_input = s
             self.search_input_cursor += 1
             board.search(self.search_input)
-            self.make_term_board(board._emojis)
             return
         elif is_board and board.is_recent:
             if key == "KEY_SHIFT_ENTER":
@@ -422,14 +402,12 @@ class TerminalKeyboard:
         # enter a sub board
         if board.is_settings:
             board.push_key(board.current_key)
-            self.make_term_board(board._emojis)
             return
         if self.prefix_key or not e.unicode:
             if self.prefix_key and self.board.is_recent:
                 self.board.recent_toggle_favorite()
             elif (self.prefix_key or not e.unicode) and e.emojis:
                 self.board.push_board(e.emojis)
-                self.make_term_board(board._emojis)
             self.prefix_key = False
             return
         self.prefix_key = False
@@ -3,10 +3,10 @@ import logging as log
 import os
 import shutil
 import subprocess
+import time
+from collections.abc import Callable
 from pathlib import Path
 
-import requests
-
 
 def add_emoji_to_unicode_data(file_path: str):
     with (
@@ -39,6 +39,8 @@ def add_emoji_to_unicode_data(file_path: str):
 
 
 def download(url, local_filename):
+    import requests  # imported on demand, it is slow to import and rarely needed
+
     try:
         log.info(f"Downloading '{url}'...")
         file_dir = Path(local_filename).parent
@@ -79,6 +81,13 @@ def run_command(command: list[str], input: str | None = None):
         log.error(f"{command} failed with: {e}")
 
 
+def timed_call[T](func: Callable[..., T], *args) -> tuple[T, float]:
+    """Call func and return its result with the duration in seconds."""
+    start = time.perf_counter()
+    result = func(*args)
+    return (result, time.perf_counter() - start)
+
+
 def get_conf_file(filename: str) -> str:
     if os.environ.get("EMOJI_KBD_DEV"):
         return str(Path("res") / filename)
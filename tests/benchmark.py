@@ -0,0 +1,435 @@
+"""Benchmarks for Emoji Kbd internals.
+
+They run against the regular emoji cache, so build it first by starting one
+of the frontends or `python src/emojis.py`.
+
+Usage:
+    EMOJI_KBD_DEV=1 python tests/benchmark.py <benchmark> [args]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, "src")
+
+from config import load_config  # noqa: E402
+from emojis import get_locale_cache_file  # noqa: E402
+
+
+def rss_kb() -> int:
+    """Current resident set size in KiB, 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def load_format(fmt: str):
+    import emojis
+
+    config = load_config()
+    if fmt == "text":
+        result = emojis.get_cached_emojis_groups(config)
+    else:
+        result = emojis.get_db_emojis_groups(config)
+    if result is None:
+        raise SystemExit(f"No {fmt} cache found - build it first.")
+    return result
+
+
+def scan(all_emojis) -> int:
+    """Touch every emoji and variant like a first search would."""
+    n = 0
+    for e in all_emojis:
+        n += len(e.name) + len(e.tags)
+        for v in e.emojis:
+            n += len(v.name)
+    return n
+
+
+def bench_load_child(fmt: str):
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    rss_before = rss_kb()
+    t0 = time.perf_counter()
+    (all_emojis, _groups) = load_format(fmt)
+    t1 = time.perf_counter()
+    rss_load = rss_kb()
+    scan(all_emojis)
+    t2 = time.perf_counter()
+    rss_scan = rss_kb()
+    print(
+        json.dumps(
+            {
+                "load": t1 - t0,
+                "scan": t2 - t1,
+                "rss_load": rss_load - rss_before,
+                "rss_scan": rss_scan - rss_before,
+            }
+        )
+    )
+
+
+def bench_load(runs: str = "5"):
+    """Compare cold (fresh process) and warm (same process) loading of the
+    text cache and the binary emoji database."""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    for fmt in ("text", "db"):
+        cold = []
+        for _ in range(int(runs)):
+            out = subprocess.run(
+                [sys.executable, __file__, "load_child", fmt],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            cold.append(json.loads(out.splitlines()[-1]))
+        best = min(cold, key=lambda r: r["load"])
+        warm = []
+        for _ in range(int(runs)):
+            t0 = time.perf_counter()
+            load_format(fmt)
+            warm.append(time.perf_counter() - t0)
+        print(
+            f"{fmt:5} cold load {best['load'] * 1000:7.2f} ms"
+            f" (+scan {best['scan'] * 1000:7.2f} ms)"
+            f"  warm load {min(warm) * 1000:7.2f} ms"
+            f"  RSS load {best['rss_load']:6} KiB (after scan {best['rss_scan']:6} KiB)"
+        )
+    print(f"cache dir: {os.path.dirname(get_locale_cache_file(load_config(), 'emojis.db'))}")
+
+
+def bench_classify(runs: str = "5"):
+    """Per row cost of excluding and grouping UnicodeData rows with the former
+    linear table scan and with the precompiled CodepointClassifier."""
+    import csv
+    import re
+
+    from emojis import CodepointClassifier
+    from tools import get_cache_file
+
+    config = load_config()
+    with open(get_cache_file("unicode-data.txt"), encoding="utf-8") as f:
+        rows = [(int(r[0], 16), r[1].lower(), r[2]) for r in csv.reader(f, delimiter=";")]
+
+    ranges = [tuple(r) for r in config.unicode.exclude_ranges]
+    points = tuple(config.unicode.exclude_points)
+    grouping = [
+        (g, sg, re.compile(n) if n else None, re.compile(c) if c else None)
+        for (g, sg, n, c) in config.unicode.grouping
+    ]
+
+    def linear(cp: int, name: str, category: str):
+        if any([start <= cp <= stop for (start, stop) in ranges]) or cp in points:
+            return None
+        for group, subgroup, name_re, category_re in grouping:
+            if (
+                isinstance(name_re, re.Pattern)
+                and name_re.search(name)
+                or isinstance(category_re, re.Pattern)
+                and category_re.search(category)
+            ):
+                return (group, subgroup)
+        return None
+
+    classifier = CodepointClassifier.from_config(config)
+
+    def compiled(cp: int, name: str, category: str):
+        if classifier.is_excluded(cp):
+            return None
+        return classifier.group(name, category)
+
+    expected = [linear(*row) for row in rows]
+    assert [compiled(*row) for row in rows] == expected, "classifiers differ"
+    for label, func in (("linear", linear), ("compiled", compiled)):
+        best = float("inf")
+        for _ in range(int(runs)):
+            t0 = time.perf_counter()
+            for row in rows:
+                func(*row)
+            best = min(best, time.perf_counter() - t0)
+        print(f"{label:8} {best * 1e9 / len(rows):7.0f} ns/row  {best * 1000:7.2f} ms total")
+    print(f"{len(rows)} rows, {sum(1 for e in expected if e)} kept")
+
+
+def bench_memory():
+    """Python heap held by all_emojis + emoji_groups, measured with tracemalloc,
+    right after loading the text cache or the database and after touching
+    every emoji and variant."""
+    import gc
+    import logging
+    import tracemalloc
+
+    logging.disable(logging.CRITICAL)
+    import emojidb  # noqa: F401 - keep module import out of the measurement
+    import emojis
+
+    for fmt in ("text", "db"):
+        emojis.variant_boards.clear()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        (all_emojis, groups) = load_format(fmt)
+        gc.collect()
+        loaded = tracemalloc.get_traced_memory()[0] - before
+        scan(all_emojis)
+        records = sum(1 + len(e.emojis) for e in all_emojis)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print(
+            f"{fmt:5} {loaded / 1024:6.0f} KiB loaded, {size / 1024:6.0f} KiB after scan"
+            f" for {records} records ({size / records:5.0f} bytes/record, {len(groups)} groups)"
+        )
+        del all_emojis, groups
+
+
+def bench_variants():
+    """Time to open each variant board for the first time, i.e. to decode the
+    variants of an emoji, compared to a 16 ms frame."""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    for fmt in ("text", "db"):
+        (all_emojis, _groups) = load_format(fmt)
+        times = []
+        for e in all_emojis:
+            if e.emojis:
+                t0 = time.perf_counter()
+                list(e.emojis)
+                times.append(time.perf_counter() - t0)
+        print(
+            f"{fmt:5} {len(times)} variant boards, {sum(len(e.emojis) for e in all_emojis)}"
+            f" variants: mean {sum(times) / len(times) * 1000:6.3f} ms"
+            f"  max {max(times) * 1000:6.3f} ms"
+        )
+
+
+def bench_keystrokes(runs: str = "5"):
+    """Per keystroke latency of typing out queries into the search field,
+    searching from scratch on every keystroke and refining the previous
+    results."""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from board import SearchGroup
+    from store import EmojiStore
+
+    (all_emojis, _groups) = load_format("db")
+    index_file = get_locale_cache_file(load_config(), "search.idx")
+    store = EmojiStore(all_emojis, index_file).load()
+    queries = ["heart", "red heart", "face smiling", "thumbs up", "arrow,left", "#love", "+1F60"]
+    for incremental in (False, True):
+        times: list[float] = []
+        for _ in range(int(runs)):
+            for query in queries:
+                search = SearchGroup(store)
+                for n in range(1, len(query) + 1):
+                    if not incremental:
+                        search.result = None
+                    t0 = time.perf_counter()
+                    search.search(query[:n])
+                    search.emojis[:46]  # show the first page
+                    times.append(time.perf_counter() - t0)
+        times.sort()
+        print(
+            f"{'incremental' if incremental else 'full':11} {len(times)} keystrokes:"
+            f" mean {sum(times) / len(times) * 1000:6.3f} ms"
+            f"  p90 {times[len(times) * 9 // 10] * 1000:6.3f} ms"
+            f"  max {times[-1] * 1000:6.3f} ms"
+        )
+
+
+def bench_fuzzy(runs: str = "5"):
+    """Latency of fuzzy searches by needle length, each needle a typo of a
+    vocabulary word, compared to a 16 ms frame."""
+    import logging
+    import random
+
+    logging.disable(logging.CRITICAL)
+    from board import SearchGroup
+    from fuzzy import MIN_LENGTH, words
+    from store import EmojiStore
+
+    (all_emojis, _groups) = load_format("db")
+    index_file = get_locale_cache_file(load_config(), "search.idx")
+    store = EmojiStore(all_emojis, index_file).load()
+    t0 = time.perf_counter()
+    store.fuzzy()
+    print(f"fuzzy index built in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    vocabulary = sorted(words([*store.names, *store.tags]))
+    rng = random.Random(1)
+    search = SearchGroup(store)
+    for length in range(MIN_LENGTH, 13):
+        candidates = [w for w in vocabulary if len(w) == length]
+        if not candidates:
+            continue
+        times: list[float] = []
+        for word in rng.sample(candidates, min(20, len(candidates))):
+            i = rng.randrange(length - 1)
+            typo = word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+            for _ in range(int(runs)):
+                search.result = None
+                t0 = time.perf_counter()
+                search.search("~" + typo)
+                search.emojis[:46]  # show the first page
+                times.append(time.perf_counter() - t0)
+        times.sort()
+        print(
+            f"length {length:2} {len(times):4} searches:"
+            f" mean {sum(times) / len(times) * 1000:6.3f} ms"
+            f"  p90 {times[len(times) * 9 // 10] * 1000:6.3f} ms"
+            f"  max {times[-1] * 1000:6.3f} ms"
+        )
+
+
+def bench_gui_search(runs: str = "3", interval: str = "30"):
+    """Keystroke to repaint latency of the Qt search field, searching
+    synchronously on the UI thread and on the search worker. Keys are typed
+    every interval ms. Reports how long each keystroke blocks the UI thread
+    and the latency until the result of the last keystroke is painted.
+    Runs without a display by default."""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtTest import QTest
+    from PyQt6.QtWidgets import QApplication
+
+    from guikbd import KeyboardWidget
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    queries = ["heart", "red heart", "face smiling", "thumbs up", "arrow,left", "#love", "+1F60"]
+    for search_async in (False, True):
+        config = load_config()
+        config.gui.search_async = search_async
+        widget = KeyboardWidget(config)
+        widget.show()
+        widget.search_field.setFocus()
+        app.processEvents()
+        blocked: list[float] = []
+        latencies: list[float] = []
+
+        def wait(seconds: float):
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                app.processEvents()
+
+        for _ in range(int(runs)):
+            for query in queries:
+                widget.search_field.clear()
+                wait(0.1)
+                for c in query:
+                    t0 = time.perf_counter()
+                    QTest.keyClick(widget.search_field, c)
+                    blocked.append(time.perf_counter() - t0)
+                    wait(int(interval) / 1000)
+                # wait for the result of the last keystroke to be painted
+                deadline = time.perf_counter() + 2
+                while widget.search_typed is not None and time.perf_counter() < deadline:
+                    app.processEvents()
+                latencies.append(widget.search_latency)
+        widget.search_field.clearFocus()
+        if widget.search_worker:
+            widget.search_worker.close()
+        widget.close()
+        blocked.sort()
+        latencies.sort()
+        print(
+            f"{'async' if search_async else 'sync':5} {len(blocked)} keystrokes block the UI:"
+            f" mean {sum(blocked) / len(blocked) * 1000:6.3f} ms"
+            f"  max {blocked[-1] * 1000:6.3f} ms;"
+            f" last keystroke to paint: mean {sum(latencies) / len(latencies) * 1000:6.3f} ms"
+            f"  max {latencies[-1] * 1000:6.3f} ms"
+        )
+
+
+def bench_history(days: str = "365", per_day: str = "60"):
+    """Record a year of simulated emoji uses in a fresh usage history, each
+    use in its own transaction like the frontends, then rebuild the recent
+    board from it and query the statistics."""
+    import logging
+    import random
+    import tempfile
+
+    logging.disable(logging.CRITICAL)
+    from board import RecentGroup
+    from history import UsageHistory
+    from store import EmojiStore
+
+    (all_emojis, _groups) = load_format("db")
+    store = EmojiStore(all_emojis)
+    rng = random.Random(1)
+    # a few hundred emojis in use, some much more than others
+    used = [e.char for e in rng.sample(list(all_emojis), 300)]
+    frontends = ["guidmn", "guikbd", "termkbd"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        histories = [UsageHistory(path, frontend) for frontend in frontends]
+        start = time.time() - int(days) * 86400
+        times: list[float] = []
+        for day in range(int(days)):
+            for _ in range(int(per_day)):
+                when = start + day * 86400 + rng.uniform(7, 23) * 3600
+                char = used[min(int(rng.expovariate(0.03)), len(used) - 1)]
+                t0 = time.perf_counter()
+                rng.choice(histories).record(char, when)
+                times.append(time.perf_counter() - t0)
+        first = times[:1000]
+        last = times[-1000:]
+        print(
+            f"{len(times)} uses recorded in {sum(times):.2f} s:"
+            f" first 1000 mean {sum(first) / len(first) * 1e6:.1f} us,"
+            f" last 1000 mean {sum(last) / len(last) * 1e6:.1f} us;"
+            f" {os.path.getsize(path) // 1024} KiB"
+        )
+        for _ in range(2):
+            recent_file = os.path.join(tmp, "recent.txt")
+            for name in ("recent.txt", "recent.journal"):
+                if os.path.exists(os.path.join(tmp, name)):
+                    os.unlink(os.path.join(tmp, name))
+            t0 = time.perf_counter()
+            recent = RecentGroup(recent_file, 100, store.find, histories[0])
+            t1 = time.perf_counter()
+            print(
+                f"recent board of {len(recent.emojis)} rebuilt in {(t1 - t0) * 1000:.2f} ms,"
+                f" top shows {' '.join(e.char for e in recent.emojis[:10])}"
+            )
+            recent.journal.close()
+        for name in ("top", "most_used", "uses_by_hour", "uses_by_frontend"):
+            query = getattr(histories[0], name)
+            args = (100,) if name in ("top", "most_used") else ()
+            t0 = time.perf_counter()
+            query(*args)
+            print(f"{name:16} {(time.perf_counter() - t0) * 1000:6.3f} ms")
+        print("uses by frontend:", histories[0].uses_by_frontend())
+        for history in histories:
+            history.close()
+
+
+benchmarks = {
+    "memory": bench_memory,
+    "variants": bench_variants,
+    "classify": bench_classify,
+    "load": bench_load,
+    "load_child": bench_load_child,
+    "keystrokes": bench_keystrokes,
+    "fuzzy": bench_fuzzy,
+    "gui_search": bench_gui_search,
+    "history": bench_history,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in benchmarks:
+        print(f"Usage: {sys.argv[0]} {{{'|'.join(benchmarks)}}} [args]", file=sys.stderr)
+        sys.exit(1)
+    benchmarks[sys.argv[1]](*sys.argv[2:])
@@ -0,0 +1,72 @@
+import random
+from collections.abc import Callable
+
+import pytest
+
+from emojis import Emoji
+
+WORDS = (
+    "face smiling heart red green cat dog arrow left right up down hand wave "
+    "thumbs man woman person light dark skin tone flag star moon sun ear hear "
+    "heart-eyes o'clock x-ray a b e ea"
+).split()
+
+
+@pytest.fixture
+def word_list() -> list[str]:
+    """Words the names and tags of make_named_emojis are made of."""
+    return list(WORDS)
+
+
+@pytest.fixture
+def make_emojis() -> Callable[[int], list[Emoji]]:
+    """Factory of count distinct emojis of one group, new ones on each call."""
+
+    def make(count: int) -> list[Emoji]:
+        return [
+            Emoji(chr(0x1F600 + i), f"{0x1F600 + i:04X}", "g", "s", f"emoji {i}")
+            for i in range(count)
+        ]
+
+    return make
+
+
+@pytest.fixture
+def make_named_emojis() -> Callable[..., list[Emoji]]:
+    """Factory of count emojis with random names and tags of WORDS in a few
+    groups, the same ones on each call. Some chars are used twice."""
+
+    def make(count: int = 300) -> list[Emoji]:
+        rng = random.Random(42)
+        groups = ["Smileys", "smileys", "people-body", "arrows", "Math"]
+        subgroups = ["face-smiling", "hand", "Sm", "heart", ""]
+        emojis: list[Emoji] = []
+        for i in range(count):
+            name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+            tags = ", ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 3)))
+            if rng.random() < 0.2:
+                name = name.title()
+            char = chr(0x1F300 + (i if i % 17 else i // 2))
+            emojis.append(
+                Emoji(
+                    char,
+                    f"{ord(char):04X}",
+                    rng.choice(groups),
+                    rng.choice(subgroups),
+                    name,
+                    tags,
+                )
+            )
+        return emojis
+
+    return make
+
+
+@pytest.fixture
+def state() -> Callable[..., list[tuple[str, int, str]]]:
+    """(char, order, mark) of each of the emojis of a recent list."""
+
+    def emoji_state(emojis) -> list[tuple[str, int, str]]:
+        return [(e.char, e.order, e.mark) for e in emojis]
+
+    return emoji_state
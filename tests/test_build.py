@@ -0,0 +1,225 @@
+"""Test building the emoji caches from fixture sources served by a local http server."""
+
+import functools
+import http.server
+import threading
+from pathlib import Path
+
+import pytest
+
+import emojis
+from config import Config
+from searchindex import load_search_index
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+class FixtureHandler(http.server.SimpleHTTPRequestHandler):
+    requested: list[str] = []
+
+    def do_GET(self):
+        FixtureHandler.requested.append(self.path)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Config with all sources pointing to a local http server and caches in tmp_path."""
+    monkeypatch.delenv("EMOJI_KBD_DEV", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    FixtureHandler.requested = []
+    handler = functools.partial(FixtureHandler, directory=str(DATA_DIR))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    config = Config()
+    config.sources.emojibase = f"{url}/emojibase"
+    config.sources.unicode_data = f"{url}/ucd/UnicodeData.txt"
+    config.sources.unicode_annotations = f"{url}/annotations/"
+    yield config
+    server.shutdown()
+    server.server_close()
+
+
+def dump(all_emojis, groups) -> list[str]:
+    lines = []
+    for e in all_emojis:
+        lines.append(f"{e.char};{e.unicode};{e.name};{e.group};{e.subgroup};{e.tags};{e.mark}")
+        for v in e.emojis:
+            lines.append(f"\t{v.char};{v.unicode};{v.name};{v.group};{v.subgroup};{v.mark}")
+    for g in groups:
+        lines.append(f"{g.char}: " + ",".join(e.unicode for e in g.emojis))
+    return lines
+
+
+def test_parallel_build_matches_sequential(config, monkeypatch):
+    # parsing runs on processes only with several CPUs
+    monkeypatch.setattr(emojis.os, "cpu_count", lambda: 4)
+    parallel = dump(*emojis.get_emojis_groups_build_cache(config, parallel=True))
+    sequential = dump(*emojis.get_emojis_groups_build_cache(config, parallel=False))
+    assert parallel == sequential
+
+    names = [line.split(";")[2] for line in parallel if ";" in line and line[0] != "\t"]
+    assert "Group: golfing" in names
+    assert "rightwards arrow" in names
+    # symbols already in emojibase are dropped from UnicodeData
+    unicodes = [line.split(";")[1] for line in parallel if ";" in line and line[0] != "\t"]
+    assert unicodes.count("1F600") == 1
+    assert unicodes.count("2705") == 1
+    # excluded code points
+    assert "0041" not in unicodes
+    assert "2028" not in unicodes
+
+
+def test_locale_caches(config, monkeypatch):
+    build = emojis.get_emojis_groups_build_cache
+    builds: list[str] = []
+
+    def counting_build(config, *args):
+        builds.append(config.board.locale)
+        return build(config, *args)
+
+    monkeypatch.setattr(emojis, "get_emojis_groups_build_cache", counting_build)
+
+    built = dump(*emojis.get_emojis_groups(config))
+    downloads = len(FixtureHandler.requested)
+    assert downloads == 4  # en data & messages, UnicodeData, en annotations
+    assert dump(*emojis.get_emojis_groups(config)) == built
+
+    config.board.locale = "de"
+    german = emojis.get_emojis_groups(config)
+    assert german[0][0].name.startswith("de ")
+    # en sources are reused, only de data & messages and annotations are downloaded
+    assert len(FixtureHandler.requested) == downloads + 3
+    # the English names are searched in the German index as well
+    index = load_search_index(
+        emojis.get_locale_cache_file(config, "search.idx"), [e.char for e in german[0]]
+    )
+    assert index is not None and index.has_alternatives
+    assert index.alternatives(0)[0][0] == german[0][0].name.lower().removeprefix("de ")
+
+    config.board.locale = "en"
+    assert dump(*emojis.get_emojis_groups(config)) == built
+    assert builds == ["en", "de"]
+
+
+def test_source_url_change(config):
+    emojis.get_emojis_groups(config)
+    requested = len(FixtureHandler.requested)
+    config.sources.unicode_data += "?v=2"
+    emojis.get_emojis_groups(config)
+    assert FixtureHandler.requested[requested:] == ["/ucd/UnicodeData.txt?v=2"]
+
+
+def test_reset_caches(config, tmp_path):
+    built = dump(*emojis.get_emojis_groups(config))
+    downloads = len(FixtureHandler.requested)
+    cache_dir = tmp_path / "cache" / "emoji-kbd"
+    sources = [Path(local_file) for (_, local_file) in emojis.get_sources(config).values()]
+    assert all(p.exists() for p in sources)
+    emojis.reset_caches(config)
+    assert not (cache_dir / "manifest.json").exists()
+    assert not any((cache_dir / "en" / name).exists() for name in emojis.BUILD_OUTPUTS)
+    # the downloads are kept and only built again
+    assert all(p.exists() for p in sources)
+    assert dump(*emojis.get_emojis_groups(config)) == built
+    assert len(FixtureHandler.requested) == downloads
+
+
+def test_codepoint_classifier():
+    classifier = emojis.CodepointClassifier(
+        exclude_ranges=[[0x20, 0x7F], [0x70, 0xA0], [0x400, 0x500]],
+        exclude_points=[0xAD, 0xA1],
+        grouping=[
+            ["arrows", "", "arrow", ""],
+            ["math", "", "", "^Sm$"],
+            ["greek", "", "gr[e]ek", ""],
+            ["rest", "", ".", ""],
+        ],
+    )
+    excluded = [cp for cp in range(0x600) if classifier.is_excluded(cp)]
+    assert excluded == [*range(0x20, 0xA2), 0xAD, *range(0x400, 0x501)]
+    assert classifier.group("rightwards arrow", "Sm") == ("arrows", "")
+    assert classifier.group("n-ary summation", "Sm") == ("math", "")
+    assert classifier.group("greek capital letter omega", "Lu") == ("greek", "")
+    assert classifier.group("greek small letter alpha", "Sm") == ("math", "")
+    assert classifier.group("snowman", "So") == ("rest", "")
+    assert classifier.group("", "Cc") is None
+
+
+def test_group_classifier():
+    def linear(emoji):
+        for p in emojis.group_patterns_compiled:
+            if p.chars and emoji.char in p.chars:
+                return p
+            if p.group and not p.group.search(emoji.group):
+                continue
+            if p.subgroup and not p.subgroup.search(emoji.subgroup):
+                continue
+            return p
+        return emojis.group_patterns_compiled[-1]
+
+    classifier = emojis.GroupClassifier(emojis.group_patterns_compiled)
+    samples = [
+        emojis.Emoji("😈", "1F608", "smileys-emotion", "face-negative"),
+        emojis.Emoji("☠", "2620", "smileys-emotion", "face-negative"),
+        emojis.Emoji("🤔", "1F914", "smileys-emotion", "face-hand"),
+        emojis.Emoji("🤔", "1F914", "smileys-emotion", "cat-face"),
+        emojis.Emoji("👣", "1F463", "people-body", "person-symbol"),
+        emojis.Emoji("🎨", "1F3A8", "activities", "arts-crafts"),
+        emojis.Emoji("🪧", "1FAA7", "objects", "other-object"),
+        emojis.Emoji("🐒", "1F412", "animals-nature", "animal-mammal"),
+        emojis.Emoji("→", "2192", "arrows", "Sm"),
+        emojis.Emoji("?", "", "unknown", "unknown"),
+    ]
+    for e in samples * 2:
+        assert classifier.classify(e) is linear(e), e
+
+
+def test_gender_normalizer():
+    normalizer = emojis.GenderNormalizer()
+    assert normalizer.normalize("man golfing") == "golfing"
+    assert normalizer.normalize("woman golfing") == "golfing"
+    assert normalizer.normalize("person golfing") == "golfing"
+    assert normalizer.normalize("family: man, woman, boy") == "family"
+    assert normalizer.normalize("couple with heart: woman, man") == "with heart"
+    assert normalizer.normalize("men holding hands") == "people holding hands"
+    assert normalizer.normalize("princess") == "with crown"
+    assert normalizer.normalize("Mrs. Claus") == "Mx Claus"
+    assert normalizer.normalize("girl") == "child"
+    assert normalizer.normalize("woman") == "person"
+    assert normalizer.normalize("mermaid") == "mermaid"
+
+
+def test_squash_gender_emojis():
+    man = emojis.Emoji("🏌️‍♂️", "1F3CC-FE0F-200D-2642-FE0F", "people-body", "sport", "man golfing")
+    man.mark = "🟤"
+    man.append(emojis.Emoji("🏌🏻‍♂️", "1F3CC-1F3FB-200D-2642-FE0F", name="man golfing: light"))
+    woman = emojis.Emoji("🏌️‍♀️", "1F3CC-FE0F-200D-2640-FE0F", "people-body", "sport", "woman golfing")
+    fire = emojis.Emoji("🔥", "1F525", "travel-places", "sky-weather", "fire")
+    squashed = emojis.squash_gender_emojis([man, fire, woman])
+    assert [e.name for e in squashed] == ["Group: golfing", "fire"]
+    group = squashed[0]
+    assert (group.char, group.unicode, group.mark) == (man.char, man.unicode, "🟤")
+    assert [e.name for e in group.emojis] == ["man golfing", "man golfing: light", "woman golfing"]
+    assert not man.emojis and man.mark == ""
+
+
+def test_text_cache_lazy_variants(config):
+    (built, _groups) = emojis.get_emojis_groups_build_cache(config)
+    result = emojis.get_cached_emojis_groups(config)
+    assert result is not None
+    (cached, _groups) = result
+    assert [e.unicode for e in cached] == [e.unicode for e in built]
+    parents = [e for e in cached if e.emojis]
+    assert parents
+    for e, b in zip(cached, built):
+        assert len(e.emojis) == len(b.emojis)
+        if e.emojis:
+            assert isinstance(e.emojis, emojis.LazyEmojis)
+            assert dump(e.emojis, []) == dump(b.emojis, [])
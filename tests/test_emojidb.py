@@ -0,0 +1,148 @@
+"""Test writing and lazily reading the binary emoji database."""
+
+import pytest
+
+import emojis as emojis_module
+from emojidb import EmojiDB, load_emoji_db, write_emoji_db
+from emojis import Emoji, LazyEmojis, VariantBoards
+
+
+def make_emojis_groups() -> tuple[list[Emoji], list[Emoji]]:
+    thumbs = Emoji("👍", "1F44D", "people-body", "hand-fingers-closed", "thumbs up", "+1, yes")
+    thumbs.mark = "🟤"
+    for tone in ("1F3FB", "1F3FC"):
+        thumbs.append(
+            Emoji(
+                "👍" + chr(int(tone, 16)),
+                f"1F44D-{tone}",
+                thumbs.group,
+                thumbs.subgroup,
+                f"thumbs up: {tone}",
+                thumbs.tags,
+            )
+        )
+    heart = Emoji("❤️", "2764-FE0F", "smileys-emotion", "heart", "red heart", "love")
+    arrow = Emoji("→", "2192", "arrows", "Sm", "rightwards arrow")
+    emojis = [thumbs, heart, arrow]
+    hands = Emoji("👍️", "", thumbs.group, thumbs.subgroup, "Group")
+    hands.emojis = [thumbs]
+    symbols = Emoji("➹", "", "arrows", "", "Group")
+    symbols.emojis = [arrow, heart]
+    return (emojis, [hands, symbols])
+
+
+def dump(e: Emoji) -> tuple:
+    return (
+        e.char,
+        e.unicode,
+        e.name,
+        e.group,
+        e.subgroup,
+        e.tags,
+        e.mark,
+        [dump(v) for v in e.emojis],
+    )
+
+
+def test_roundtrip(tmp_path):
+    (emojis, groups) = make_emojis_groups()
+    path = str(tmp_path / "emojis.db")
+    write_emoji_db(path, emojis, groups)
+
+    result = load_emoji_db(path)
+    assert result is not None
+    (db_emojis, db_groups) = result
+    assert len(db_emojis) == len(emojis)
+    assert [dump(e) for e in db_emojis] == [dump(e) for e in emojis]
+    assert [(g.char, g.name) for g in db_groups] == [(g.char, g.name) for g in groups]
+    assert [[e.unicode for e in g.emojis] for g in db_groups] == [
+        [e.unicode for e in g.emojis] for g in groups
+    ]
+    # group members are the same objects as the top level emojis
+    assert db_groups[1].emojis[0] is db_emojis[2]
+    assert db_emojis[-1] is db_emojis[2]
+    assert [e.char for e in db_emojis[1:]] == ["❤️", "→"]
+
+
+def test_lazy_decoding(tmp_path):
+    (emojis, groups) = make_emojis_groups()
+    path = str(tmp_path / "emojis.db")
+    write_emoji_db(path, emojis, groups)
+
+    db = EmojiDB(path)
+    assert db.top_count == 3
+    assert db.record_count == 3 + 2
+    assert db.variant_count == 2
+    assert all(e is None for e in db._cache)
+    assert db.emojis()[1].name == "red heart"
+    assert sum(1 for e in db._cache if e is not None) == 1
+    db.close()
+
+
+def test_lazy_variants(tmp_path, monkeypatch):
+    (emojis, groups) = make_emojis_groups()
+    path = str(tmp_path / "emojis.db")
+    write_emoji_db(path, emojis, groups)
+    boards = VariantBoards(1)
+    monkeypatch.setattr(emojis_module, "variant_boards", boards)
+
+    db = EmojiDB(path)
+    decoded: list[int] = []
+    variants = db.variants
+    monkeypatch.setattr(db, "variants", lambda *args: decoded.append(1) or variants(*args))
+    thumbs = db.emojis()[0]
+    assert isinstance(thumbs.emojis, LazyEmojis)
+    assert len(thumbs.emojis) == 2
+    assert thumbs.mark == "🟤"
+    assert decoded == []
+    assert [e.unicode for e in thumbs.emojis] == ["1F44D-1F3FB", "1F44D-1F3FC"]
+    assert thumbs.emojis[1] is thumbs.emojis[1]
+    assert decoded == [1]
+    # evicted boards are decoded again on the next access
+    boards.clear()
+    assert thumbs.emojis[0].name == "thumbs up: 1F3FB"
+    assert decoded == [1, 1]
+    db.close()
+
+
+def test_find(tmp_path):
+    (emojis, groups) = make_emojis_groups()
+    path = str(tmp_path / "emojis.db")
+    write_emoji_db(path, emojis, groups)
+
+    db = EmojiDB(path)
+    assert db.find("❤️") is db.emojis()[1]
+    assert db.find("👍🏼").name == "thumbs up: 1F3FC"
+    assert db.find("👍️").name == "Group"
+    assert db.find("❤") is None and db.find("") is None
+    # the whole database from any sequence
+    assert db.groups()[0].emojis.find("→") is db.emojis()[2]
+    db.close()
+
+
+def test_invalid_files(tmp_path):
+    path = tmp_path / "emojis.db"
+    assert load_emoji_db(str(path)) is None
+    path.write_bytes(b"EKDB")
+    assert load_emoji_db(str(path)) is None
+    path.write_bytes(b"XXXX" + bytes(64))
+    with pytest.raises(ValueError):
+        EmojiDB(str(path))
+
+
+def test_too_large(tmp_path):
+    path = tmp_path / "emojis.db"
+    (emojis, groups) = make_emojis_groups()
+    write_emoji_db(str(path), emojis, groups)
+    written = path.read_bytes()
+    emojis[0].tags = "x" * 0x10000
+    with pytest.raises(ValueError):
+        write_emoji_db(str(path), emojis, groups)
+    emojis[0].tags = ""
+    for i in range(0x10000):
+        emojis[1].append(Emoji(chr(0x10000 + i), f"{0x10000 + i:04X}"))
+    with pytest.raises(ValueError):
+        write_emoji_db(str(path), emojis, groups)
+    # the database written before stays
+    assert path.read_bytes() == written
+    assert not (tmp_path / "emojis.db.tmp").exists()
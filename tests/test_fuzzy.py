@@ -0,0 +1,74 @@
+"""Test the typo tolerant word lookup and fuzzy search."""
+
+import random
+
+from board import SearchGroup
+from fuzzy import FuzzyIndex, max_distance, words
+from store import EmojiStore
+
+
+def osa_distance(a: str, b: str) -> int:
+    """Reference optimal string alignment distance."""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(
+                d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1])
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[len(a)][len(b)]
+
+
+def test_lookup_matches_brute_force(word_list):
+    rng = random.Random(5)
+    vocabulary = words(word_list + ["thumbs", "thumb", "smile", "smiley", "rainbow", "brain"])
+    index = FuzzyIndex(vocabulary)
+    assert index.size == len(vocabulary)
+    queries = list(vocabulary)
+    for word in list(vocabulary):
+        chars = list(word)
+        i = rng.randrange(len(chars))
+        edit = rng.choice(["swap", "drop", "add", "replace"])
+        if edit == "swap" and i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        elif edit == "drop":
+            del chars[i]
+        elif edit == "add":
+            chars.insert(i, rng.choice("aeimsx"))
+        else:
+            chars[i] = rng.choice("aeimsx")
+        queries.append("".join(chars))
+    for query in queries:
+        for distance in (0, 1, 2):
+            expected = sorted(
+                (w, osa_distance(query, w))
+                for w in vocabulary
+                if osa_distance(query, w) <= distance
+            )
+            assert sorted(index.lookup(query, distance)) == expected, (query, distance)
+    assert index.lookup("smiel", 1) == [("smile", 1)]
+    assert max_distance("ab") == 0 and max_distance("hart") == 1 and max_distance("smiel") == 2
+
+
+def test_fuzzy_search(make_named_emojis):
+    emojis = make_named_emojis()
+    store = EmojiStore(emojis)
+    exact = SearchGroup(store)
+    fuzzy = SearchGroup(store, fuzzy=True)
+    assert exact.search("smilign") == 0
+    assert fuzzy.search("smilign") == exact.search("smiling") > 0
+    assert {e.char for e in fuzzy.emojis} == {e.char for e in exact.emojis}
+    # typos score less than exact matches
+    assert fuzzy.emojis.score(0) < exact.emojis.score(0)
+    # "~" is fuzzy without a fallback and also finds exact matches
+    assert exact.search("~hert") >= exact.search("heart") > 0
+    # exact matches never fall back
+    assert fuzzy.search("heart") == exact.search("heart")
+    assert fuzzy.search("heart qqqq") == 0
+    # typing on after a fuzzy result searches anew
+    for needle in ("smilin", "smilign", "smilign x", "smiling"):
+        fuzzy.search(needle)
+        fresh = SearchGroup(store, fuzzy=True)
+        fresh.search(needle)
+        assert list(fuzzy.emojis) == list(fresh.emojis), needle
@@ -0,0 +1,124 @@
+"""Test the usage history and the recent list made from it."""
+
+import random
+import sqlite3
+import time
+
+from board import RecentGroup
+from history import UsageHistory
+from recent import RecentList
+
+
+def test_top_as_recent_list(tmp_path, make_emojis, state):
+    rng = random.Random(3)
+    emojis = make_emojis(60)
+    history = UsageHistory(str(tmp_path / "history.db"), "test")
+    recent = RecentList(1000)
+    for _ in range(2000):
+        e = emojis[min(int(rng.expovariate(0.1)), len(emojis) - 1)]
+        history.record(e.char)
+        recent.add(e)
+    assert history.epoch() == 2000
+    top = history.top(1000)
+    assert sorted(top) == sorted((char, order) for (char, order, _) in state(recent))
+    # the same order, but for those decayed to 0
+    scored = [(e.char, e.order) for e in recent if e.order > 0]
+    assert top[: len(scored)] == scored
+    assert history.top(5) == top[:5]
+    history.close()
+
+
+def test_stats(tmp_path, make_emojis):
+    path = str(tmp_path / "history.db")
+    emojis = make_emojis(3)
+    day = time.mktime((2026, 3, 1, 0, 0, 0, 0, 0, -1))
+    gui = UsageHistory(path, "guikbd")
+    term = UsageHistory(path, "termkbd")
+    for hour in (9, 9, 13):
+        gui.record(emojis[0].char, day + hour * 3600)
+    term.record(emojis[1].char, day + 9 * 3600 + 60)
+    term.record(emojis[0].char, day + 22 * 3600)
+    hours = gui.uses_by_hour()
+    assert (hours[9], hours[13], hours[22], sum(hours)) == (3, 1, 1, 5)
+    assert term.uses_by_frontend() == {"guikbd": 3, "termkbd": 2}
+    assert gui.most_used(2) == [(emojis[0].char, 4), (emojis[1].char, 1)]
+    assert [char for (char, _) in term.top(3)] == [emojis[0].char, emojis[1].char]
+    gui.close()
+    term.close()
+
+
+def test_rebuild_recent(tmp_path, make_emojis, state):
+    recent_file = tmp_path / "recent.txt"
+    emojis = make_emojis(10)
+    history = UsageHistory(str(tmp_path / "history.db"))
+    group = RecentGroup(str(recent_file), 5, None, history)
+    for e in emojis[:3] + emojis[:2] + emojis[6:9]:
+        group.add(e, False)
+    group.toggle_favorite(emojis[0])
+    group.toggle_favorite(emojis[1])
+    group.toggle_favorite(emojis[1])
+    group.delete(emojis[6])
+    group.close()
+    expected = state(group.emojis)
+    assert expected[0] == (emojis[0].char, 100, "⭐️") and len(expected) == 4
+
+    # favorites and deletions are kept with the uses, the place of the
+    # deleted one goes to the next in the history
+    recent_file.unlink()
+    history = UsageHistory(str(tmp_path / "history.db"))
+    find = {e.char: e for e in emojis}.get
+    rebuilt = RecentGroup(str(recent_file), 5, find, history)
+    assert state(rebuilt.emojis) == [*expected[:3], (emojis[2].char, 5, "5"), expected[3]]
+    assert rebuilt.emojis[0].name == emojis[0].name
+    assert recent_file.exists()
+    # a deleted emoji used again starts over
+    rebuilt.add(emojis[6], False)
+    assert history.top(5)[1] == (emojis[6].char, 10)
+    # a saved list wins, even when emptied
+    for e in list(rebuilt.emojis):
+        rebuilt.delete(e)
+    rebuilt.close()
+    history = UsageHistory(str(tmp_path / "history.db"))
+    assert len(RecentGroup(str(recent_file), 5, find, history).emojis) == 0
+
+
+def test_locked(tmp_path, make_emojis, caplog):
+    path = str(tmp_path / "history.db")
+    emojis = make_emojis(2)
+    history = UsageHistory(path)
+    history.record(emojis[0].char)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    # a use while another instance writes is dropped, without waiting long
+    start = time.perf_counter()
+    history.record(emojis[1].char)
+    assert time.perf_counter() - start < 2
+    assert "dropped" in caplog.text
+    other.execute("ROLLBACK")
+    other.close()
+    history.record(emojis[1].char)
+    assert history.epoch() == 2
+    history.close()
+
+
+def test_schema_upgrade(tmp_path, make_emojis):
+    path = str(tmp_path / "history.db")
+    emoji = make_emojis(1)[0]
+    db = sqlite3.connect(path)
+    db.executescript(
+        """
+        CREATE TABLE uses (id INTEGER PRIMARY KEY, time REAL, frontend TEXT, emoji TEXT);
+        CREATE TABLE ranks (
+            emoji TEXT PRIMARY KEY, score INTEGER, epoch INTEGER, uses INTEGER, last REAL
+        ) WITHOUT ROWID;
+        INSERT INTO uses VALUES (1, 0, 'test', '1F600');
+        INSERT INTO ranks VALUES ('1F600', 10, 1, 1, 0);
+        PRAGMA user_version = 1;
+        """
+    )
+    db.close()
+    history = UsageHistory(path)
+    assert history.top(1) == [(emoji.char, 10)]
+    history.hide(emoji.char)
+    assert history.top(1) == []
+    history.close()
@@ -0,0 +1,173 @@
+"""Test the compiled layouts and page views against the board before."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from board import PageView
+from config import load_config
+from emojis import Emoji
+from layout import STEPS, compile_layout
+
+LAYOUTS = {layout.name: layout.kbd for layout in load_config("res/emoji-kbd.toml").layout}
+
+
+class StringBoard:
+    """Key lookups and cursor moves of the board on the layout string."""
+
+    def __init__(self, kbd: str):
+        self._layout = kbd
+        self._rows = kbd.splitlines()
+        self._height = len(self._rows)
+        self._cursor_x = -1
+        self._cursor_y = -1
+
+    def get_key_pos(self, key: str) -> int:
+        return self._layout.replace(" ", "").replace("\n", "").find(key)
+
+    def find_key(self, key: str) -> tuple[int, int]:
+        for y, row in enumerate(self._rows):
+            x = row.find(key)
+            if x >= 0:
+                return (x, y)
+        return (-1, -1)
+
+    def move_cursor(self, dx: int, dy: int, cx: int, cy: int) -> tuple[int, int]:
+        x = cx + dx
+        y = cy + dy
+
+        if dy <= -100:
+            y = 0
+        elif dy >= 100:
+            y = self._height - 1
+        elif y < 0:
+            y = 0
+        elif y > self._height - 1:
+            y = self._height - 1
+
+        if dx <= -100:
+            x = 0
+            dx = 1
+        elif dx >= 100:
+            x = len(self._rows[y]) - 1
+            dx = -1
+        elif x < 0:
+            if y > 0:
+                y -= 1
+                x = len(self._rows[y]) - 1
+                dx = -1
+            else:
+                x = 0
+                dx = 1
+        elif x > len(self._rows[y]) - 1:
+            if y < self._height - 1:
+                y += 1
+                x = 0
+                dx = 1
+            else:
+                x = len(self._rows[y]) - 1
+                dx = -1
+
+        key = self._rows[y][x]
+
+        if key == " ":
+            if dy and 0 < y < self._height - 1:
+                return self.move_cursor(dx, dy, x, y)
+            if (dy or dx < 0) and x > 0:
+                return self.move_cursor(-1, 0, x, y)
+            if (dy or dx > 0) and x < len(self._rows[y]):
+                return self.move_cursor(1, 0, x, y)
+            return (self._cursor_x, self._cursor_y)
+
+        return (x, y)
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_moves(name: str):
+    kbd = LAYOUTS[name]
+    board = StringBoard(kbd)
+    layout = compile_layout(kbd)
+    cells = [(x, y) for (y, row) in enumerate(layout.rows) for x in range(len(row))]
+    assert set(layout.grid) <= set(cells)
+    # from every key and gap, by the table and by any other distance
+    steps = [*STEPS, (5, 0), (-3, 0), (13, 0), (0, 2), (2, -1), (-30, 0)]
+    for x, y in cells:
+        for dx, dy in steps:
+            expected = board.move_cursor(dx, dy, x, y)
+            assert (layout.move(x, y, dx, dy) or (-1, -1)) == expected, (x, y, dx, dy)
+    assert compile_layout(kbd) is layout
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_keys(name: str):
+    kbd = LAYOUTS[name]
+    board = StringBoard(kbd)
+    layout = compile_layout(kbd)
+    assert layout.keys == [k for k in kbd if k not in (" ", "\n")]
+    assert layout.key_count == sum(1 for k in kbd if not k.isspace())
+    for key in layout.keys:
+        assert layout.index[key] == board.get_key_pos(key)
+        assert layout.positions[key] == board.find_key(key)
+        assert layout.grid[layout.positions[key]] == key
+    assert (layout.width, layout.height) == (max(map(len, board._rows)), len(board._rows))
+
+
+def test_gaps():
+    layout = compile_layout(" A \n B\nC  D\n")
+    assert layout.keys == ["A", "B", "C", "D"]
+    # over the gaps to the next key in the row, or back
+    assert layout.move(1, 0, 1, 0) == (1, 1)
+    assert layout.move(0, 2, 1, 0) == (3, 2)
+    assert layout.move(3, 2, 1, 0) == (3, 2)
+    assert layout.move(1, 0, 0, 100) == (0, 2)
+    assert layout.move(3, 2, -100, -100) == (1, 0)
+
+
+def make_mapping(kbd: str, emojis: list[Emoji], offset: int) -> dict[str, Emoji]:
+    """The mapping of keys to emojis the board rebuilt on every change."""
+    mapping = {}
+    i = offset
+    for k in kbd:
+        if k not in (" ", "\n"):
+            if i < len(emojis):
+                mapping[k] = emojis[i]
+                i += 1
+    return mapping
+
+
+def make_term_board(kbd: str, emojis: list[Emoji], offset: int) -> list[list[tuple]]:
+    """The rows of the terminal frontend."""
+    term_board = []
+    i = offset
+    for row in kbd.splitlines():
+        term_row = []
+        for key in row:
+            if key == " ":
+                term_row.append((" ", None))
+            elif i < len(emojis):
+                term_row.append((key, emojis[i]))
+                i += 1
+            else:
+                term_row.append((key, None))
+        term_board.append(term_row)
+    return term_board
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_page_view(name: str, make_emojis):
+    kbd = LAYOUTS[name]
+    layout = compile_layout(kbd)
+    emojis = make_emojis(100)
+    board = SimpleNamespace(_layout=layout, _emojis=emojis, _offset=0)
+    page = PageView(board)  # type: ignore[arg-type]
+    for offset in (0, layout.key_count, 90, 100):
+        board._offset = offset
+        mapping = make_mapping(kbd, emojis, offset)
+        assert {key: page.get(key) for key in layout.keys if page.get(key)} == mapping
+        assert list(page.rows()) == make_term_board(kbd, emojis, offset)
+        assert page.emojis[page.start : page.stop] == list(mapping.values())
+    # follows the board without being told
+    board._offset = 0
+    emojis.insert(0, Emoji("⭐"))
+    assert page.get(layout.keys[0]) is emojis[0]
+    assert page.get("\n") is None and page.at(-1, 0) is None
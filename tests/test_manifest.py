@@ -0,0 +1,64 @@
+"""Test cache invalidation through the cache manifest."""
+
+import os
+
+from manifest import CacheManifest, hash_text
+
+
+def test_source_hash(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text("[1]")
+    manifest = CacheManifest(str(tmp_path / "manifest.json"))
+    url = "https://example.com/data.json"
+
+    assert manifest.source_hash(url, str(source)) is None
+    # present files are adopted without downloading
+    sha256 = manifest.fetch(url, str(source))
+    assert manifest.source_hash(url, str(source)) == sha256
+    # another url invalidates the download
+    assert manifest.source_hash(url + "?v=2", str(source)) is None
+    # changed content is hashed again
+    source.write_text("[1, 2]")
+    os.utime(source, ns=(0, 0))
+    assert manifest.source_hash(url, str(source)) not in (None, sha256)
+
+
+def test_outputs(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = CacheManifest(path)
+    inputs = {"tables": hash_text("tables"), "data": hash_text("data")}
+    assert not manifest.is_current("en", inputs)
+    manifest.record("en", inputs)
+    manifest.save()
+
+    manifest = CacheManifest(path)
+    assert manifest.is_current("en", inputs)
+    assert not manifest.is_current("de", inputs)
+    assert not manifest.is_current("en", {**inputs, "data": hash_text("new data")})
+    assert not manifest.is_current("en", {**inputs, "data": None})
+
+
+def test_broken_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text("{not json")
+    manifest = CacheManifest(str(path))
+    assert manifest.sources == {}
+    assert manifest.outputs == {}
+
+
+def test_rehash_recorded(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text("[1]")
+    path = str(tmp_path / "manifest.json")
+    manifest = CacheManifest(path)
+    url = "https://example.com/data.json"
+    sha256 = manifest.fetch(url, str(source))
+    manifest.save()
+    assert not manifest.changed
+
+    # a new stat of the same content is recorded, so it is hashed once
+    os.utime(source, ns=(0, 0))
+    assert manifest.source_hash(url, str(source)) == sha256
+    assert manifest.changed
+    manifest.save()
+    assert CacheManifest(path).sources[str(source)]["mtime"] == 0
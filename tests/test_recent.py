@@ -0,0 +1,311 @@
+"""Differential test of the recent list against the algorithm it replaced."""
+
+import gc
+import multiprocessing
+import random
+import weakref
+
+import board
+from board import RecentGroup
+from emojis import Emoji
+from journal import Journal
+from recent import RecentList, codepoints
+
+
+class LinearRecent:
+    """The recent list before the index, decaying every entry on each use."""
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.emojis: list[Emoji] = []
+
+    def add(self, emoji: Emoji, no_sort: bool):
+        if emoji.char not in [e.char for e in self.emojis]:
+            emoji = emoji.clone()
+            self.emojis.append(emoji)
+        emoji = next(e for e in self.emojis if e.char == emoji.char)
+        if emoji.order < 100:
+            emoji.order += 10
+            if emoji.order >= 100:
+                emoji.order = 100
+                emoji.mark = "⭐️"
+            elif emoji.order > 0:
+                emoji.mark = str(emoji.order)
+        for e in self.emojis:
+            if e != emoji and e.order < 100:
+                if e.order > 0:
+                    e.order -= 1
+                e.mark = str(e.order) if e.order > 0 else ""
+        if not no_sort:
+            self.emojis.sort(key=lambda e: e.order, reverse=True)
+        del self.emojis[self.capacity :]
+
+    def toggle_favorite(self, emoji: Emoji):
+        (emoji.order, emoji.mark) = (0, "") if emoji.order >= 100 else (100, "⭐️")
+
+    def move(self, i: int, direction: int):
+        r = self.emojis
+        if 0 <= i + direction < len(r):
+            r[i], r[i + direction] = r[i + direction], r[i]
+
+
+def test_same_order_as_linear(make_emojis, state):
+    rng = random.Random(5)
+    emojis = make_emojis(60)
+    for capacity in (100, 20):
+        linear = LinearRecent(capacity)
+        recent = RecentList(capacity)
+        for step in range(5000):
+            op = rng.random()
+            if op < 0.75 or not linear.emojis:
+                # a few popular ones make favorites by use
+                e = emojis[min(int(rng.expovariate(0.1)), len(emojis) - 1)]
+                no_sort = rng.random() < 0.1
+                linear.add(e, no_sort)
+                recent.add(e, no_sort)
+            else:
+                i = rng.randrange(len(linear.emojis))
+                entry = recent.entries[i]
+                if op < 0.85:
+                    linear.toggle_favorite(linear.emojis[i])
+                    recent.toggle_favorite(entry)
+                elif op < 0.95:
+                    direction = rng.choice((-1, 1))
+                    linear.move(i, direction)
+                    recent.move(entry, direction)
+                else:
+                    del linear.emojis[i]
+                    recent.remove(entry)
+            assert state(recent) == state(linear.emojis), step
+        assert len(recent) <= capacity
+        assert all(recent.get(e.char) is e for e in recent)
+
+
+def test_capacity(make_emojis, state):
+    recent = RecentList(1000)
+    emojis = make_emojis(1200)
+    for e in emojis:
+        recent.add(e)
+    assert len(recent) == 1000
+    assert emojis[0].char not in recent and emojis[-1].char in recent
+    # the latest use first, all others decayed to 0
+    assert state(recent)[:2] == [(emojis[-1].char, 10, "10"), (emojis[-2].char, 9, "9")]
+
+
+def test_save_load(tmp_path, make_emojis, state):
+    recent_file = str(tmp_path / "recent.txt")
+    emojis = make_emojis(10)
+    group = RecentGroup(recent_file)
+    for e in emojis[:5] + emojis[2:4]:
+        group.add(e, False)
+    group.toggle_favorite(emojis[4])
+    assert group.move(emojis[0], -1)
+    assert not group.move(group.emojis[-1], 1)
+    group.delete(emojis[1])
+    saved = state(group.emojis)
+    group.close()
+    assert (emojis[4].char, 100, "⭐️") in saved
+    loaded = RecentGroup(recent_file, 3, {e.char: e for e in emojis}.get)
+    assert state(loaded.emojis) == sorted(saved, key=lambda s: s[1], reverse=True)
+    assert loaded.emojis[0].name == emojis[4].name
+    # moved by hand, saved and restored in score order
+    assert state(loaded.emojis) != saved
+    loaded.add(emojis[9], False)
+    assert len(loaded.emojis) == 3
+
+
+def test_journal(tmp_path, monkeypatch, make_emojis, state):
+    recent_file = tmp_path / "recent.txt"
+    journal_file = tmp_path / "recent.journal"
+    emojis = make_emojis(10)
+    group = RecentGroup(str(recent_file))
+    for e in emojis[:6]:
+        group.add(e, False)
+    group.close()
+    snapshot = recent_file.read_text()
+    assert snapshot.startswith("# snapshot ") and journal_file.read_text().count("\n") == 1
+
+    # each change appends a record, the snapshot stays
+    group = RecentGroup(str(recent_file))
+    group.add(emojis[6], False)
+    group.add(emojis[0], True)
+    group.toggle_favorite(emojis[1])
+    group.move(emojis[2], -1)
+    group.delete(emojis[3])
+    group.delete(emojis[3])
+    assert not group.move(group.emojis[-1], 1)
+    assert recent_file.read_text() == snapshot
+    records = journal_file.read_text().splitlines()[1:]
+    assert [r[0] for r in records] == ["+", "+", "*", "<", "-"]
+    # a crash mid-write loses the partial record only
+    with open(journal_file, "a", encoding="utf-8") as f:
+        f.write("+;0;" + emojis[9].char)
+    journal = journal_file.read_text()
+    expected = state(group.emojis)
+    crashed = RecentGroup(str(recent_file))
+    assert state(crashed.emojis) == expected
+    # the order by hand of another instance is kept as it is
+    assert expected != sorted(expected, key=lambda s: s[1], reverse=True)
+    assert journal_file.read_text() == journal
+    assert state(RecentGroup(str(recent_file)).emojis) == expected
+
+    # a journal left over by a crash after the snapshot was replaced is ignored
+    left_over = journal_file.read_text()
+    crashed.close()
+    journal_file.write_text(left_over)
+    group = RecentGroup(str(recent_file))
+    assert state(group.emojis) == expected
+    group.add(emojis[7], False)
+    assert state(RecentGroup(str(recent_file)).emojis) == state(group.emojis)
+
+    # saved as a whole after COMPACT_OPS records
+    monkeypatch.setattr(board, "COMPACT_OPS", 3)
+    for e in emojis[:4]:
+        group.add(e, False)
+    assert group.journal.ops < 3
+    assert len(journal_file.read_text().splitlines()) == 1 + group.journal.ops
+    assert state(RecentGroup(str(recent_file)).emojis) == state(group.emojis)
+
+
+def test_journal_close(tmp_path):
+    journal = Journal(str(tmp_path / "recent.txt"), sync_delay=60)
+    with journal.locked():
+        journal.append("+;0;1F600")
+    timer = journal._sync_timer
+    assert timer is not None and timer.is_alive()
+    journal.close()
+    timer.join(1)
+    assert not timer.is_alive() and journal._sync_timer is None
+    # nothing keeps a closed journal alive
+    closed = weakref.ref(journal)
+    del journal, timer
+    gc.collect()
+    assert closed() is None
+
+
+def test_codepoints(tmp_path, make_emojis):
+    recent_file = tmp_path / "recent.txt"
+    emojis = make_emojis(10)
+    group = RecentGroup(str(recent_file))
+    for e in emojis[:3]:
+        group.add(e, False)
+    group.close()
+    assert recent_file.read_text().splitlines()[1:] == ["10;1F602", "9;1F601", "8;1F600"]
+
+    # names and variants from the emoji data of the current locale
+    localized = [Emoji(e.char, e.unicode, "g", "s", f"Emoji {i}") for (i, e) in enumerate(emojis)]
+    localized[1].append(Emoji(chr(0x1F601) + "\U0001f3fb", "1F601-1F3FB"))
+    find = {e.char: e for e in localized[1:]}.get
+    group = RecentGroup(str(recent_file), find=find)
+    assert [e.name for e in group.emojis] == ["Emoji 2", "Emoji 1", ""]
+    assert group.emojis[1].emojis is localized[1].emojis
+    # unknown ones keep their char
+    assert (group.emojis[2].char, group.emojis[2].unicode) == (emojis[0].char, "1F600")
+
+
+def test_migrate(tmp_path, make_emojis, state):
+    recent_file = tmp_path / "recent.txt"
+    emojis = make_emojis(4)
+    # the emoji fields of earlier versions, with an old record in the journal
+    lines = [f"{20 - i};{e.char};{e.unicode};old {i};g;s;tag" for (i, e) in enumerate(emojis[:3])]
+    recent_file.write_text("# snapshot 1\n" + "\n".join(lines) + "\n")
+    (tmp_path / "recent.journal").write_text(
+        f"# snapshot 1 after \n+;0;{emojis[3].char};1F603;old 3;g;s;\n"
+    )
+    group = RecentGroup(str(recent_file), find={e.char: e for e in emojis[1:]}.get)
+    assert [e.name for e in group.emojis] == ["old 0", "emoji 1", "emoji 2", "emoji 3"]
+    assert [e.tags for e in group.emojis] == ["tag", "", "", ""]
+    # saved once in the new format
+    assert recent_file.read_text().splitlines()[1:] == [
+        "19;1F600",
+        "18;1F601",
+        "17;1F602",
+        "10;1F603",
+    ]
+    assert state(RecentGroup(str(recent_file)).emojis) == state(group.emojis)
+
+
+def test_shared(tmp_path, make_emojis, state):
+    recent_file = str(tmp_path / "recent.txt")
+    emojis = make_emojis(10)
+    first = RecentGroup(recent_file)
+    second = RecentGroup(recent_file)
+    assert not second.refresh()
+    first.add(emojis[0], False)
+    first.add(emojis[1], False)
+    assert second.refresh() and not second.refresh()
+    assert state(second.emojis) == state(first.emojis)
+    # merged before writing, the same order everywhere
+    second.add(emojis[2], False)
+    first.add(emojis[1], False)
+    second.toggle_favorite(emojis[0])
+    assert first.refresh()
+    assert state(first.emojis) == state(second.emojis)
+    # after another instance saved, only the changes are applied
+    entries = list(second.emojis)
+    first.add(emojis[4], False)
+    first.close()
+    assert second.refresh()
+    assert state(second.emojis) == state(first.emojis)
+    assert all(e in second.emojis for e in entries)
+    second.add(emojis[3], False)
+    assert state(RecentGroup(recent_file).emojis) == state(second.emojis)
+    # an order by hand stays for the instances starting meanwhile, the
+    # instance that made it sorts on close
+    assert second.move(second.emojis[-1], -1)
+    ordered = state(second.emojis)
+    third = RecentGroup(recent_file)
+    assert state(third.emojis) == ordered
+    third.close()
+    second.refresh()
+    assert state(second.emojis) == ordered
+    second.close()
+    assert state(RecentGroup(recent_file).emojis) == sorted(
+        ordered, key=lambda s: s[1], reverse=True
+    )
+
+
+def use_recent(recent_file: str, emojis: list[Emoji], worker: int, barrier) -> list[str]:
+    """Use a shared recent list like an instance of Emoji Kbd in another process,
+    return the entries it ends with as snapshot lines."""
+    board.COMPACT_OPS = 25
+    rng = random.Random(worker)
+    own = emojis[worker * 5 : worker * 5 + 5]
+    group = RecentGroup(recent_file, 1000)
+    barrier.wait()
+    for _ in range(150):
+        op = rng.random()
+        if op < 0.3:
+            group.add(rng.choice(own), False)
+        elif op < 0.8:
+            group.add(rng.choice(emojis[20:]), rng.random() < 0.1)
+        elif op < 0.9:
+            group.toggle_favorite(rng.choice(emojis[20:]))
+        else:
+            group.move(rng.choice(emojis[20:]), rng.choice((-1, 1)))
+        if rng.random() < 0.2:
+            group.refresh()
+    barrier.wait()
+    group.refresh()
+    result = group.snapshot()
+    barrier.wait()
+    group.close()
+    return result
+
+
+def test_shared_processes(tmp_path, make_emojis):
+    recent_file = str(tmp_path / "recent.txt")
+    processes = 4
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        barrier = manager.Barrier(processes)
+        with context.Pool(processes) as pool:
+            emojis = make_emojis(40)
+            args = [(recent_file, emojis, worker, barrier) for worker in range(processes)]
+            results = pool.starmap(use_recent, args)
+    # all saw the same changes in the same order and none is lost
+    assert all(result == results[0] for result in results)
+    final = RecentGroup(recent_file, 1000).snapshot()
+    assert final == sorted(results[0], key=lambda line: int(line.split(";")[0]), reverse=True)
+    keys = {line.split(";")[1] for line in final}
+    assert {codepoints(e.char) for e in emojis[:20]} <= keys
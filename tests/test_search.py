@@ -0,0 +1,264 @@
+"""Differential test of the indexed search against a linear scan over all emojis."""
+
+import random
+import threading
+
+import pytest
+
+from board import SearchGroup
+from emojis import Emoji
+from search import (
+    RESULT_ID_BYTES,
+    QueryTerm,
+    RankedIds,
+    SearchCache,
+    SearchCancelled,
+    SearchEngine,
+    SearchResult,
+    SearchWorker,
+    match,
+    parse_query,
+)
+from searchindex import SearchIndex, load_search_index, write_search_index
+from store import EmojiStore
+
+
+def make_queries(emojis: list[Emoji]) -> list[str]:
+    rng = random.Random(7)
+    texts = [e.name.lower() for e in emojis[:50]] + [e.tags.lower() for e in emojis[:50]]
+    terms: set[str] = set()
+    for text in texts:
+        for n in range(1, 6):
+            for i in range(len(text) - n + 1):
+                term = text[i : i + n]
+                if " " not in term:
+                    terms.add(term)
+    terms.update(["zzz", "q", "heart-e", "o'c", "ear,", ",hand", "smi,fa", "+1F3", "+1f30"])
+    queries = sorted(terms)
+    queries += [f"#{t}" for t in queries[::7]]
+    queries += [f"{g}," for g in ("smi", "ARR", "m", "e")]
+    queries += [",sm", ",", "a,", "x y", " heart  red ", "HEART"]
+    queries += [f"{rng.choice(queries)} {rng.choice(queries)}" for _ in range(800)]
+    return queries
+
+
+def linear_search(emojis: list[Emoji], needle: str) -> list[tuple[str, int]]:
+    """The search engine before the index, scanning every emoji for every term."""
+    match = SearchGroup().match
+    scores: dict[int, int] = {}
+
+    def scan(ids: list[int], needle: str, key) -> list[int]:
+        matches = []
+        for i in ids:
+            score = match(key(emojis[i]), needle)
+            if score:
+                scores[i] = scores.get(i, 0) + score
+                matches.append(i)
+        return matches
+
+    matches = list(range(len(emojis)))
+    for n in needle.lower().split(" "):
+        if not n:
+            continue
+        if "," in n:
+            (group, subgroup) = n.split(",", 1)
+            if group:
+                matches = scan(matches, group, lambda e: e.group.lower())
+            if subgroup:
+                matches = scan(matches, subgroup, lambda e: e.subgroup.lower())
+        elif n.startswith("+"):
+            if n[1:]:
+                matches = scan(matches, n[1:].upper(), lambda e: e.unicode)
+        elif n.startswith("#"):
+            if n[1:]:
+                matches = scan(matches, n[1:], lambda e: e.tags.lower())
+        else:
+            names = scan(matches, n, lambda e: e.name.lower())
+            tags = scan(matches, n, lambda e: e.tags.lower())
+            matches = sorted(set(names + tags))
+    ranked = sorted(matches, key=lambda i: scores.get(i, 0), reverse=True)
+    result: dict[str, int] = {}
+    for i in ranked:
+        result.setdefault(emojis[i].char, scores.get(i, 0))
+    return list(result.items())
+
+
+def results(search: SearchGroup) -> list[tuple[str, int]]:
+    view = search.emojis
+    return [(e.char, view.score(i)) for (i, e) in enumerate(view)]
+
+
+@pytest.mark.parametrize("persisted", [False, True])
+def test_index_matches_linear_search(tmp_path, persisted, make_named_emojis):
+    emojis = make_named_emojis()
+    index_file = None
+    if persisted:
+        index_file = str(tmp_path / "search.idx")
+        write_search_index(index_file, emojis)
+    store = EmojiStore(emojis, index_file)
+    search = SearchGroup(store)
+    queries = make_queries(emojis)
+    assert len(queries) > 1000
+    for query in queries:
+        search.search(query)
+        assert results(search) == linear_search(emojis, query), query
+    assert type(store.index).__name__ == ("MappedSearchIndex" if persisted else "SearchIndex")
+
+
+def test_outdated_index(tmp_path, make_named_emojis):
+    emojis = make_named_emojis(20)
+    index_file = str(tmp_path / "search.idx")
+    write_search_index(index_file, emojis)
+    assert load_search_index(index_file, [e.char for e in emojis]) is not None
+    assert load_search_index(index_file, [e.char for e in emojis[1:]]) is None
+    assert load_search_index(index_file, [e.char for e in reversed(emojis)]) is None
+    (tmp_path / "search.idx").write_bytes(b"EKIX")
+    assert load_search_index(index_file, [e.char for e in emojis]) is None
+
+
+def test_incremental_search(make_named_emojis):
+    emojis = make_named_emojis()
+    store = EmojiStore(emojis)
+    search = SearchGroup(store)
+    steps: list[str] = []
+    for typed in ("heart red", "smi,fa", "smi,", "#heart-e", "+1F3", "o'clock x", "ear hear"):
+        prefixes = [typed[:n] for n in range(1, len(typed) + 1)]
+        # type, delete again and edit in the middle
+        steps += prefixes + prefixes[::-1] + [typed, typed[1:], "x" + typed]
+    for needle in steps:
+        search.search(needle)
+        fresh = SearchGroup(store)
+        fresh.search(needle)
+        assert results(search) == results(fresh), needle
+        assert results(search) == linear_search(emojis, needle), needle
+    # scores live in the results, the emojis are left alone
+    assert all(e.order == 0 for e in emojis)
+
+
+def test_ranked_ids():
+    rng = random.Random(3)
+    ids = sorted(rng.sample(range(5000), 2000))
+    scores = {i: rng.randint(1, 30) for i in ids}
+    expected = sorted(ids, key=lambda i: scores[i], reverse=True)
+    for pages in ([0, 1, 2], [5, 0, 8], [40]):
+        ranked = RankedIds(ids, scores)
+        assert len(ranked) == len(ids)
+        assert ranked._ranked == []
+        for page in pages:
+            start = page * 46
+            assert ranked[start : start + 46] == expected[start : start + 46]
+        if pages != [40]:
+            assert len(ranked._ranked) < len(ids)
+    assert list(RankedIds(ids, scores)) == expected
+    assert RankedIds(ids, scores).score(0) == scores[expected[0]]
+    # without scores the ids keep their order
+    assert list(RankedIds(ids, {})) == ids
+
+
+def test_parse_query():
+    assert parse_query(" heart  #red +1f4 smi,fa , + # ,hand") == [
+        QueryTerm("text", "heart"),
+        QueryTerm("tag", "red"),
+        QueryTerm("hex", "1F4"),
+        QueryTerm("group", "smi", "fa"),
+        QueryTerm("group", "", "hand"),
+    ]
+    assert QueryTerm("group", "smi", "fa").refines(QueryTerm("group", "sm", ""))
+    assert not QueryTerm("tag", "heart").refines(QueryTerm("text", "heart"))
+
+
+def test_search_worker(make_named_emojis):
+    emojis = make_named_emojis()
+    store = EmojiStore(emojis)
+    engine = SearchEngine(store)
+    with pytest.raises(SearchCancelled):
+        engine.search("e", cancelled=lambda: True)
+    done: list[tuple[int, SearchResult]] = []
+    delivered = threading.Event()
+
+    def receive(generation: int, result: SearchResult):
+        done.append((generation, result))
+        if result.needle == "heart":
+            delivered.set()
+
+    worker = SearchWorker(engine, receive)
+    # superseded needles are dropped or cancelled, the newest is delivered
+    for needle in ("h", "he", "hea", "heart"):
+        generation = worker.submit(needle)
+    assert delivered.wait(5)
+    worker.close()
+    (last_generation, result) = done[-1]
+    assert last_generation == generation
+    assert result.needle == "heart"
+    expected = engine.search("heart")
+    assert (list(result.ids), list(result.scores)) == (list(expected.ids), list(expected.scores))
+
+
+def test_search_cache(make_named_emojis):
+    emojis = make_named_emojis()
+    store = EmojiStore(emojis)
+    cache = SearchCache(max_entries=3)
+    engine = SearchEngine(store, cache=cache)
+    result = engine.search("heart  red")
+    assert engine.search(" HEART red") is result
+    assert (cache.hits, cache.misses) == (1, 1)
+    for needle in ("a", "b", "e"):
+        engine.search(needle)
+    # least recently used first out
+    assert len(cache) == 3 and cache.evictions == 1
+    assert engine.search("heart red") is not result
+    # bounded by size too, too large results are not kept at all
+    cache.max_bytes = RESULT_ID_BYTES
+    engine.search("zzz")
+    assert len(cache) == 1 and cache.bytes == 0
+    engine.search("e")
+    assert len(cache) == 1
+    # another store, e.g. another locale, invalidates all results
+    other = SearchEngine(EmojiStore(emojis[1:]), cache=cache)
+    other.search("a")
+    assert cache.get(store.load().signature, ("a", False)) is None
+    assert "hits" in cache.stats()
+
+
+@pytest.mark.parametrize("needles", [("+E000", " +E000"), (" +E000", "+E000")])
+def test_cached_generated_character(needles, make_named_emojis):
+    engine = SearchEngine(EmojiStore(make_named_emojis(20)))
+    # the same generated character whichever spelling was searched first
+    for needle in needles:
+        result = engine.search(needle)
+        assert [(e.char, e.name) for e in result.extra] == [("\ue000", "Generated Character")]
+    assert engine.cache.hits == 1
+
+
+@pytest.mark.parametrize("persisted", [False, True])
+def test_search_alternatives(tmp_path, persisted, make_named_emojis):
+    emojis = make_named_emojis(20)
+    alternatives = [[] for _ in emojis]
+    alternatives[3] = [("zebra crossing", "street, zebra"), ("zebrastreifen", "")]
+    alternatives[5] = [("zebra", "animal")]
+    store = EmojiStore(emojis)
+    if persisted:
+        index_file = str(tmp_path / "search.idx")
+        write_search_index(index_file, emojis, alternatives)
+        store = EmojiStore(emojis, index_file)
+        assert type(store.load().index).__name__ == "MappedSearchIndex"
+    else:
+        store.load().index = SearchIndex.build(emojis, alternatives)
+    engine = SearchEngine(store, fuzzy=True)
+    assert store.index.alternatives(3) == alternatives[3]
+    assert store.index.alternatives(0) == []
+    # found in any locale, scored in the best one
+    result = engine.search("zebra")
+    assert list(result.ids) == [3, 5]
+    # name and tags of one locale add up, the locales do not
+    assert list(result.scores) == [
+        match("zebra crossing", "zebra") + match("street, zebra", "zebra"),
+        match("zebra", "zebra"),
+    ]
+    assert list(engine.search("zebrastr").ids) == [3]
+    assert list(engine.search("#animal").ids) == [5]
+    assert list(engine.search("#crossing").ids) == []
+    # the words of all locales are known to fuzzy search
+    assert list(engine.search("zebrastreifn").ids) == [3]
+    # the primary locale is still found
+    assert len(engine.search("heart")) == len(linear_search(emojis, "heart"))
@@ -0,0 +1,58 @@
+"""Test the EmojiStore columns and searching over emoji ids."""
+
+from board import SearchGroup
+from emojis import Emoji
+from store import EmojiStore
+
+
+def make_store() -> EmojiStore:
+    heart = Emoji("❤️", "2764-FE0F", "smileys-emotion", "heart", "red heart", "love, heart")
+    heart.append(Emoji("❤", "2764", "smileys-emotion", "heart", "red heart"))
+    return EmojiStore(
+        [
+            Emoji("😀", "1F600", "smileys-emotion", "face-smiling", "grinning face", "face, grin"),
+            heart,
+            Emoji("🐱", "1F431", "animals-nature", "animal-mammal", "cat face", "cat, pet"),
+            Emoji("→", "2192", "arrows", "Sm", "rightwards arrow"),
+        ]
+    )
+
+
+def test_columns():
+    store = make_store().load()
+    assert store.chars == ["😀", "❤️", "🐱", "→"]
+    assert store.names[2] == "cat face"
+    assert store.groups == ["smileys-emotion", "animals-nature", "arrows"]
+    assert list(store.group_ids) == [0, 0, 1, 2]
+    assert list(store.subgroup_ids) == [0, 1, 2, 3]
+    assert list(store.variant_first) == [4, 4, 5, 5]
+    assert list(store.variant_count) == [0, 1, 0, 0]
+    assert store.variants(1)[0].unicode == "2764"
+
+
+def test_search():
+    store = make_store()
+    search = SearchGroup(store)
+    view = search.emojis
+    assert search.search("face") == 2
+    assert [e.char for e in view] == ["😀", "🐱"]
+    assert list(view.ids) == [0, 2]
+    assert search.search("smileys,") == 2
+    assert search.search(",mammal cat") == 1
+    # subgroup, name and tag score
+    assert view.score(0) == 10 + 13 + 13
+    assert search.search("+1F") == 2
+    assert search.search("") == 0
+    assert len(view) == 4
+    assert search.search("+1F9FF") == 1
+    assert view[0].name == "Generated Character"
+    # the board keeps showing the same view object
+    assert search.emojis is view
+
+
+def test_find():
+    store = make_store()
+    assert store.find("🐱").name == "cat face"
+    assert store.find("❤").unicode == "2764"
+    assert store.find("❤️").unicode == "2764-FE0F"
+    assert store.find("👍") is None